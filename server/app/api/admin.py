@@ -0,0 +1,242 @@
+"""
+Admin API routes (profiling, cache warming, index versions, memory)
+"""
+
+import asyncio
+import logging
+import secrets
+from fastapi import APIRouter, HTTPException, Header, Depends, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import Optional
+from ..core.config import settings
+from ..core.profiling import request_profiler
+from ..core.cache import cache_stats, clear_knowledge_base_caches
+from ..core.memory import memory_accounting, allocation_tracer
+from ..models.chat import IngestJobStatus
+from ..rag.vectorstore import vector_store
+from ..rag.shadow import shadow_mirror
+from ..rag.ingest import sync_suggestion_index
+from ..services.ingestion import ingestion_manager, IngestionInProgress
+from ..services.warmup import cache_warmer
+from ..services.sessions import session_store
+from ..services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Reject requests without the configured admin token"""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    # Constant-time comparison (bytes, so non-ASCII input is rejected rather than raising)
+    if not secrets.compare_digest((x_admin_token or "").encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """List recent request profiles, newest first"""
+    return {
+        "profiles": request_profiler.list_profiles(),
+        "max_profiles": settings.profiling_max_profiles,
+        "sample_rate": settings.profiling_sample_rate,
+    }
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query(default="pstats", pattern="^(pstats|text)$"),
+    sort: str = Query(default="cumulative", pattern="^(cumulative|tottime|calls)$"),
+    limit: int = Query(default=40, ge=1, le=500)
+):
+    """Download a profile as a pstats file, or view it as a text report"""
+    if format == "text":
+        report = request_profiler.render_profile(profile_id, limit=limit, sort=sort)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return PlainTextResponse(report)
+
+    path = request_profiler.get_profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+@router.post("/warmup", status_code=202)
+async def start_warmup(
+    max_llm_calls: Optional[int] = Query(default=None, ge=0),
+    top_n: Optional[int] = Query(default=None, ge=0)
+):
+    """Start a cache warm-up pass in the background"""
+    if cache_warmer.running:
+        raise HTTPException(status_code=409, detail="A cache warm-up is already running")
+    cache_warmer.schedule("manual", max_llm_calls=max_llm_calls, top_n=top_n)
+    return {"status": "started"}
+
+
+@router.get("/warmup")
+async def get_warmup():
+    """Report of the last cache warm-up pass and current cache sizes"""
+    return {
+        "running": cache_warmer.running,
+        "last_report": cache_warmer.last_report,
+        "caches": cache_stats(),
+    }
+
+
+@router.get("/index")
+async def get_index_versions():
+    """Live and retired knowledge base index versions"""
+    return await asyncio.to_thread(vector_store.describe_versions)
+
+
+@router.post("/index/rollback")
+async def rollback_index():
+    """Switch back to the most recently retired index version"""
+    try:
+        version = await asyncio.to_thread(vector_store.rollback)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    clear_knowledge_base_caches()
+    await sync_suggestion_index()
+    return {"status": "rolled_back", "live": version}
+
+
+@router.post("/index/gc")
+async def collect_index_garbage():
+    """Delete retired index versions whose grace period has passed"""
+    collected = await asyncio.to_thread(vector_store.collect_garbage)
+    return {"collected": collected}
+
+
+@router.post("/index/shadow", response_model=IngestJobStatus, status_code=202)
+async def build_shadow_index(
+    embedding_model: str = Query(..., min_length=1),
+    chunk_size: Optional[int] = Query(default=None, ge=50),
+    chunk_overlap: Optional[int] = Query(default=None, ge=0)
+):
+    """Start building a shadow index with a candidate model (and chunking) while the live one keeps serving"""
+    try:
+        job = ingestion_manager.start(
+            "shadow",
+            embedding_model=embedding_model,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            shadow=True
+        )
+    except IngestionInProgress as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job.id})
+    return job.to_dict()
+
+
+@router.get("/index/shadow")
+async def get_shadow_index():
+    """The shadow index version and how its mirrored queries compare with the live index"""
+    versions = await asyncio.to_thread(vector_store.describe_versions)
+    shadow, live = versions["shadow"], versions["live"]
+    return {
+        "live": {"version": live, **versions["versions"].get(live, {})},
+        "shadow": {"version": shadow, **versions["versions"][shadow]} if shadow else None,
+        "mirror": shadow_mirror.summary(),
+    }
+
+
+@router.post("/index/promote")
+async def promote_shadow_index():
+    """Switch the live index to the shadow version (and its embedding model)"""
+    try:
+        version = await asyncio.to_thread(vector_store.promote_shadow)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    clear_knowledge_base_caches()
+    await sync_suggestion_index()
+    shadow_mirror.reset()
+    return {"status": "promoted", "live": version, "embedding_model": vector_store.active.embedding_model}
+
+
+@router.delete("/index/shadow")
+async def discard_shadow_index():
+    """Drop the shadow index version"""
+    try:
+        version = await asyncio.to_thread(vector_store.discard_shadow)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    shadow_mirror.reset()
+    return {"status": "discarded", "shadow": version}
+
+
+@router.get("/sessions")
+async def get_sessions():
+    """Conversation session count, memory use and candidate reuse rate"""
+    return session_store.stats()
+
+
+@router.get("/llm")
+async def get_llm_providers():
+    """LLM providers in routing order with breaker state, error rate, latency and hedge delay"""
+    return llm_service.describe()
+
+
+@router.get("/memory")
+async def get_memory():
+    """Process RSS, per-component estimates (models, index arrays, caches, sessions) and the unaccounted rest"""
+    return await asyncio.to_thread(memory_accounting.report)
+
+
+@router.get("/memory/tracemalloc")
+async def get_allocation_tracing():
+    """Whether tracemalloc is on, the traced total and the kept snapshots"""
+    return allocation_tracer.status()
+
+
+@router.post("/memory/tracemalloc/start")
+async def start_allocation_tracing(frames: Optional[int] = Query(default=None, ge=1, le=50)):
+    """Start (or restart) tracemalloc; every allocation is slower until it is stopped"""
+    return allocation_tracer.start(frames)
+
+
+@router.post("/memory/tracemalloc/stop")
+async def stop_allocation_tracing():
+    """Stop tracemalloc (kept snapshots stay available)"""
+    return allocation_tracer.stop()
+
+
+@router.post("/memory/snapshots")
+async def take_allocation_snapshot(
+    label: str = Query(default="", max_length=100),
+    limit: int = Query(default=25, ge=1, le=500)
+):
+    """Snapshot the traced allocations and return the largest allocation sites"""
+    try:
+        record = await asyncio.to_thread(allocation_tracer.take_snapshot, label)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    top = await asyncio.to_thread(allocation_tracer.top, record, limit)
+    return {"id": record["id"], "label": label, "traced_bytes": record["traced_bytes"], "top": top}
+
+
+@router.get("/memory/snapshots/{snapshot_id}")
+async def get_allocation_snapshot(
+    snapshot_id: str,
+    base: Optional[str] = Query(default=None, description="Earlier snapshot id to diff against"),
+    limit: int = Query(default=25, ge=1, le=500),
+    group_by: str = Query(default="lineno", pattern="^(lineno|filename|traceback)$")
+):
+    """Largest allocation sites of a snapshot, or the largest changes since ``base``"""
+    record = allocation_tracer.get(snapshot_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot: {snapshot_id}")
+    response = {"id": snapshot_id, "label": record["label"], "traced_bytes": record["traced_bytes"]}
+    if base is None:
+        response["top"] = await asyncio.to_thread(allocation_tracer.top, record, limit, group_by)
+        return response
+    base_record = allocation_tracer.get(base)
+    if base_record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot: {base}")
+    response["base"] = base
+    response["diff"] = await asyncio.to_thread(allocation_tracer.diff, record, base_record, limit, group_by)
+    return response
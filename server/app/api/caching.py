@@ -0,0 +1,36 @@
+"""
+HTTP caching helpers for conditional GET routes
+"""
+
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the given parts (order-sensitive)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match names ``etag`` (weak comparison, as RFC 9110 specifies)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Proxies that re-encode a response (e.g. gzip) may hand back a weakened W/"..." tag
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+def conditional_response(request: Request, response: Response, etag: str, cache_control: str) -> Optional[Response]:
+    """Set the validator headers; returns a 304 response when the client's copy is current"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
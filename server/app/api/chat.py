@@ -4,17 +4,28 @@ Chat and query API routes
 
 import logging
 import time
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from typing import List, Optional, Annotated
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from ..models.chat import (
-    QueryRequest, QueryResponse, DocumentResult,
-    ChatRequest, ChatResponse, IngestResponse
+    QueryRequest, QueryResponse,
+    ChatRequest, ChatResponse, IngestResponse, IngestJobStatus
 )
-from ..services.chat_service import ChatService
-from ..rag.ingest import ingest_knowledge_base
+from ..services.chat_service import chat_service
+from ..services.ingestion import ingestion_manager, IngestionInProgress
+from ..rag.ingest import IngestionCancelled
 from ..rag.retriever import retrieve_documents
+from ..rag.chunks import as_reference
+from ..rag.vectorstore import vector_store, IndexVersion
 from ..core import startup
+from ..core.config import settings
+from ..core.cache import normalize_query
+from ..core.profiling import request_profiler
+from ..core.rag_logger import RAGLogger
+from ..core.capture import traffic_capture, document_id
+from ..core.metrics import start_stage_timings
+from .caching import conditional_response, make_etag
 
 logger = logging.getLogger(__name__)
 
@@ -22,87 +33,184 @@ logger = logging.getLogger(__name__)
 limiter = Limiter(key_func=get_remote_address, default_limits=["10/minute"])
 
 router = APIRouter(tags=["chat", "query"])
-chat_service = ChatService()
 
 
 @router.post("/query", response_model=QueryResponse)
 @limiter.limit("10/minute")  # Temporarily disable rate limiting for debugging, when needed, or i can just generate a new one
-async def query_knowledge_base(request: Request, query_request: QueryRequest):
+async def query_knowledge_base(request: Request, query_request: QueryRequest, response: Response):
     """Query the knowledge base with semantic search"""
     if not startup.embedding_model or not startup.collection:
         raise HTTPException(status_code=503, detail="Services not initialized")
     
+    return await _run_query(request, query_request, response)
+
+
+@router.get("/query", response_model=QueryResponse)
+@limiter.limit("10/minute")
+async def query_knowledge_base_cacheable(
+    request: Request,
+    response: Response,
+    query_request: Annotated[QueryRequest, Query()]
+):
+    """
+    Cacheable semantic search
+
+    The ETag covers the normalized query, every result-shaping parameter and
+    the live index version, so a revalidation answers 304 without touching
+    the embedding model or Chroma until the next ingest or rollback. The
+    body is retrieved from that same version (retrieval caches are keyed by
+    it), so a validator never labels another version's results.
+    """
+    if not startup.embedding_model or not startup.collection:
+        raise HTTPException(status_code=503, detail="Services not initialized")
+    
+    index = await vector_store.live_version()
+    etag = make_etag(
+        normalize_query(query_request.query),
+        query_request.n_results,
+        query_request.category,
+        query_request.mmr,
+        query_request.mmr_lambda,
+        query_request.mmr_fetch_k,
+        query_request.by_reference,
+        index.version
+    )
+    response.headers["X-KB-Version"] = index.version
+    not_modified = conditional_response(request, response, etag, f"public, max-age={settings.query_max_age_s}")
+    if not_modified:
+        not_modified.headers["X-KB-Version"] = index.version
+        return not_modified
+    
+    # Search the version the ETag names, even if the alias moves on meanwhile
+    return await _run_query(request, query_request, response, index)
+
+
+async def _run_query(
+    request: Request,
+    query_request: QueryRequest,
+    response: Response,
+    index: Optional[IndexVersion] = None
+) -> QueryResponse:
+    """Retrieve, shape and capture one /query request (shared by the POST and GET routes)"""
+    start = time.perf_counter()
+    stage_timings = start_stage_timings()
+    # Starts the trace (and makes the sampling decision) for this request
+    RAGLogger.log_query(query_request.query)
     try:
         # Log the request with category info
         logger.info(f"Query request from {get_remote_address(request)}: '{query_request.query}' (category: '{query_request.category}')")
         
         # Retrieve documents using category as scope
-        documents = await retrieve_documents(
-            query=query_request.query, 
-            n_results=query_request.n_results,
-            category=query_request.category
-        )
+        async with request_profiler.maybe_profile(request, "query") as profile:
+            documents = await retrieve_documents(
+                query=query_request.query, 
+                n_results=query_request.n_results,
+                category=query_request.category,
+                mmr=query_request.mmr,
+                mmr_lambda=query_request.mmr_lambda,
+                mmr_fetch_k=query_request.mmr_fetch_k,
+                index=index
+            )
+        if profile:
+            response.headers["X-Profile-Id"] = profile["id"]
+        RAGLogger.log_retrieved_documents(documents)
         
         # Convert to DocumentResult models
-        results = [
-            DocumentResult(
-                text=doc["text"],
-                metadata=doc["metadata"],
-                distance=doc["distance"]
-            )
-            for doc in documents
-        ]
+        results = [doc.to_result() for doc in documents]
+        if query_request.by_reference:
+            results = [as_reference(result) for result in results]
+        
+        traffic_capture.record(
+            "query",
+            body=query_request.model_dump(),
+            category=query_request.category,
+            status=200,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2),
+            stage_timings_ms=dict(stage_timings),
+            retrieved_ids=[doc.id for doc in documents]
+        )
         
         return QueryResponse(
             results=results,
             query=query_request.query,
+            total_results=len(results)
         )
         
     except Exception as e:
         logger.error(f"Query failed: {e}")
+        traffic_capture.record(
+            "query",
+            body=query_request.model_dump(),
+            category=query_request.category,
+            status=500,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2)
+        )
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_with_rag(request: ChatRequest):
+async def chat_with_rag(request: ChatRequest, http_request: Request, http_response: Response):
     """Chat with the AI using RAG (Retrieval-Augmented Generation)"""
     if not startup.embedding_model or not startup.collection:
         raise HTTPException(status_code=503, detail="Services not initialized")
     
+    start = time.perf_counter()
     try:
-        response = await chat_service.process_query(request)
+        async with request_profiler.maybe_profile(http_request, "chat") as profile:
+            response = await chat_service.process_query(request)
+        if profile:
+            http_response.headers["X-Profile-Id"] = profile["id"]
+        
+        metrics = response.evaluation_metrics or {}
+        traffic_capture.record(
+            "chat",
+            body=request.model_dump(),
+            category=request.category,
+            status=200,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2),
+            stage_timings_ms=dict(metrics.get("stage_timings_ms", {})),
+            retrieved_ids=[document_id(source.metadata) for source in response.sources],
+            cached=bool(metrics.get("cached"))
+        )
         return response
         
     except HTTPException as he:
         raise he
     except Exception as e:
         logger.error(f"Chat failed: {e}")
+        traffic_capture.record(
+            "chat",
+            body=request.model_dump(),
+            category=request.category,
+            status=500,
+            latency_ms=round((time.perf_counter() - start) * 1000, 2)
+        )
         raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
 
 
-@router.post("/ingest", response_model=IngestResponse)
-async def trigger_ingestion(background_tasks: BackgroundTasks):
-    """Trigger knowledge base ingestion in background"""
+def _ingest_conflict(e: IngestionInProgress) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={"message": str(e), "job_id": e.job.id}
+    )
+
+
+@router.post("/ingest", response_model=IngestResponse, status_code=202)
+async def trigger_ingestion():
+    """Start a knowledge base ingestion job in the background"""
     if not startup.embedding_model or not startup.collection:
         raise HTTPException(status_code=503, detail="Services not initialized")
     
     try:
-        # Run ingestion in background
-        def ingest_task():
-            import asyncio
-            chunks_count = asyncio.run(ingest_knowledge_base())
-            logger.info(f"Successfully ingested {chunks_count} chunks")
-        
-        background_tasks.add_task(ingest_task)
-        
-        return IngestResponse(
-            message="Ingestion started successfully",
-            chunks_ingested=0
-        )
-        
-    except Exception as e:
-        logger.error(f"Ingestion trigger failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
+        job = ingestion_manager.start("api")
+    except IngestionInProgress as e:
+        raise _ingest_conflict(e)
+    
+    return IngestResponse(
+        message="Ingestion started successfully",
+        chunks_ingested=0,
+        job_id=job.id
+    )
 
 
 @router.post("/ingest/sync", response_model=IngestResponse)
@@ -112,12 +220,44 @@ async def trigger_ingestion_sync():
         raise HTTPException(status_code=503, detail="Services not initialized")
     
     try:
-        chunks_count = await ingest_knowledge_base()
+        job = ingestion_manager.start("sync")
+    except IngestionInProgress as e:
+        raise _ingest_conflict(e)
+    
+    try:
+        chunks_count = await ingestion_manager.wait(job)
         return IngestResponse(
             message="Ingestion completed successfully",
-            chunks_ingested=chunks_count
+            chunks_ingested=chunks_count,
+            job_id=job.id
         )
         
+    except IngestionCancelled:
+        raise HTTPException(status_code=409, detail={"message": "Ingestion cancelled", "job_id": job.id})
     except Exception as e:
         logger.error(f"Sync ingestion failed: {e}")
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
+
+
+@router.get("/ingest/jobs", response_model=List[IngestJobStatus])
+async def list_ingestion_jobs():
+    """Recent ingestion jobs, newest first"""
+    return [job.to_dict() for job in ingestion_manager.jobs()]
+
+
+@router.get("/ingest/jobs/{job_id}", response_model=IngestJobStatus)
+async def get_ingestion_job(job_id: str):
+    """Stage, progress and outcome of an ingestion job"""
+    job = ingestion_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
+
+
+@router.post("/ingest/jobs/{job_id}/cancel", response_model=IngestJobStatus)
+async def cancel_ingestion_job(job_id: str):
+    """Ask a running ingestion job to stop before it switches the live index"""
+    job = ingestion_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
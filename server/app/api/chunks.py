@@ -0,0 +1,77 @@
+"""
+Knowledge base chunk routes
+"""
+
+import logging
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from ..models.chat import ChunkResponse, ChunkBatchResponse
+from ..rag.chunks import get_chunks
+from ..core import startup
+from ..core.config import settings
+from .caching import conditional_response, make_etag
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/chunks", tags=["chunks"])
+
+# A ?v= URL names one exact chunk content, so it can be cached for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MAX_BATCH_IDS = 100
+
+
+def _require_services():
+    if not startup.embedding_model or not startup.collection:
+        raise HTTPException(status_code=503, detail="Services not initialized")
+
+
+@router.get("", response_model=ChunkBatchResponse)
+async def get_chunk_batch(
+    request: Request,
+    response: Response,
+    ids: List[str] = Query(..., description="Chunk ids (repeat the parameter)")
+):
+    """Fetch several chunks in one request"""
+    _require_services()
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_IDS} ids per request")
+
+    chunks = await get_chunks(ids)
+    found = [chunks[chunk_id] for chunk_id in dict.fromkeys(ids) if chunk_id in chunks]
+    missing = [chunk_id for chunk_id in dict.fromkeys(ids) if chunk_id not in chunks]
+
+    # The batch changes whenever any member's content does
+    etag = make_etag(*(chunk["content_hash"] for chunk in found), *(f"missing:{chunk_id}" for chunk_id in missing))
+    not_modified = conditional_response(request, response, etag, f"public, max-age={settings.chunk_max_age_s}")
+    if not_modified:
+        return not_modified
+
+    return ChunkBatchResponse(
+        chunks=[ChunkResponse(**chunk) for chunk in found],
+        missing=missing
+    )
+
+
+@router.get("/{chunk_id}", response_model=ChunkResponse)
+async def get_chunk(
+    chunk_id: str,
+    request: Request,
+    response: Response,
+    v: Optional[str] = Query(default=None, description="Expected content hash, from a by_reference response")
+):
+    """Fetch one chunk; cacheable by browsers and CDNs via its ETag"""
+    _require_services()
+    chunk = (await get_chunks([chunk_id])).get(chunk_id)
+    if chunk is None:
+        raise HTTPException(status_code=404, detail="Chunk not found")
+
+    # Only a matching ?v= is immutable; after a re-ingest the same URL may serve new content
+    if v == chunk["content_hash"]:
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = f"public, max-age={settings.chunk_max_age_s}"
+    not_modified = conditional_response(request, response, f'"{chunk["content_hash"]}"', cache_control)
+    if not_modified:
+        return not_modified
+
+    return ChunkResponse(**chunk)
@@ -0,0 +1,15 @@
+"""
+Prometheus metrics API route
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..core.metrics import registry
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Expose stage histograms and counters in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
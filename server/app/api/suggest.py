@@ -0,0 +1,22 @@
+"""
+Typeahead suggestion routes
+"""
+
+from fastapi import APIRouter, Query
+from ..models.chat import SuggestResponse
+from ..rag.suggest import suggester
+from ..rag.ingest import sync_suggestion_index
+from ..core.config import settings
+
+router = APIRouter(tags=["suggest"])
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest_terms(
+    prefix: str = Query(..., max_length=100, description="Text typed so far"),
+    limit: int = Query(default=8, ge=1, le=settings.suggest_max_results)
+):
+    """Complete player names, seasons and tactical terms from the knowledge base"""
+    # Follow alias switches made elsewhere (another replica's ingest or rollback)
+    await sync_suggestion_index()
+    return SuggestResponse(prefix=prefix, suggestions=suggester.suggest(prefix, limit))
@@ -0,0 +1,162 @@
+"""
+In-process serving caches, optionally backed by the shared cache tier
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .config import settings
+from .memory import memory_accounting, sampled_bytes
+from .metrics import CACHE_HITS, CACHE_MISSES
+from .shared_cache import shared_cache
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a user query: case- and whitespace-insensitive"""
+    return " ".join(query.lower().split())
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live
+
+    Hits and misses are counted under ``name`` in the cache metrics. Caches
+    the owning module ``share``s are also read and written through the
+    shared tier by ``aget``/``aset``, so other replicas can serve their
+    entries.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_s: Optional[float] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.codec = None
+        self.shared_ttl_s: Optional[float] = None
+        self.scope: Optional[Callable[[], Optional[str]]] = None
+
+    def share(self, codec, ttl_s: Optional[float] = None, scope: Optional[Callable[[], Optional[str]]] = None):
+        """
+        Back this cache with the shared tier
+
+        Values are stored with ``codec`` for ``ttl_s`` (default: the cache's
+        own TTL). ``scope`` returns what the entries are only valid for (the
+        index version, the embedding model) and is part of their shared key,
+        so replicas never serve each other stale entries; no scope (None)
+        skips the shared tier.
+        """
+        self.codec = codec
+        self.shared_ttl_s = ttl_s or self.ttl_s
+        self.scope = scope or (lambda: "")
+
+    def _shared_key(self, key: Hashable) -> Optional[str]:
+        if self.codec is None or not settings.cache_enabled or not shared_cache.enabled:
+            return None
+        scope = self.scope()
+        return shared_cache.key(self.name, scope, key) if scope is not None else None
+
+    async def aget(self, key: Hashable) -> Optional[Any]:
+        """``get``, falling back to the shared tier; shared hits are kept in-process too"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        shared_key = self._shared_key(key)
+        if shared_key is None:
+            return None
+        value = await shared_cache.get(self.name, shared_key, self.codec)
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    async def aset(self, key: Hashable, value: Any):
+        """``set``, also writing the shared tier in the background"""
+        self.set(key, value)
+        shared_key = self._shared_key(key)
+        if shared_key is not None:
+            shared_cache.set(self.name, shared_key, value, self.codec, self.shared_ttl_s)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not settings.cache_enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    CACHE_HITS.inc(cache=self.name)
+                    return value
+                del self._entries[key]
+        CACHE_MISSES.inc(cache=self.name)
+        return None
+
+    def set(self, key: Hashable, value: Any):
+        if not settings.cache_enabled or self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "ttl_s": self.ttl_s}
+
+    def memory_bytes(self, sample: Optional[int] = None) -> int:
+        """Approximate size of the cached keys and values, extrapolated from ``sample`` entries"""
+        with self._lock:
+            entries = list(self._entries.items())
+        return sampled_bytes(entries, sample or settings.memory_cache_sample)
+
+
+# (embedding model, query text) -> query embedding
+query_embedding_cache = TTLCache("query_embedding", settings.query_embedding_cache_size)
+# Query + retrieval parameters -> retrieved chunks; cleared on ingestion
+retrieval_cache = TTLCache("retrieval", settings.retrieval_cache_size, settings.retrieval_cache_ttl_s)
+# Chat request -> ChatResponse; cleared on ingestion
+answer_cache = TTLCache("answer", settings.answer_cache_size, settings.answer_cache_ttl_s)
+# (index version, chunk id) -> chunk; keyed by version, so ingestion never invalidates it
+chunk_cache = TTLCache("chunk", settings.chunk_cache_size)
+# (chunk id, text hash) -> (sentences, sentence embeddings) for extractive answers
+sentence_cache = TTLCache("sentence", settings.sentence_cache_size)
+
+
+def clear_knowledge_base_caches():
+    """Drop everything derived from the current knowledge base contents"""
+    retrieval_cache.clear()
+    answer_cache.clear()
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    stats = {
+        cache.name: cache.stats()
+        for cache in (query_embedding_cache, retrieval_cache, answer_cache, chunk_cache, sentence_cache)
+    }
+    stats["shared_tier"] = shared_cache.stats()
+    return stats
+
+
+def cache_memory() -> Dict[str, int]:
+    memory = {
+        cache.name: cache.memory_bytes()
+        for cache in (query_embedding_cache, retrieval_cache, answer_cache, chunk_cache, sentence_cache)
+    }
+    memory["total"] = sum(memory.values())
+    return memory
+
+
+memory_accounting.register("caches", cache_memory)
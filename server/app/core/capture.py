@@ -0,0 +1,157 @@
+"""
+Traffic capture for /query and /chat
+"""
+
+import gzip
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_GLOB = "traffic-*.jsonl.gz"
+
+
+def document_id(metadata: Dict[str, Any]) -> str:
+    """Chunk id as written at ingestion (``<source>_<chunk_id>``)"""
+    return f"{metadata.get('source')}_{metadata.get('chunk_id')}"
+
+
+def read_capture(paths: Iterable[Path]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield captured records from capture files or directories, oldest file first
+
+    A file still being written (or cut short by a crash) is read up to its
+    last complete record.
+    """
+    files: List[Path] = []
+    for path in paths:
+        path = Path(path)
+        files.extend(sorted(path.glob(CAPTURE_GLOB)) if path.is_dir() else [path])
+
+    for path in files:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except (EOFError, OSError, zlib.error) as e:
+            logger.warning(f"Stopped reading truncated capture file {path}: {e}")
+
+
+class TrafficCapture:
+    """
+    Append-only, gzip-compressed request capture written by a background thread
+
+    ``record`` only enqueues (dropping when the queue is full), so the request
+    path never waits on compression or disk I/O. Files rotate once they reach
+    ``capture_max_file_bytes`` compressed, and only the newest
+    ``capture_max_files`` are kept.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self.written = 0
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._file: Optional[gzip.GzipFile] = None
+        self._path: Optional[Path] = None
+        self._sequence = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """Start the writer thread if capture is enabled in settings"""
+        if self._thread is not None or not settings.capture_enabled:
+            return
+        Path(settings.capture_dir).mkdir(parents=True, exist_ok=True)
+        self._queue = queue.Queue(maxsize=settings.capture_queue_size)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+        logger.info(f"Capturing /query and /chat traffic to {settings.capture_dir}")
+
+    def stop(self):
+        """Write everything queued, close the current file and stop the thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._queue = None
+
+    def record(self, endpoint: str, **fields):
+        """Queue one captured request (subject to ``capture_sample_rate``)"""
+        if self._queue is None:
+            return
+        if settings.capture_sample_rate < 1.0 and random.random() >= settings.capture_sample_rate:
+            return
+        try:
+            self._queue.put_nowait({"ts": round(time.time(), 3), "endpoint": endpoint, **fields})
+        except queue.Full:
+            self.dropped += 1
+
+    # Writer thread
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(item)
+                # Flush once the backlog is drained so readers see complete records
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                logger.error(f"Traffic capture write failed: {e}")
+        self._close()
+
+    def _write(self, item: Dict[str, Any]):
+        if self._file is None or self._file.fileobj.tell() >= settings.capture_max_file_bytes:
+            self._rotate()
+        line = json.dumps(item, default=str, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self._file.write(line.encode("utf-8"))
+        self.written += 1
+
+    def _rotate(self):
+        self._close()
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        self._path = Path(settings.capture_dir) / f"traffic-{stamp}-{self._sequence:04d}.jsonl.gz"
+        self._file = gzip.open(self._path, "ab")
+
+        files = sorted(Path(settings.capture_dir).glob(CAPTURE_GLOB))
+        for stale in files[:-settings.capture_max_files]:
+            try:
+                stale.unlink()
+            except OSError as e:
+                logger.warning(f"Failed to remove old capture file {stale}: {e}")
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "written": self.written,
+            "dropped": self.dropped,
+            "current_file": str(self._path) if self._path else None,
+        }
+
+
+# Global traffic capture instance
+traffic_capture = TrafficCapture()
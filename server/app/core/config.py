@@ -18,11 +18,93 @@ class Settings(BaseSettings):
     # Knowledge Base
     kb_path: Path = Path("../arsenal_kb")
     collection_name: str = "gunnergpt_arsenal_kb"
+    partition_by_category: bool = True  # one index per arsenal_kb category directory
+    index_gc_grace_s: float = 600.0  # retired index versions are deleted after this long
+    index_keep_versions: int = 1  # retired versions always kept for rollback
+    index_alias_refresh_s: float = 30.0  # how often replicas re-read the live index alias
+    index_smoke_queries: int = 3  # self-retrieval checks run on a new index before switching
     
     # Embedding Model
     embedding_model_name: str = "all-MiniLM-L6-v2"
     chunk_size: int = 600
     chunk_overlap: int = 120
+    ingest_batch_size: int = 64  # chunks embedded between progress updates / cancellation checks
+    ingest_job_history: int = 20  # finished ingestion jobs kept for status queries
+    suggest_min_phrase_count: int = 2  # key phrases must recur this often to be suggested
+    suggest_max_results: int = 10
+    
+    # Retrieval
+    mmr_fetch_k: int = 20  # candidates over-fetched before MMR selection
+    mmr_lambda: float = 0.5  # 1.0 = pure relevance, 0.0 = maximum diversity
+    mmr_duplicate_threshold: float = 0.95  # drop chunks this similar to one already selected
+    
+    # Category routing
+    category_routing_enabled: bool = True  # restrict category="all" searches to the likeliest categories
+    routing_centroids_per_category: int = 1  # spherical k-means centroids stored per category at ingest (0 disables)
+    routing_confidence: float = 0.7  # routed categories must cover this probability, else search everything
+    routing_max_categories: int = 2
+    routing_temperature: float = 0.05  # softmax temperature over each category's best centroid similarity
+    
+    # Shadow indexes
+    shadow_mirror_rate: float = 0.0  # share of live retrievals repeated against the shadow index
+    shadow_mirror_max_in_flight: int = 4  # mirrors beyond this are skipped, never queued
+    shadow_mirror_samples: int = 1000  # most recent live/shadow comparisons kept
+    
+    # Deadlines
+    chat_deadline_s: float = 20.0  # end-to-end /chat budget unless the request sets deadline_ms
+    deadline_full_context_s: float = 5.0  # with less budget left for the LLM, its context is trimmed proportionally
+    deadline_evaluation_min_s: float = 0.05  # answer evaluation is skipped with less budget left than this
+    
+    # Extractive answers
+    extractive_max_sentences: int = 3
+    extractive_lexical_weight: float = 0.4  # query term overlap vs. embedding similarity when scoring sentences
+    extractive_rank_bonus: float = 0.05  # score bonus for sentences from the top-ranked chunk, decreasing with rank
+    extractive_min_score: float = 0.15  # sentences scoring lower are never used
+    extractive_min_sentence_chars: int = 25
+    extractive_embed_min_s: float = 0.05  # with less budget left, sentences are scored by term overlap only
+    extractive_overload_llm_calls: int = 64  # LLM calls in flight beyond which chat answers extractively (0 disables)
+    
+    # Serving caches
+    cache_enabled: bool = True
+    query_embedding_cache_size: int = 4096
+    retrieval_cache_size: int = 1024
+    retrieval_cache_ttl_s: float = 3600.0
+    answer_cache_size: int = 512
+    answer_cache_ttl_s: float = 3600.0
+    chunk_cache_size: int = 4096
+    sentence_cache_size: int = 2048  # chunks whose sentence embeddings are kept for extractive answers
+    query_max_age_s: int = 60  # Cache-Control max-age for GET /query (revalidated by ETag afterwards)
+    chunk_max_age_s: int = 3600  # Cache-Control max-age for /chunks responses without a ?v= content hash
+    
+    # Shared cache tier (query embeddings, retrieval results and answers shared across replicas)
+    shared_cache_backend: str = "memory"  # memory (in-process caches only) | disk | redis
+    shared_cache_url: str = "redis://localhost:6379/0"  # any Redis-protocol server
+    shared_cache_path: str = "./shared_cache.sqlite3"  # disk backend file, shared by replicas on one host
+    shared_cache_prefix: str = "gunnergpt"
+    shared_cache_timeout_s: float = 0.05  # per operation; slower reads count as misses
+    shared_cache_retry_s: float = 5.0  # the tier is skipped this long after an error
+    shared_cache_pool_size: int = 16  # idle Redis connections kept
+    shared_cache_compress_min_bytes: int = 1024  # JSON values this large are zlib-compressed
+    shared_cache_disk_max_entries: int = 100000
+    query_embedding_shared_ttl_s: float = 86400.0
+    
+    # Conversation sessions
+    session_max: int = 10000  # least recently used sessions are evicted beyond this
+    session_ttl_s: float = 1800.0  # idle sessions expire after this long
+    session_max_turns: int = 6  # turns of history kept per session
+    session_candidates: int = 20  # candidates kept from each fresh retrieval for follow-ups to re-rank
+    session_reuse_min_coverage: float = 0.5  # share of a follow-up's terms the candidates must contain to be reused
+    session_rerank_lexical_weight: float = 0.5  # term overlap vs. earlier similarity when re-ranking
+    session_answer_chars: int = 300  # answer excerpt kept per turn
+    
+    # Cache warming
+    warmup_on_startup: bool = False
+    warmup_after_ingest: bool = True
+    warmup_interval_s: float = 0.0  # 0 disables the scheduled warm-up
+    warmup_queries_path: Path = Path("warmup_queries.json")  # curated questions
+    warmup_query_log_path: Optional[Path] = None  # JSON RAG trace log to mine for popular queries
+    warmup_top_n: int = 20
+    warmup_max_llm_calls: int = 20
     
     # Chroma Cloud
     chroma_api_key: Optional[str] = None
@@ -34,10 +116,24 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     huggingface_api_key: Optional[str] = None
     huggingface_model: str = "mistralai/Mistral-7B-Instruct-v0.2"
-    # gemini_model: str = "gemini-2.0-flash"  # Keep for reference but not primary
+    openai_model: str = "gpt-4o-mini"
+    gemini_model: str = "gemini-2.0-flash"
     gemini_rate_limit_per_minute: int = 15
     gemini_rate_limit_per_day: int = 1500
     
+    # LLM routing
+    llm_providers: str = "huggingface,openai,gemini"  # preference order; providers without API keys are skipped
+    llm_timeout_s: float = 30.0
+    llm_hedge_enabled: bool = True
+    llm_hedge_quantile: float = 0.95  # hedge once the primary is slower than this share of its recent calls
+    llm_hedge_default_delay_s: float = 2.0  # hedge delay until llm_hedge_min_samples latencies are learned
+    llm_hedge_min_delay_s: float = 0.2
+    llm_hedge_min_samples: int = 20
+    llm_latency_window: int = 200  # recent successful calls per provider kept for latency quantiles
+    llm_breaker_failures: int = 5  # errors, timeouts or 429s within llm_breaker_window_s that open a breaker
+    llm_breaker_window_s: float = 30.0
+    llm_breaker_open_s: float = 30.0  # how long an open breaker rejects calls before a probe
+    
     # API
     api_host: str = "0.0.0.0"
     api_port: int = 8000
@@ -47,6 +143,29 @@ class Settings(BaseSettings):
     
     # Logging
     log_level: str = "INFO"
+    rag_trace_level: str = "summary"  # off | summary | trace
+    rag_trace_sample_rate: float = 1.0  # fraction of chat requests traced
+    rag_trace_format: str = "json"  # json | pretty
+    
+    # Traffic capture
+    capture_enabled: bool = False  # record /query and /chat requests for replay
+    capture_dir: Path = Path(".capture")
+    capture_sample_rate: float = 1.0
+    capture_max_file_bytes: int = 16 * 1024 * 1024  # compressed size before rotating
+    capture_max_files: int = 20
+    capture_queue_size: int = 10000
+    
+    # Admin / profiling
+    admin_token: Optional[str] = None  # required in X-Admin-Token for /admin routes
+    profiling_sample_rate: float = 0.0  # fraction of requests profiled without the header
+    profiling_dir: Path = Path(".profiles")
+    profiling_max_profiles: int = 50
+    
+    # Memory accounting
+    memory_trace_frames: int = 1  # traceback depth when tracemalloc is started without one
+    memory_snapshot_history: int = 5  # allocation snapshots kept for diffing
+    memory_sample_interval_s: float = 0.05  # RSS sampling period while tracking an ingestion run's peak
+    memory_cache_sample: int = 64  # entries sized per cache, extrapolated to the rest
     
     class Config:
         env_file = env_path
@@ -0,0 +1,82 @@
+"""
+Per-request deadline budgets
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+from .metrics import DEADLINE_EXCEEDED, DEGRADED_RESPONSES
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a pipeline stage runs out of the request's remaining budget"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    A request's end-to-end latency budget, shared by every pipeline stage
+
+    Each stage awaits its work through ``run`` with whatever budget is left,
+    so a slow Chroma query leaves less time for the LLM rather than pushing
+    the request past its deadline. The first stage to overrun is recorded in
+    ``gunnergpt_deadline_exceeded_total``; cheaper fallbacks taken to stay in
+    budget are recorded with ``degrade``.
+    """
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_s
+        self.blown_stage: Optional[str] = None
+        self.degraded: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def exceeded(self, stage: str) -> DeadlineExceeded:
+        """Record ``stage`` as the one that blew the budget and return the exception to raise"""
+        if self.blown_stage is None:
+            self.blown_stage = stage
+            DEADLINE_EXCEEDED.inc(stage=stage)
+        return DeadlineExceeded(stage)
+
+    async def run(self, stage: str, awaitable: Awaitable) -> Any:
+        """Await ``awaitable`` for at most the remaining budget"""
+        budget = self.remaining()
+        if budget <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise self.exceeded(stage)
+        try:
+            return await asyncio.wait_for(awaitable, budget)
+        except asyncio.TimeoutError:
+            raise self.exceeded(stage) from None
+
+    def degrade(self, action: str):
+        """Record a cheaper path taken to stay within budget"""
+        self.degraded.append(action)
+        DEGRADED_RESPONSES.inc(action=action)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "budget_ms": int(self.budget_s * 1000),
+            "remaining_ms": int(self.remaining() * 1000),
+            "blown_stage": self.blown_stage,
+            "degraded": list(self.degraded),
+        }
+
+
+async def bounded(deadline: Optional[Deadline], stage: str, awaitable: Awaitable) -> Any:
+    """Await ``awaitable`` within ``deadline`` if there is one"""
+    if deadline is None:
+        return await awaitable
+    return await deadline.run(stage, awaitable)
@@ -0,0 +1,327 @@
+"""
+Process memory accounting, allocation snapshots and peak tracking
+"""
+
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Resident and peak resident set size of this process in bytes (None where the OS does not say)"""
+    rss = peak = None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        try:
+            import resource
+            # ru_maxrss is kilobytes on Linux and bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak *= 1 if sys.platform == "darwin" else 1024
+        except ImportError:
+            pass
+    return {"rss_bytes": rss, "peak_rss_bytes": peak}
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, read cheaply enough to sample in a loop"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return process_memory()["rss_bytes"]
+
+
+def estimate_bytes(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Deep size of a value: containers, objects with ``__dict__`` or
+    ``__slots__``, and numpy arrays by their buffers
+
+    Objects reachable more than once are counted once.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, np.ndarray):
+        # Includes the data of arrays owning it; views count the buffer they share once, through ``base``
+        return size + (estimate_bytes(value.base, seen) if value.base is not None else 0)
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_bytes(k, seen) + estimate_bytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_bytes(item, seen) for item in value)
+    if hasattr(value, "__dict__"):
+        size += estimate_bytes(vars(value), seen)
+    for slot in getattr(type(value), "__slots__", ()):
+        if hasattr(value, slot):
+            size += estimate_bytes(getattr(value, slot), seen)
+    return size
+
+
+def sampled_bytes(values: List[Any], sample: int) -> int:
+    """Total size of ``values`` extrapolated from an evenly spaced sample of them"""
+    if not values:
+        return 0
+    step = max(1, len(values) // max(sample, 1))
+    picked = values[::step]
+    return int(sum(estimate_bytes(value) for value in picked) * len(values) / len(picked))
+
+
+def model_bytes(model: Any) -> Dict[str, int]:
+    """Parameter and buffer bytes of a torch module (0 for models without weights)"""
+    parameters = buffers = 0
+    if hasattr(model, "parameters"):
+        parameters = sum(p.numel() * p.element_size() for p in model.parameters())
+        buffers = sum(b.numel() * b.element_size() for b in model.buffers())
+    return {"parameters": int(parameters), "buffers": int(buffers), "total": int(parameters + buffers)}
+
+
+Estimate = Union[int, Dict[str, Any]]
+
+
+class MemoryAccounting:
+    """
+    Per-component memory estimates next to the process RSS
+
+    Components register a callable returning their size in bytes, or a dict
+    of named parts with a ``total`` (or ``total_bytes``), from the module
+    that owns them. Estimates cover the objects the code keeps (arrays,
+    cached values, model weights); allocator overhead, interpreter state,
+    native libraries and client buffers outside Python show up as the
+    ``unaccounted`` remainder of RSS.
+    """
+
+    def __init__(self):
+        self._components: "OrderedDict[str, Callable[[], Estimate]]" = OrderedDict()
+
+    def register(self, name: str, estimate: Callable[[], Estimate]):
+        self._components[name] = estimate
+
+    @staticmethod
+    def _total(estimate: Estimate) -> int:
+        if isinstance(estimate, dict):
+            return int(estimate.get("total", estimate.get("total_bytes", 0)))
+        return int(estimate)
+
+    def report(self) -> Dict[str, Any]:
+        """RSS, each component's estimate and the remainder; slow for large caches, so call off the event loop"""
+        components, accounted = {}, 0
+        for name, estimate in self._components.items():
+            start = time.perf_counter()
+            try:
+                value = estimate()
+            except Exception as e:
+                logger.warning(f"Memory estimate for {name} failed: {e}")
+                components[name] = {"error": str(e)}
+                continue
+            total = self._total(value)
+            accounted += total
+            components[name] = {
+                **(value if isinstance(value, dict) else {"total": total}),
+                "estimate_ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+
+        memory = process_memory()
+        rss = memory["rss_bytes"]
+        traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+        return {
+            **memory,
+            "accounted_bytes": accounted,
+            "unaccounted_bytes": rss - accounted if rss is not None else None,
+            "components": components,
+            "python": {
+                "gc_objects": len(gc.get_objects()),
+                "gc_counts": gc.get_count(),
+                "traced_bytes": traced[0] if traced else None,
+                "traced_peak_bytes": traced[1] if traced else None,
+            },
+        }
+
+
+class AllocationTracer:
+    """
+    Starts and stops ``tracemalloc`` and keeps recent snapshots
+
+    Tracing slows every allocation down (several times over with deep
+    stacks), so it is off until an admin starts it. Snapshots are kept in
+    memory, the newest ``memory_snapshot_history`` of them, and can be shown
+    as top allocation sites or diffed against an earlier one.
+    """
+
+    def __init__(self):
+        self._snapshots: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, frames: Optional[int] = None) -> Dict[str, Any]:
+        frames = frames or settings.memory_trace_frames
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        tracemalloc.start(frames)
+        logger.info(f"Started tracemalloc with {frames} frames")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("Stopped tracemalloc")
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        traced = tracemalloc.get_traced_memory() if tracing else (None, None)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "traced_bytes": traced[0],
+            "traced_peak_bytes": traced[1],
+            "snapshots": [
+                {key: record[key] for key in ("id", "label", "created_at", "traced_bytes")}
+                for record in self._snapshots.values()
+            ],
+        }
+
+    def take_snapshot(self, label: str = "") -> Dict[str, Any]:
+        """Snapshot the traced allocations; raises RuntimeError when tracing is off"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        record = {
+            "id": f"{int(time.time())}_{uuid.uuid4().hex[:6]}",
+            "label": label,
+            "created_at": round(time.time(), 3),
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "snapshot": snapshot,
+        }
+        with self._lock:
+            self._snapshots[record["id"]] = record
+            while len(self._snapshots) > settings.memory_snapshot_history:
+                self._snapshots.popitem(last=False)
+        return record
+
+    def get(self, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        return self._snapshots.get(snapshot_id)
+
+    @staticmethod
+    def _site(stat) -> List[str]:
+        # Grouped by filename, the line number is always 0
+        return [f"{frame.filename}:{frame.lineno}" if frame.lineno else frame.filename for frame in stat.traceback]
+
+    def top(self, record: Dict[str, Any], limit: int = 25, group_by: str = "lineno") -> List[Dict[str, Any]]:
+        """Largest allocation sites of a snapshot"""
+        return [
+            {"site": self._site(stat), "size_bytes": stat.size, "count": stat.count}
+            for stat in record["snapshot"].statistics(group_by)[:limit]
+        ]
+
+    def diff(
+        self,
+        record: Dict[str, Any],
+        base: Dict[str, Any],
+        limit: int = 25,
+        group_by: str = "lineno"
+    ) -> List[Dict[str, Any]]:
+        """Allocation sites that grew or shrank most between ``base`` and ``record``"""
+        return [
+            {
+                "site": self._site(stat),
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in record["snapshot"].compare_to(base["snapshot"], group_by)[:limit]
+        ]
+
+
+class PeakMemory:
+    """
+    Peak RSS while a block runs, sampled every ``memory_sample_interval_s``
+    on a background thread (and the traced peak when tracemalloc is on)
+
+    The kernel's own high-water mark covers the whole process lifetime, so
+    it cannot tell one ingestion run from the previous ones.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.start_rss: Optional[int] = None
+        self.peak_rss: Optional[int] = None
+        self.end_rss: Optional[int] = None
+        self.traced_peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(settings.memory_sample_interval_s):
+            rss = rss_bytes()
+            if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+                self.peak_rss = rss
+
+    def __enter__(self) -> "PeakMemory":
+        self.start_rss = self.peak_rss = rss_bytes()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._thread = threading.Thread(target=self._sample, name=f"peak-memory-{self.label}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.end_rss = rss_bytes()
+        if self.end_rss is not None and (self.peak_rss is None or self.end_rss > self.peak_rss):
+            self.peak_rss = self.end_rss
+        if tracemalloc.is_tracing():
+            self.traced_peak = tracemalloc.get_traced_memory()[1]
+        logger.info(f"{self.label} memory: {self.describe()}")
+        return False
+
+    def describe(self) -> str:
+        if self.peak_rss is None:
+            return "RSS unavailable"
+        text = (f"peak RSS {self.peak_rss / 2**20:.1f} MiB "
+                f"(+{(self.peak_rss - self.start_rss) / 2**20:.1f} MiB over the start, "
+                f"{self.end_rss / 2**20:.1f} MiB at the end)")
+        if self.traced_peak is not None:
+            text += f", traced Python peak {self.traced_peak / 2**20:.1f} MiB"
+        return text
+
+    def to_dict(self) -> Dict[str, Optional[int]]:
+        return {
+            "start_rss_bytes": self.start_rss,
+            "peak_rss_bytes": self.peak_rss,
+            "end_rss_bytes": self.end_rss,
+            "traced_peak_bytes": self.traced_peak,
+        }
+
+
+# Global accounting and tracer; components register themselves where they are created
+memory_accounting = MemoryAccounting()
+allocation_tracer = AllocationTracer()
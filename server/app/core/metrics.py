@@ -0,0 +1,214 @@
+"""
+Lightweight in-process metrics: fixed-bucket histograms, counters and stage spans
+
+Everything is kept in memory and rendered in Prometheus text format by the
+``/metrics`` endpoint. ``span`` times a named pipeline stage into the stage
+histogram and, when a request has called ``start_stage_timings``, into that
+request's per-stage breakdown as well.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Tuple, Optional, Iterator
+
+# Seconds; spans from sub-millisecond vector search up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    """Shared label handling for counters and histograms"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last slot is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    labels = _format_labels(self.label_names, key, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {total:.6f}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric exposed on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics shared across the app
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "gunnergpt_stage_duration_seconds", "Time spent in each RAG pipeline stage", ("stage",)
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "gunnergpt_http_request_duration_seconds", "HTTP request latency by route", ("method", "path")
+)
+HTTP_REQUESTS = registry.counter(
+    "gunnergpt_http_requests_total", "HTTP requests by route and status code", ("method", "path", "status")
+)
+CACHE_HITS = registry.counter("gunnergpt_cache_hits_total", "Cache lookups that were served from cache", ("cache",))
+CACHE_MISSES = registry.counter("gunnergpt_cache_misses_total", "Cache lookups that missed", ("cache",))
+SHARED_CACHE_REQUESTS = registry.counter(
+    "gunnergpt_shared_cache_requests_total", "Shared cache tier reads and writes by outcome", ("cache", "op", "outcome")
+)
+CATEGORY_ROUTES = registry.counter(
+    "gunnergpt_category_routes_total", "Unscoped searches routed to their likeliest categories or searched in full", ("outcome",)
+)
+SHADOW_MIRRORS = registry.counter(
+    "gunnergpt_shadow_mirrors_total", "Live retrievals repeated against the shadow index, by outcome", ("outcome",)
+)
+FALLBACKS = registry.counter(
+    "gunnergpt_fallback_responses_total", "Chat responses served by the fallback path", ("reason",)
+)
+SESSION_RETRIEVALS = registry.counter(
+    "gunnergpt_session_retrievals_total", "Session chat retrievals, fresh or re-ranked from cached candidates", ("outcome",)
+)
+LLM_REQUESTS = registry.counter(
+    "gunnergpt_llm_requests_total", "LLM provider calls by outcome", ("provider", "outcome")
+)
+LLM_HEDGES = registry.counter(
+    "gunnergpt_llm_hedges_total", "Hedged LLM calls by which request answered first", ("winner",)
+)
+EXTRACTIVE_ANSWERS = registry.counter(
+    "gunnergpt_extractive_answers_total", "Chat answers assembled from retrieved sentences instead of the LLM", ("reason",)
+)
+DEADLINE_EXCEEDED = registry.counter(
+    "gunnergpt_deadline_exceeded_total", "Chat requests that ran out of deadline budget, by the stage that overran", ("stage",)
+)
+DEGRADED_RESPONSES = registry.counter(
+    "gunnergpt_degraded_responses_total", "Cheaper paths taken to keep chat requests within their deadline", ("action",)
+)
+RATE_LIMITED = registry.counter(
+    "gunnergpt_rate_limited_total", "Requests rejected with 429, by who enforced the limit", ("source",)
+)
+
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def start_stage_timings() -> Dict[str, float]:
+    """Begin collecting per-stage timings (ms) for the current request"""
+    timings: Dict[str, float] = {}
+    _stage_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a named pipeline stage into the stage histogram and the request's timings"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed * 1000, 3)
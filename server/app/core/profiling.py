@@ -0,0 +1,152 @@
+"""
+Opt-in per-request profiling
+
+A request is profiled when it carries ``X-Profile: 1`` together with a valid
+``X-Admin-Token``, or when it is picked by ``profiling_sample_rate``. The
+deterministic profiler (cProfile) runs around the wrapped call and the
+result is written as a pstats file, plus a JSON summary, into a bounded
+ring buffer on disk. When neither trigger applies the wrapper is a
+``nullcontext`` and costs nothing.
+
+cProfile observes the event loop thread, so work done by other requests
+while the profiled one is awaiting shows up too; only one request is
+profiled at a time to keep that noise down. Blocking calls moved to worker
+threads (the LLM call) appear as time spent waiting.
+"""
+
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import secrets
+import time
+import uuid
+from contextlib import asynccontextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from fastapi import Request
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-z_]+$")
+
+
+class RequestProfiler:
+    """Decides which requests to profile and manages the on-disk profile ring buffer"""
+
+    def __init__(self):
+        self._active = False
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.profiling_dir)
+
+    def _trigger(self, request: Request) -> Optional[str]:
+        if request.headers.get("x-profile") and settings.admin_token:
+            token = request.headers.get("x-admin-token", "")
+            if secrets.compare_digest(token.encode(), settings.admin_token.encode()):
+                return "header"
+        if settings.profiling_sample_rate > 0 and random.random() < settings.profiling_sample_rate:
+            return "sample"
+        return None
+
+    def maybe_profile(self, request: Request, label: str):
+        """Async context manager yielding a profile record dict, or ``None`` when not profiling"""
+        trigger = self._trigger(request)
+        if trigger is None or self._active:
+            return nullcontext()
+        return self._profile(label, trigger)
+
+    @asynccontextmanager
+    async def _profile(self, label: str, trigger: str):
+        self._active = True
+        record: Dict[str, Any] = {
+            "id": f"{int(time.time() * 1000)}_{label}_{uuid.uuid4().hex[:6]}",
+            "label": label,
+            "trigger": trigger,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield record
+        finally:
+            profiler.disable()
+            record["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            self._active = False
+            try:
+                await asyncio.to_thread(self._save, profiler, record)
+            except Exception as e:
+                logger.error(f"Failed to save profile {record['id']}: {e}")
+
+    def _save(self, profiler: cProfile.Profile, record: Dict[str, Any]):
+        """Write pstats and a JSON summary, then trim the ring buffer"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stats_path = self.directory / f"{record['id']}.prof"
+        profiler.dump_stats(str(stats_path))
+
+        stats = pstats.Stats(profiler)
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:15]
+        record["top_cumulative"] = [
+            {
+                "function": f"{Path(filename).name}:{line}({name})",
+                "calls": calls,
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, _, cumulative, _) in top
+        ]
+        record["size_bytes"] = stats_path.stat().st_size
+
+        with open(self.directory / f"{record['id']}.json", "w", encoding="utf-8") as f:
+            json.dump(record, f)
+
+        self._trim()
+        logger.info(f"Saved profile {record['id']} ({record['duration_ms']}ms, trigger={record['trigger']})")
+
+    def _trim(self):
+        summaries = sorted(self.directory.glob("*.json"))
+        for summary in summaries[:-settings.profiling_max_profiles or None]:
+            summary.unlink(missing_ok=True)
+            summary.with_suffix(".prof").unlink(missing_ok=True)
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Profile summaries, newest first"""
+        if not self.directory.exists():
+            return []
+
+        profiles = []
+        for summary in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                with open(summary, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            record.pop("top_cumulative", None)
+            profiles.append(record)
+        return profiles
+
+    def get_profile_path(self, profile_id: str) -> Optional[Path]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.prof"
+        return path if path.exists() else None
+
+    def render_profile(self, profile_id: str, limit: int = 40, sort: str = "cumulative") -> Optional[str]:
+        """Human-readable pstats report for a stored profile"""
+        path = self.get_profile_path(profile_id)
+        if path is None:
+            return None
+        buffer = io.StringIO()
+        pstats.Stats(str(path), stream=buffer).sort_stats(sort).print_stats(limit)
+        return buffer.getvalue()
+
+
+# Global profiler instance
+request_profiler = RequestProfiler()
@@ -1,78 +1,267 @@
 
-import logging
+import atexit
 import json
-from typing import List, Dict, Any
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..rag.results import RetrievedChunk
 
-# Configure a specific handler for this logger to ensure it prints to stdout
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("RAG_TRACE")
 
+LEVEL_OFF = "off"
+LEVEL_SUMMARY = "summary"
+LEVEL_TRACE = "trace"
+_LEVEL_RANKS = {LEVEL_OFF: 0, LEVEL_SUMMARY: 1, LEVEL_TRACE: 2}
+
+# Rank of the current request's trace: 0 when tracing is off or the request was not sampled
+_request_rank: ContextVar[int] = ContextVar("rag_trace_rank", default=0)
+_request_id: ContextVar[str] = ContextVar("rag_trace_request_id", default="")
+# Set for internal traffic (e.g. cache warm-up) that should never be traced
+_suppressed: ContextVar[bool] = ContextVar("rag_trace_suppressed", default=False)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks or formats on the caller's thread
+
+    Records carry their event dict untouched; formatting happens in the
+    listener thread. When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, default=str, ensure_ascii=False)
+
+
+class _PrettyFormatter(logging.Formatter):
+    """Human-readable step-by-step trace, used by the standalone pipeline runner"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = record.msg
+        name = event["event"]
+
+        if name == "query":
+            return f"\n{'=' * 80}\n\n🔍 INCOMING QUERY: {event['query']}\n\n{'=' * 80}\n"
+        if name == "step":
+            lines = [f"\n{'-' * 80}\n", f"🔄 STEP: {event['step']}"]
+            if event.get("description"):
+                lines.append(f"ℹ️  {event['description']}")
+            return "\n".join(lines) + "\n"
+        if name == "retrieval_start":
+            return (f"📡 RETRIEVAL STARTED\n   - Query Embedding Length: {event['embedding_dim']}\n"
+                    f"   - Requested Results: {event['n_results']}")
+        if name == "retrieved_documents":
+            lines = [f"\n📚 DOCUMENTS RETRIEVED: {event['count']}"]
+            for i, doc in enumerate(event["documents"]):
+                lines.append(f"   [{i + 1}] Source: {doc['source']}")
+                lines.append(f"       Similarity: {doc['similarity']} (Dist: {doc['distance']})")
+                if "preview" in doc:
+                    lines.append(f"       Preview: {doc['preview']}...")
+            return "\n".join(lines)
+        if name == "context_assembly":
+            text = f"\n🧩 CONTEXT ASSEMBLED ({event['token_estimate']} est. tokens)"
+            if "context" in event:
+                text += f"\n   --- BEGIN CONTEXT ---\n{event['context']}\n   --- END CONTEXT ---"
+            return text
+        if name == "llm_call":
+            return (f"\n🤖 LLM GENERATION REQUEST\n   - Model: {event['model']}\n"
+                    f"   - Prompt Length: {event['prompt_chars']} chars")
+        if name == "llm_response":
+            text = f"\n✨ LLM RESPONSE RECEIVED ({int(event['latency_ms'])}ms)"
+            if "response" in event:
+                text += f"\n   --- RESPONSE ---\n{event['response']}\n   --- END RESPONSE ---"
+            return text + f"\n\n{'=' * 80}\n"
+        if name == "error":
+            return f"\n❌ RAG ERROR: {event['message']}\n\n{'!' * 80}\n"
+        return json.dumps(event, default=str, ensure_ascii=False)
+
+
 class RAGLogger:
     """
-    Specialized logger for visualizing the RAG pipeline steps in the terminal.
-    Designed to provide "proof of work" by showing inputs, retrieval, and outputs.
+    Specialized logger for tracing the RAG pipeline steps.
+
+    Events are handed to a bounded queue and written by a background thread,
+    so the request path never blocks on console I/O. Verbosity is one of
+    ``off`` (nothing), ``summary`` (sizes, sources, scores and timings) or
+    ``trace`` (adds previews, assembled context and the full LLM response).
+    The sampling decision is made once per request in ``log_query``; with
+    tracing off or the request unsampled every call returns immediately.
     """
 
+    level: str = LEVEL_OFF
+    sample_rate: float = 1.0
+    _handler: Optional[_DroppingQueueHandler] = None
+    _listener: Optional[QueueListener] = None
+
+    @classmethod
+    def configure(
+        cls,
+        level: str = LEVEL_SUMMARY,
+        sample_rate: float = 1.0,
+        fmt: str = "json",
+        max_queue_size: int = 10000
+    ):
+        """(Re)configure verbosity, sampling and output format and start the writer thread"""
+        if level not in _LEVEL_RANKS:
+            raise ValueError(f"Unknown RAG trace level: {level}")
+
+        cls.shutdown()
+        cls.level = level
+        cls.sample_rate = max(0.0, min(1.0, sample_rate))
+        if level == LEVEL_OFF:
+            return
+
+        log_queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(_PrettyFormatter() if fmt == "pretty" else _JSONFormatter())
+
+        cls._handler = _DroppingQueueHandler(log_queue)
+        cls._listener = QueueListener(log_queue, stream_handler)
+        logger.handlers = [cls._handler]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        cls._listener.start()
+
+    @classmethod
+    def shutdown(cls):
+        """Drain pending events and stop the writer thread"""
+        if cls._listener is not None:
+            cls._listener.stop()
+            cls._listener = None
+        if cls._handler is not None:
+            logger.removeHandler(cls._handler)
+            cls._handler = None
+
+    @classmethod
+    def flush(cls):
+        """Block until every queued event has been written"""
+        if cls._listener is not None:
+            cls._listener.queue.join()
+
+    @classmethod
+    def dropped(cls) -> int:
+        return cls._handler.dropped if cls._handler else 0
+
     @staticmethod
-    def print_separator(char="=", length=80):
-        print(f"\n{char * length}\n")
+    def _emit(event: str, **fields):
+        payload = {"ts": round(time.time(), 3), "event": event, "request_id": _request_id.get()}
+        payload.update(fields)
+        logger.info(payload)
 
     @staticmethod
-    def log_step(step_name: str, description: str = ""):
-        RAGLogger.print_separator("-")
-        print(f"🔄 STEP: {step_name}")
-        if description:
-            print(f"ℹ️  {description}")
-        print("")
+    @contextmanager
+    def suppressed():
+        """Disable tracing for requests started inside this block"""
+        token = _suppressed.set(True)
+        try:
+            yield
+        finally:
+            _suppressed.reset(token)
 
     @staticmethod
     def log_query(query: str):
-        RAGLogger.print_separator("=")
-        print(f"🔍 INCOMING QUERY: {query}")
-        RAGLogger.print_separator("=")
+        """Start a request trace; decides whether this request is sampled"""
+        rank = 0 if _suppressed.get() else _LEVEL_RANKS[RAGLogger.level]
+        if rank and RAGLogger.sample_rate < 1.0 and random.random() >= RAGLogger.sample_rate:
+            rank = 0
+        _request_rank.set(rank)
+        if not rank:
+            return
+
+        _request_id.set(uuid.uuid4().hex[:12])
+        RAGLogger._emit("query", query=query)
+
+    @staticmethod
+    def log_step(step_name: str, description: str = ""):
+        if _request_rank.get() < 2:
+            return
+        RAGLogger._emit("step", step=step_name, description=description)
 
     @staticmethod
     def log_retrieval_start(query_embedding_len: int, n_results: int):
-        print(f"📡 RETRIEVAL STARTED")
-        print(f"   - Query Embedding Length: {query_embedding_len}")
-        print(f"   - Requested Results: {n_results}")
+        if _request_rank.get() < 2:
+            return
+        RAGLogger._emit("retrieval_start", embedding_dim=query_embedding_len, n_results=n_results)
 
     @staticmethod
-    def log_retrieved_documents(documents: List[Dict[str, Any]]):
-        print(f"\n📚 DOCUMENTS RETRIEVED: {len(documents)}")
-        for i, doc in enumerate(documents):
-            score = doc.get('distance', 'N/A')
-            similarity = f"{(1 - doc.get('distance', 1.0)):.4f}" if isinstance(score, (int, float)) else "N/A"
-            source = doc.get('metadata', {}).get('source', 'Unknown')
-            text_preview = doc.get('text', '')[:100].replace('\n', ' ')
-            
-            print(f"   [{i+1}] Source: {source}")
-            print(f"       Similarity: {similarity} (Dist: {score})")
-            print(f"       Preview: {text_preview}...")
+    def log_retrieved_documents(documents: List["RetrievedChunk"]):
+        rank = _request_rank.get()
+        if not rank:
+            return
+
+        summaries = []
+        for doc in documents:
+            distance = doc.distance
+            summary = {
+                "source": doc.source,
+                "distance": distance,
+                "similarity": round(1 - distance, 4) if isinstance(distance, (int, float)) else None,
+            }
+            if rank >= 2:
+                summary["preview"] = doc.text[:100].replace('\n', ' ')
+            summaries.append(summary)
+
+        RAGLogger._emit("retrieved_documents", count=len(documents), documents=summaries)
 
     @staticmethod
     def log_context_assembly(context: str, token_estimate: int):
-        print(f"\n🧩 CONTEXT ASSEMBLED ({token_estimate} est. tokens)")
-        print(f"   --- BEGIN CONTEXT ---")
-        # Print first 500 chars to avoid flooding if huge, or just print all if user wants full transparency
-        print(context[:1000] + ("..." if len(context) > 1000 else ""))
-        print(f"   --- END CONTEXT ---")
+        rank = _request_rank.get()
+        if not rank:
+            return
+
+        fields = {"token_estimate": token_estimate, "chars": len(context)}
+        if rank >= 2:
+            fields["context"] = context[:1000] + ("..." if len(context) > 1000 else "")
+        RAGLogger._emit("context_assembly", **fields)
 
     @staticmethod
     def log_llm_call(prompt_len: int, model: str):
-        print(f"\n🤖 LLM GENERATION REQUEST")
-        print(f"   - Model: {model}")
-        print(f"   - Prompt Length: {prompt_len} chars")
+        if not _request_rank.get():
+            return
+        RAGLogger._emit("llm_call", model=model, prompt_chars=prompt_len)
 
     @staticmethod
     def log_llm_response(response: str, latency_ms: float):
-        print(f"\n✨ LLM RESPONSE RECEIVED ({int(latency_ms)}ms)")
-        print(f"   --- RESPONSE ---")
-        print(response)
-        print(f"   --- END RESPONSE ---")
-        RAGLogger.print_separator("=")
+        rank = _request_rank.get()
+        if not rank:
+            return
+
+        fields = {"latency_ms": round(latency_ms, 1), "chars": len(response)}
+        if rank >= 2:
+            fields["response"] = response
+        RAGLogger._emit("llm_response", **fields)
 
     @staticmethod
     def log_error(error_msg: str):
-        print(f"\n❌ RAG ERROR: {error_msg}")
-        RAGLogger.print_separator("!")
+        # Errors are logged whenever tracing is on, regardless of sampling
+        if RAGLogger.level == LEVEL_OFF:
+            return
+        RAGLogger._emit("error", message=error_msg)
+
+
+atexit.register(RAGLogger.shutdown)
@@ -0,0 +1,341 @@
+"""
+Cache tier shared by every replica, behind the in-process caches
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from .config import settings
+from .metrics import SHARED_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+# Codecs
+
+class VectorCodec:
+    """float32 vectors as their raw bytes"""
+
+    def dumps(self, value: np.ndarray) -> bytes:
+        return np.asarray(value, dtype=np.float32).tobytes()
+
+    def loads(self, data: bytes) -> np.ndarray:
+        return np.frombuffer(data, dtype=np.float32)
+
+
+class JsonCodec:
+    """
+    Compact JSON, zlib-compressed above ``shared_cache_compress_min_bytes``
+
+    Subclasses convert their values to and from JSON-compatible data.
+    """
+
+    def to_json(self, value: Any) -> Any:
+        return value
+
+    def from_json(self, data: Any) -> Any:
+        return data
+
+    def dumps(self, value: Any) -> bytes:
+        raw = json.dumps(self.to_json(value), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        if len(raw) >= settings.shared_cache_compress_min_bytes:
+            return b"z" + zlib.compress(raw, 1)
+        return b"j" + raw
+
+    def loads(self, data: bytes) -> Any:
+        raw = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+        return self.from_json(json.loads(raw))
+
+
+class ModelCodec(JsonCodec):
+    """A pydantic model"""
+
+    def __init__(self, model_class):
+        self.model_class = model_class
+
+    def to_json(self, value) -> Any:
+        return value.model_dump(mode="json")
+
+    def from_json(self, data: Any):
+        return self.model_class.model_validate(data)
+
+
+# Backends
+
+class DiskCacheBackend:
+    """
+    SQLite file shared by the replicas on one host
+
+    Expired entries are skipped on read and pruned, with the oldest entries
+    beyond ``shared_cache_disk_max_entries``, every 1000 writes. SQLite calls
+    run on the backend's own threads so they never queue behind LLM calls in
+    the default executor.
+    """
+
+    name = "disk"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="shared-cache-disk")
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per worker thread; WAL lets readers in other processes run alongside a writer
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=settings.shared_cache_timeout_s, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def _set(self, key: str, value: bytes, ttl_s: Optional[float]):
+        connection = self._connection()
+        expires_at = time.time() + ttl_s if ttl_s else None
+        connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, value, expires_at))
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            connection.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            connection.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (settings.shared_cache_disk_max_entries,)
+            )
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl_s: Optional[float]):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._set, key, value, ttl_s)
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class RedisProtocolError(Exception):
+    """An error reply or malformed reply from a Redis-protocol server"""
+
+
+class RedisCacheBackend:
+    """
+    Any server speaking the Redis protocol (Redis, Valkey, KeyDB, ...)
+
+    A minimal RESP client over asyncio streams with a pool of idle
+    connections; only GET and SET with a PX expiry are used.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    @staticmethod
+    async def _read_reply(reader: asyncio.StreamReader) -> Any:
+        line = await reader.readuntil(b"\r\n")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise RedisProtocolError(payload.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return (await reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            count = int(payload)
+            return None if count < 0 else [await RedisCacheBackend._read_reply(reader) for _ in range(count)]
+        raise RedisProtocolError(f"Unexpected reply {line[:20]!r}")
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        for command in ([("AUTH", self.password)] if self.password else []) + ([("SELECT", self.db)] if self.db else []):
+            writer.write(self._encode(*command))
+            await self._read_reply(reader)
+        return reader, writer
+
+    async def _command(self, *args) -> Any:
+        # Connections belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._idle, self._loop = [], loop
+        connection = self._idle.pop() if self._idle else await self._connect()
+        reader, writer = connection
+        try:
+            writer.write(self._encode(*args))
+            reply = await self._read_reply(reader)
+        except BaseException:
+            # A timed-out or broken connection may still have a reply in flight
+            writer.close()
+            raise
+        if len(self._idle) < settings.shared_cache_pool_size:
+            self._idle.append(connection)
+        else:
+            writer.close()
+        return reply
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._command("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl_s: Optional[float]):
+        if ttl_s:
+            await self._command("SET", key, value, "PX", int(ttl_s * 1000))
+        else:
+            await self._command("SET", key, value)
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+
+def build_backend(name: str):
+    if name == "memory":
+        return None
+    if name == "disk":
+        return DiskCacheBackend(settings.shared_cache_path)
+    if name == "redis":
+        return RedisCacheBackend(settings.shared_cache_url)
+    raise ValueError(f"Unknown shared cache backend '{name}' (expected memory, disk or redis)")
+
+
+class SharedCache:
+    """
+    Fail-open front for the configured shared backend
+
+    Every operation is bounded by ``shared_cache_timeout_s``. Any error is
+    counted and treated as a miss, and the backend is then skipped for
+    ``shared_cache_retry_s``, so an outage costs at most one timeout per
+    retry interval and never fails a request. Writes run in the background.
+    With the ``memory`` backend there is no shared tier and every call is a
+    no-op.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self._configured = False
+        self._down_until = 0.0
+        self._pending: Set[asyncio.Task] = set()
+        self.last_error: Optional[str] = None
+
+    def configure(self, name: Optional[str] = None):
+        """(Re)select the backend; defaults to ``settings.shared_cache_backend``"""
+        name = name or settings.shared_cache_backend
+        self._configured = True
+        try:
+            self.backend = build_backend(name)
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to open the {name} shared cache, serving from in-process caches only: {e}")
+            self.backend = None
+        self._down_until = 0.0
+        logger.info(f"Shared cache backend: {self.backend.name if self.backend else 'none (memory)'}")
+
+    @property
+    def enabled(self) -> bool:
+        if not self._configured:
+            self.configure()
+        return self.backend is not None and time.monotonic() >= self._down_until
+
+    def key(self, namespace: str, scope: str, key: Hashable) -> str:
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
+        return f"{settings.shared_cache_prefix}:{namespace}:{scope}:{digest}"
+
+    def _failed(self, namespace: str, op: str, error: BaseException):
+        SHARED_CACHE_REQUESTS.inc(cache=namespace, op=op, outcome="error")
+        if time.monotonic() >= self._down_until:
+            logger.warning(
+                f"Shared cache {op} failed ({error!r}); skipping it for {settings.shared_cache_retry_s:.0f}s"
+            )
+        self.last_error = repr(error)
+        self._down_until = time.monotonic() + settings.shared_cache_retry_s
+
+    async def get(self, namespace: str, key: str, codec) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            data = await asyncio.wait_for(self.backend.get(key), settings.shared_cache_timeout_s)
+            value = codec.loads(data) if data is not None else None
+        except Exception as e:
+            self._failed(namespace, "get", e)
+            return None
+        SHARED_CACHE_REQUESTS.inc(cache=namespace, op="get", outcome="miss" if value is None else "hit")
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, codec, ttl_s: Optional[float]):
+        """Write ``value`` in the background"""
+        if not self.enabled:
+            return
+        task = asyncio.get_running_loop().create_task(self._set(namespace, key, value, codec, ttl_s))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _set(self, namespace: str, key: str, value: Any, codec, ttl_s: Optional[float]):
+        try:
+            await asyncio.wait_for(self.backend.set(key, codec.dumps(value), ttl_s), settings.shared_cache_timeout_s)
+        except Exception as e:
+            self._failed(namespace, "set", e)
+            return
+        SHARED_CACHE_REQUESTS.inc(cache=namespace, op="set", outcome="ok")
+
+    async def flush(self):
+        """Wait for background writes"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def close(self):
+        await self.flush()
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        if not self._configured:
+            self.configure()
+        return {
+            "backend": self.backend.name if self.backend else "memory",
+            "available": self.backend is not None and time.monotonic() >= self._down_until,
+            "pending_writes": len(self._pending),
+            "last_error": self.last_error,
+        }
+
+
+# Global shared tier, configured from settings on first use
+shared_cache = SharedCache()
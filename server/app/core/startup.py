@@ -3,10 +3,14 @@ Application startup and dependency injection
 """
 
 import os
+import json
 import logging
+from typing import Optional
 from sentence_transformers import SentenceTransformer
 import chromadb
 from .config import settings
+from .rag_logger import RAGLogger
+from .shared_cache import shared_cache
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, settings.log_level))
@@ -61,6 +65,13 @@ async def initialize_chroma_client():
 
 async def initialize_services():
     """Initialize all services"""
+    RAGLogger.configure(
+        level=settings.rag_trace_level,
+        sample_rate=settings.rag_trace_sample_rate,
+        fmt=settings.rag_trace_format
+    )
+    shared_cache.configure()
+    
     embedding_success = await initialize_embedding_model()
     chroma_success = await initialize_chroma_client()
     
@@ -83,6 +94,13 @@ async def initialize_services():
     return overall_success
 
 
+def load_embedding_model(name: str) -> SentenceTransformer:
+    """Load an embedding model other than the configured one (shadow builds, promoted indexes)"""
+    model = SentenceTransformer(name)
+    logger.info(f"Loaded embedding model: {name}")
+    return model
+
+
 def get_embedding_model():
     """Get the embedding model instance"""
     if embedding_model is None:
@@ -95,3 +113,112 @@ def get_chroma_collection():
     if collection is None:
         raise RuntimeError("Chroma collection not initialized")
     return collection
+
+
+def get_chroma_client():
+    """Get the Chroma client instance"""
+    if chroma_client is None:
+        raise RuntimeError("Chroma client not initialized")
+    return chroma_client
+
+
+def partition_collection_name(category: str) -> str:
+    """Name of the per-category partition collection"""
+    return f"{settings.collection_name}__{category}"
+
+
+def get_chroma_partitions() -> dict:
+    """Get existing per-category partition collections keyed by category"""
+    client = get_chroma_client()
+    prefix = partition_collection_name("")
+    partitions = {}
+    for item in client.list_collections():
+        name = item if isinstance(item, str) else item.name
+        if name.startswith(prefix):
+            partitions[name[len(prefix):]] = client.get_collection(name)
+    return partitions
+
+
+def delete_partition(category: str):
+    """Drop the partition collection for a category"""
+    get_chroma_client().delete_collection(partition_collection_name(category))
+
+
+def index_collection_name(version: str, category: Optional[str] = None) -> str:
+    """Name of a versioned index collection (or one of its category partitions)"""
+    name = f"{settings.collection_name}--{version}"
+    return f"{name}__{category}" if category else name
+
+
+def get_or_create_index_collection(version: str, category: Optional[str] = None):
+    """Get or create a collection belonging to an index version"""
+    metadata = {
+        "description": "Arsenal FC knowledge base for GunnerGPT",
+        "index_version": version,
+        "hnsw:space": "cosine"
+    }
+    if category:
+        metadata["category"] = category
+    return get_chroma_client().get_or_create_collection(
+        name=index_collection_name(version, category),
+        metadata=metadata
+    )
+
+
+def get_index_collection(version: str, category: Optional[str] = None):
+    """Open an existing collection belonging to an index version"""
+    return get_chroma_client().get_collection(index_collection_name(version, category))
+
+
+def delete_index_collection(version: str, category: Optional[str] = None):
+    """Drop a collection belonging to an index version"""
+    get_chroma_client().delete_collection(index_collection_name(version, category))
+
+
+def centroid_collection_name(version: str) -> str:
+    """Name of the collection holding an index version's category routing centroids"""
+    return f"{settings.collection_name}--{version}--centroids"
+
+
+def get_or_create_centroid_collection(version: str):
+    """Get or create the routing centroid collection of an index version"""
+    return get_chroma_client().get_or_create_collection(
+        name=centroid_collection_name(version),
+        metadata={"description": "GunnerGPT category routing centroids", "index_version": version}
+    )
+
+
+def get_centroid_collection(version: str):
+    """Open the routing centroid collection of an index version"""
+    return get_chroma_client().get_collection(centroid_collection_name(version))
+
+
+def delete_centroid_collection(version: str):
+    """Drop the routing centroid collection of an index version"""
+    get_chroma_client().delete_collection(centroid_collection_name(version))
+
+
+def _index_registry():
+    # Holds a single record whose document is the JSON alias state; the
+    # one-dimensional placeholder embedding only satisfies the collection API
+    return get_chroma_client().get_or_create_collection(
+        name=f"{settings.collection_name}--registry",
+        metadata={"description": "GunnerGPT index version registry"}
+    )
+
+
+def read_index_alias() -> Optional[dict]:
+    """Current index alias state, or None before the first versioned ingest"""
+    result = _index_registry().get(ids=["alias"], include=["documents"])
+    if not result or not result["ids"]:
+        return None
+    return json.loads(result["documents"][0])
+
+
+def write_index_alias(state: dict):
+    """Replace the index alias state in one write"""
+    _index_registry().upsert(
+        ids=["alias"],
+        documents=[json.dumps(state)],
+        embeddings=[[0.0]]
+    )
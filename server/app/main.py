@@ -2,7 +2,8 @@
 FastAPI application entrypoint
 """
 
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from slowapi import Limiter
@@ -11,7 +12,15 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from .core.config import settings
 from .core.startup import initialize_services
-from .api import health, chat
+from .rag.ingest import build_suggestion_index
+from .core.rag_logger import RAGLogger
+from .core.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, RATE_LIMITED
+from .services.warmup import cache_warmer
+from .services.ingestion import ingestion_manager
+from .services.llm_service import llm_service
+from .core.capture import traffic_capture
+from .core.shared_cache import shared_cache
+from .api import health, chat, chunks, suggest, metrics, admin
 
 
 @asynccontextmanager
@@ -19,8 +28,17 @@ async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
     # Startup
     await initialize_services()
+    await build_suggestion_index()
+    traffic_capture.start()
+    cache_warmer.start()
     yield
-    # Shutdown (if needed)
+    # Shutdown: stop ingestion and warm-ups, close LLM clients, then drain queued capture records, cache writes and trace events
+    await ingestion_manager.stop()
+    await cache_warmer.stop()
+    await llm_service.aclose()
+    await shared_cache.close()
+    traffic_capture.stop()
+    RAGLogger.shutdown()
 
 
 # Create FastAPI application
@@ -47,9 +65,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record per-route request counts, latency and 429s"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    # Label by route template to keep cardinality bounded
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    HTTP_REQUEST_DURATION.observe(elapsed, method=request.method, path=path)
+    HTTP_REQUESTS.inc(method=request.method, path=path, status=response.status_code)
+    if response.status_code == 429:
+        RATE_LIMITED.inc(source="api")
+
+    return response
+
+
 # Include routers
 app.include_router(health.router)
 app.include_router(chat.router)
+app.include_router(chunks.router)
+app.include_router(suggest.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
+
+# Scrapes should never count against (or be blocked by) the per-IP limit
+limiter.exempt(metrics.prometheus_metrics)
+# Chunk fetches follow every by-reference answer and are mostly served by HTTP caches
+limiter.exempt(chunks.get_chunk)
+limiter.exempt(chunks.get_chunk_batch)
+# Typeahead fires on every keystroke and is answered from memory
+limiter.exempt(suggest.suggest_terms)
 
 
 @app.get("/")
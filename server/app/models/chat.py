@@ -11,13 +11,46 @@ class QueryRequest(BaseModel):
     query: str = Field(..., description="The search query")
     n_results: int = Field(default=5, ge=1, le=20, description="Number of results to return")
     category: Optional[str] = Field(default="all", description="Category scope for retrieval")
+    mmr: bool = Field(default=False, description="Diversify results with maximal marginal relevance")
+    mmr_lambda: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="MMR relevance/diversity trade-off (1.0 = pure relevance)")
+    mmr_fetch_k: Optional[int] = Field(default=None, ge=1, le=100, description="Candidates fetched before MMR selection")
+    by_reference: bool = Field(default=False, description="Return source chunk ids and content hashes instead of their text (fetch text from /chunks)")
 
 
 class DocumentResult(BaseModel):
     """Model for a single document result"""
-    text: str = Field(..., description="The document text")
+    id: Optional[str] = Field(None, description="Chunk id, for GET /chunks/{id}")
+    text: Optional[str] = Field(None, description="The document text (omitted for by_reference requests)")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Document metadata")
     distance: Optional[float] = Field(None, description="Similarity distance")
+    content_hash: Optional[str] = Field(None, description="Chunk content hash (by_reference requests); pass as ?v= to GET /chunks/{id}")
+
+
+class ChunkResponse(BaseModel):
+    """Response model for a knowledge base chunk"""
+    id: str = Field(..., description="Chunk id")
+    text: str = Field(..., description="Chunk text")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="Chunk metadata")
+    content_hash: str = Field(..., description="Hash of the chunk text and metadata (also its ETag)")
+
+
+class Suggestion(BaseModel):
+    """Model for a single typeahead suggestion"""
+    term: str = Field(..., description="Suggested term as written in the knowledge base")
+    kind: str = Field(..., description="entity, season or phrase")
+    frequency: int = Field(..., description="Occurrences in the knowledge base")
+
+
+class SuggestResponse(BaseModel):
+    """Response model for typeahead suggestions"""
+    prefix: str = Field(..., description="The prefix that was completed")
+    suggestions: List[Suggestion] = Field(..., description="Matching terms, most frequent first")
+
+
+class ChunkBatchResponse(BaseModel):
+    """Response model for a batch chunk lookup"""
+    chunks: List[ChunkResponse] = Field(..., description="Chunks found, in request order")
+    missing: List[str] = Field(default_factory=list, description="Requested ids that do not exist")
 
 
 class QueryResponse(BaseModel):
@@ -31,6 +64,29 @@ class IngestResponse(BaseModel):
     """Response model for ingestion operations"""
     message: str = Field(..., description="Status message")
     chunks_ingested: int = Field(..., description="Number of chunks ingested")
+    job_id: Optional[str] = Field(None, description="Ingestion job id, for polling its status")
+
+
+class IngestJobStatus(BaseModel):
+    """Progress and outcome of an ingestion job"""
+    job_id: str = Field(..., description="Ingestion job id")
+    trigger: str = Field(..., description="What started the job")
+    status: str = Field(..., description="running, succeeded, failed or cancelled")
+    stage: str = Field(..., description="loading, chunking, embedding, indexing or done (the stage reached, if it stopped early)")
+    documents: int = Field(..., description="Knowledge base files loaded")
+    chunks_total: int = Field(..., description="Chunks to embed")
+    chunks_embedded: int = Field(..., description="Chunks embedded so far")
+    chunks_per_s: Optional[float] = Field(None, description="Embedding throughput")
+    eta_s: Optional[float] = Field(None, description="Estimated seconds until embedding completes")
+    cancel_requested: bool = Field(..., description="Whether cancellation was requested")
+    index_version: Optional[str] = Field(None, description="Index version built by the job")
+    shadow: bool = Field(False, description="Whether the job builds the shadow index instead of going live")
+    build: Optional[Dict[str, Any]] = Field(None, description="Embedding model and chunking the index is built with")
+    memory: Optional[Dict[str, Optional[int]]] = Field(None, description="Process RSS at the start, peak and end of the run, and the traced Python peak while tracemalloc is on")
+    error: Optional[str] = Field(None, description="Failure reason")
+    created_at: float = Field(..., description="Start time (Unix seconds)")
+    finished_at: Optional[float] = Field(None, description="End time (Unix seconds)")
+    duration_s: float = Field(..., description="Elapsed time")
 
 
 class HealthResponse(BaseModel):
@@ -46,6 +102,13 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="User message")
     context_length: int = Field(default=2000, ge=500, le=4000, description="Context length for RAG")
     category: str = Field(default="all", description="Category/scope for the query")
+    mmr: bool = Field(default=False, description="Diversify retrieved context with maximal marginal relevance")
+    mmr_lambda: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="MMR relevance/diversity trade-off (1.0 = pure relevance)")
+    mmr_fetch_k: Optional[int] = Field(default=None, ge=1, le=100, description="Candidates fetched before MMR selection")
+    by_reference: bool = Field(default=False, description="Return source chunk ids and content hashes instead of their text (fetch text from /chunks)")
+    session_id: Optional[str] = Field(default=None, max_length=128, description="Conversation id; follow-ups in a session are resolved against earlier turns")
+    deadline_ms: Optional[int] = Field(default=None, ge=100, le=120000, description="End-to-end latency budget (defaults to CHAT_DEADLINE_S); the pipeline degrades instead of overrunning it")
+    answer_mode: str = Field(default="generative", pattern="^(generative|extractive)$", description="'generative' (LLM) or 'extractive' (top retrieved sentences with sources, no LLM)")
 
 
 class ChatResponse(BaseModel):
@@ -54,3 +117,4 @@ class ChatResponse(BaseModel):
     sources: List[DocumentResult] = Field(..., description="Source documents used")
     query: str = Field(..., description="Original user query")
     evaluation_metrics: Optional[Dict[str, Any]] = Field(None, description="Performance evaluation metrics")
+    session_id: Optional[str] = Field(None, description="Conversation id, echoed from the request")
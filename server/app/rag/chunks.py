@@ -0,0 +1,53 @@
+"""
+Chunk lookup and content hashing for sources-by-reference responses
+"""
+
+import hashlib
+import json
+from typing import List, Dict, Any
+
+from ..core.cache import chunk_cache
+from ..models.chat import DocumentResult
+from .vectorstore import vector_store
+
+
+def content_hash(text: str, metadata: Dict[str, Any]) -> str:
+    """Stable hash of a chunk's text and metadata, used as its strong ETag"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(text.encode("utf-8"))
+    digest.update(json.dumps(metadata, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+async def get_chunks(ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Chunks of the live index version keyed by id, each with its ``content_hash``
+
+    Ids that do not exist are left out of the result.
+    """
+    index = await vector_store.live_version()
+    chunks: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for chunk_id in dict.fromkeys(ids):
+        cached = chunk_cache.get((index.version, chunk_id))
+        if cached is not None:
+            chunks[chunk_id] = cached
+        else:
+            missing.append(chunk_id)
+
+    if missing:
+        for doc in await vector_store.get_documents(missing, index):
+            doc["content_hash"] = content_hash(doc["text"], doc["metadata"])
+            chunks[doc["id"]] = doc
+            chunk_cache.set((index.version, doc["id"]), doc)
+    return chunks
+
+
+def as_reference(result: DocumentResult) -> DocumentResult:
+    """The by-reference form of a source: id, score, metadata and content hash, without the text"""
+    return DocumentResult(
+        id=result.id,
+        metadata=result.metadata,
+        distance=result.distance,
+        content_hash=content_hash(result.text, result.metadata)
+    )
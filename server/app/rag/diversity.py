@@ -0,0 +1,57 @@
+"""
+Maximal-marginal-relevance diversification of retrieved chunks
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+
+def mmr_select(
+    query_embedding: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+    duplicate_threshold: Optional[float] = None
+) -> List[int]:
+    """
+    Pick ``k`` candidate indices balancing relevance against redundancy
+
+    Each step selects the candidate maximising
+    ``lambda * sim(query, c) - (1 - lambda) * max(sim(c, selected))``.
+    The candidate similarity matrix is computed once and the running
+    max-similarity vector is updated in place, so each step is a single
+    vectorized argmax over the remaining candidates. Candidates at least
+    ``duplicate_threshold`` similar to an already selected chunk are skipped,
+    so fewer than ``k`` indices come back when the rest are near-duplicates.
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if candidates.ndim != 2 or not len(candidates) or k <= 0:
+        return []
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+
+    k = min(k, len(candidates))
+    selected = [int(np.argmax(relevance))]
+    max_similarity = pairwise[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        if duplicate_threshold is not None:
+            scores[max_similarity >= duplicate_threshold] = -np.inf
+        chosen = int(np.argmax(scores))
+        if scores[chosen] == -np.inf:
+            break
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(max_similarity, pairwise[chosen], out=max_similarity)
+
+    return selected
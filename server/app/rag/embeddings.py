@@ -2,44 +2,114 @@
 Embedding generation and management
 """
 
-from typing import List
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from ..core.startup import get_embedding_model
+from ..core.startup import get_embedding_model, load_embedding_model
+from ..core.cache import query_embedding_cache, normalize_query
+from ..core.config import settings
+from ..core.memory import memory_accounting, model_bytes
+from ..core.shared_cache import VectorCodec
 
 
 class EmbeddingService:
-    """Service for handling text embeddings"""
+    """
+    Service for handling text embeddings
+
+    ``model`` is the configured ``embedding_model_name``. Index versions
+    built with another model (a shadow build, or one promoted from it) are
+    embedded and queried with that model, loaded on first use into
+    ``models``.
+    """
     
     def __init__(self):
         self.model = None
+        self.models: Dict[str, Any] = {}
+        self._load_lock = threading.Lock()
     
     async def initialize(self):
         """Initialize the embedding model"""
         self.model = get_embedding_model()
     
-    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts"""
-        if self.model is None:
-            await self.initialize()
+    def _load(self, name: str):
+        with self._load_lock:
+            if name not in self.models:
+                self.models[name] = load_embedding_model(name)
+            return self.models[name]
+    
+    async def get_model(self, name: Optional[str] = None):
+        """The embedding model called ``name`` (default: the configured one)"""
+        if name is None or name == settings.embedding_model_name:
+            if self.model is None:
+                await self.initialize()
+            return self.model
+        model = self.models.get(name)
+        if model is None:
+            # Loading weights takes seconds; keep it off the event loop
+            model = await asyncio.to_thread(self._load, name)
+        return model
+    
+    def memory_bytes(self) -> Dict[str, Any]:
+        """Weight bytes of each loaded embedding model (tokenizers are not counted)"""
+        models = dict(self.models)
+        model = self.model
+        if model is None:
+            try:
+                model = get_embedding_model()
+            except RuntimeError:
+                pass
+        if model is not None:
+            models[settings.embedding_model_name] = model
+        memory: Dict[str, Any] = {name: model_bytes(model) for name, model in models.items()}
+        memory["total"] = sum(part["total"] for part in memory.values())
+        return memory
+    
+    async def generate_embeddings(
+        self,
+        texts: List[str],
+        show_progress_bar: bool = True,
+        model_name: Optional[str] = None
+    ) -> np.ndarray:
+        """Generate embeddings for a list of texts as a (n, dim) float32 array"""
+        model = await self.get_model(model_name)
         
-        embeddings = self.model.encode(
+        # Off the event loop: ingestion batches and extractive answers encode many texts
+        embeddings = await asyncio.to_thread(
+            model.encode,
             texts,
             normalize_embeddings=True,
-            show_progress_bar=True
+            show_progress_bar=show_progress_bar
         )
-        return embeddings.tolist()
+        # Keep the packed float32 array; Python float lists are ~10x larger
+        return np.asarray(embeddings, dtype=np.float32)
     
-    async def generate_query_embedding(self, query: str) -> List[float]:
-        """Generate embedding for a single query"""
-        if self.model is None:
-            await self.initialize()
+    async def generate_query_embedding(self, query: str, model_name: Optional[str] = None) -> np.ndarray:
+        """Generate embedding for a single query as a float32 vector"""
+        model_name = model_name or settings.embedding_model_name
+        key = (model_name, normalize_query(query))
+        cached = await query_embedding_cache.aget(key)
+        if cached is not None:
+            return cached
         
-        embedding = self.model.encode(
+        model = await self.get_model(model_name)
+        
+        # Off the event loop, so a request deadline can stop waiting for it
+        embedding = await asyncio.to_thread(
+            model.encode,
             [query],
             normalize_embeddings=True
         )
-        return embedding.tolist()[0]
+        embedding = np.asarray(embedding, dtype=np.float32)[0]
+        await query_embedding_cache.aset(key, embedding)
+        return embedding
 
 
 # Global embedding service instance
 embedding_service = EmbeddingService()
+
+# Query vectors are shared across replicas as raw float32 bytes; the model name is part of the key
+query_embedding_cache.share(VectorCodec(), settings.query_embedding_shared_ttl_s)
+
+memory_accounting.register("embedding_models", embedding_service.memory_bytes)
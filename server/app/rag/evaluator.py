@@ -13,6 +13,8 @@ import re
 from typing import List, Dict, Any
 from difflib import SequenceMatcher
 
+from .results import RetrievedChunk
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,7 +28,7 @@ class RAGEvaluator:
         self,
         query: str,
         response: str,
-        retrieved_docs: List[Dict[str, Any]]
+        retrieved_docs: List[RetrievedChunk]
     ) -> Dict[str, Any]:
         """
         Comprehensive evaluation of RAG response
@@ -75,7 +77,7 @@ class RAGEvaluator:
     def _detect_hallucination(
         self,
         response: str,
-        retrieved_docs: List[Dict[str, Any]]
+        retrieved_docs: List[RetrievedChunk]
     ) -> float:
         """
         Detect hallucination by measuring unsupported claims
@@ -92,7 +94,7 @@ class RAGEvaluator:
             return 0.0
         
         # Combine all retrieved document text
-        source_text = " ".join([doc.get('text', '') for doc in retrieved_docs])
+        source_text = " ".join([doc.text for doc in retrieved_docs])
         
         # Check each sentence for grounding in sources
         grounded_sentences = 0
@@ -116,7 +118,7 @@ class RAGEvaluator:
     def _calculate_grounding_score(
         self,
         response: str,
-        retrieved_docs: List[Dict[str, Any]]
+        retrieved_docs: List[RetrievedChunk]
     ) -> float:
         """
         Calculate how well the response is grounded in retrieved sources
@@ -127,7 +129,7 @@ class RAGEvaluator:
         if not response or not retrieved_docs:
             return 0.0
         
-        source_text = " ".join([doc.get('text', '') for doc in retrieved_docs])
+        source_text = " ".join([doc.text for doc in retrieved_docs])
         
         # Extract key phrases from response (n-grams)
         response_phrases = self._extract_key_phrases(response)
@@ -147,7 +149,7 @@ class RAGEvaluator:
     def _calculate_recall(
         self,
         query: str,
-        retrieved_docs: List[Dict[str, Any]]
+        retrieved_docs: List[RetrievedChunk]
     ) -> Dict[str, float]:
         """
         Calculate retrieval recall metrics
@@ -166,7 +168,7 @@ class RAGEvaluator:
         
         if n_results > 0:
             # Calculate average similarity (1 - distance)
-            similarities = [1 - doc.get('distance', 1.0) for doc in retrieved_docs]
+            similarities = [1 - doc.distance for doc in retrieved_docs]
             
             # Log top K similarities for transparency
             logger.info(f"Retrieval Trace - Top {n_results} Similarities: {[round(s, 3) for s in similarities]}")
@@ -218,7 +220,7 @@ class RAGEvaluator:
     def _count_source_usage(
         self,
         response: str,
-        retrieved_docs: List[Dict[str, Any]]
+        retrieved_docs: List[RetrievedChunk]
     ) -> int:
         """Count how many sources were actually used in the response"""
         if not retrieved_docs:
@@ -228,7 +230,7 @@ class RAGEvaluator:
         response_lower = response.lower()
         
         for doc in retrieved_docs:
-            doc_text = doc.get('text', '')
+            doc_text = doc.text
             # Check if significant chunks of the document appear in response
             doc_phrases = self._extract_key_phrases(doc_text)
             
@@ -0,0 +1,165 @@
+"""
+Extractive answers assembled from retrieved chunks without the LLM
+"""
+
+import hashlib
+import logging
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .embeddings import embedding_service
+from .results import RetrievedChunk
+from .suggest import STOPWORDS
+from ..core.cache import sentence_cache
+from ..core.config import settings
+from ..core.deadline import Deadline, DeadlineExceeded, bounded
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"“(])|\n+")
+_TERM_RE = re.compile(r"[a-z0-9][a-z0-9\-]+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of a chunk, dropping fragments cut off by chunk boundaries"""
+    sentences = []
+    for sentence in _SENTENCE_END_RE.split(text):
+        sentence = " ".join(sentence.split())
+        # A chunk can start mid-sentence (chunk overlap) or end without punctuation
+        if len(sentence) < settings.extractive_min_sentence_chars or not (sentence[0].isupper() or sentence[0].isdigit()):
+            continue
+        sentences.append(sentence)
+    return sentences
+
+
+def query_terms(text: str) -> set:
+    return {term for term in _TERM_RE.findall(text.lower()) if term not in STOPWORDS}
+
+
+def _sentence_key(doc: RetrievedChunk) -> Tuple[str, str]:
+    # A digest rather than hash(): stable across processes and restarts
+    return doc.id, hashlib.blake2b(doc.text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+async def _chunk_sentences(
+    documents: List[RetrievedChunk],
+    embed: bool,
+    deadline: Optional[Deadline] = None
+) -> Tuple[List[Tuple[int, str]], Optional[np.ndarray]]:
+    """
+    Every sentence with its document index, and their embeddings (one batch
+    for all uncached chunks; None if it does not finish within ``deadline``)
+    """
+    per_doc: List[Tuple[List[str], Optional[np.ndarray]]] = []
+    missing: List[int] = []
+    keys = [_sentence_key(doc) for doc in documents]
+    for position, doc in enumerate(documents):
+        cached = sentence_cache.get(keys[position])
+        if cached is not None and (cached[1] is not None or not embed):
+            per_doc.append(cached)
+        else:
+            per_doc.append((split_sentences(doc.text), None))
+            missing.append(position)
+
+    if embed and missing:
+        batch = [sentence for position in missing for sentence in per_doc[position][0]]
+        vectors = None
+        try:
+            if batch:
+                vectors = await bounded(deadline, "extractive_answer", embedding_service.generate_embeddings(
+                    batch, show_progress_bar=False
+                ))
+        except DeadlineExceeded:
+            # Out of budget: score the sentences by term overlap alone
+            embed = False
+
+    if embed and missing:
+        offset = 0
+        for position in missing:
+            sentences = per_doc[position][0]
+            entry = (sentences, vectors[offset:offset + len(sentences)] if vectors is not None else None)
+            offset += len(sentences)
+            per_doc[position] = entry
+            sentence_cache.set(keys[position], entry)
+
+    sentences = [(position, sentence) for position, (doc_sentences, _) in enumerate(per_doc) for sentence in doc_sentences]
+    if not embed or not sentences:
+        return sentences, None
+    return sentences, np.vstack([vectors for doc_sentences, vectors in per_doc if doc_sentences])
+
+
+async def extract_answer(
+    query: str,
+    documents: List[RetrievedChunk],
+    max_sentences: Optional[int] = None,
+    embed: bool = True,
+    deadline: Optional[Deadline] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Answer ``query`` with the best sentences of the retrieved chunks
+
+    Sentences are scored by cosine similarity to the query (one matrix
+    product over every sentence) blended with the share of query terms they
+    contain, plus a small bonus for higher-ranked chunks. Near-duplicate
+    sentences are skipped. With ``embed=False`` (no budget left) only term
+    overlap is used, as it is when embedding does not finish within
+    ``deadline``. Returns the answer text and the sentences used with
+    their sources, or None if nothing relevant was found.
+    """
+    max_sentences = max_sentences or settings.extractive_max_sentences
+    sentences, vectors = await _chunk_sentences(documents, embed, deadline)
+    if not sentences:
+        return None
+
+    terms = query_terms(query)
+    overlap = np.array([
+        len(terms & query_terms(sentence)) / len(terms) if terms else 0.0
+        for _, sentence in sentences
+    ], dtype=np.float32)
+    rank_bonus = np.array([
+        settings.extractive_rank_bonus * (1 - position / len(documents)) for position, _ in sentences
+    ], dtype=np.float32)
+
+    query_vector = None
+    if vectors is not None:
+        try:
+            query_vector = await bounded(deadline, "extractive_answer", embedding_service.generate_query_embedding(query))
+        except DeadlineExceeded:
+            vectors = None
+
+    weight = settings.extractive_lexical_weight
+    if vectors is not None:
+        similarity = vectors @ query_vector
+        scores = (1 - weight) * similarity + weight * overlap + rank_bonus
+    else:
+        similarity = None
+        scores = overlap + rank_bonus
+
+    selected: List[int] = []
+    for index in np.argsort(-scores):
+        if len(selected) >= max_sentences or scores[index] < settings.extractive_min_score:
+            break
+        if similarity is not None and selected:
+            if float(np.max(vectors[selected] @ vectors[index])) > settings.mmr_duplicate_threshold:
+                continue
+        elif any(sentences[index][1] == sentences[chosen][1] for chosen in selected):
+            continue
+        selected.append(int(index))
+
+    if not selected:
+        return None
+
+    used = []
+    for index in selected:
+        position, sentence = sentences[index]
+        doc = documents[position]
+        used.append({
+            "text": sentence,
+            "source": doc.source,
+            "chunk_id": doc.id,
+            "score": round(float(scores[index]), 4),
+        })
+    text = "\n\n".join(f"{item['text']} [{item['source']}]" for item in used)
+    return {"text": text, "sentences": used}
@@ -2,16 +2,76 @@
 Knowledge base ingestion functionality
 """
 
+import asyncio
 import logging
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import numpy as np
 from ..core.config import settings
+from ..core.cache import clear_knowledge_base_caches
 from .embeddings import embedding_service
-from .vectorstore import vector_store
+from .vectorstore import vector_store, index_fingerprint
+from .suggest import suggester
 
 logger = logging.getLogger(__name__)
 
 
+class IngestionCancelled(Exception):
+    """Raised at the next checkpoint after an ingestion was asked to stop"""
+
+
+class IngestProgress:
+    """
+    Stage and chunk counts of a running ingestion
+
+    Written by the ingestion and read from other threads; ``cancel`` is
+    honoured between embedding batches and before the index is built, so a
+    cancelled ingest never touches the live index.
+    """
+
+    def __init__(self):
+        self.stage = "pending"
+        self.documents = 0
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.embedding_started_at: Optional[float] = None
+        self.index_version: Optional[str] = None
+        self.build: Optional[Dict[str, Any]] = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def checkpoint(self, stage: Optional[str] = None):
+        """Stop here if cancellation was requested, otherwise enter ``stage``"""
+        if self._cancel.is_set():
+            raise IngestionCancelled(f"Ingestion cancelled during {self.stage}")
+        if stage:
+            self.stage = stage
+            logger.info(f"Ingestion stage: {stage}")
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Chunks embedded per second so far"""
+        if not self.embedding_started_at or not self.chunks_embedded:
+            return None
+        return self.chunks_embedded / max(time.monotonic() - self.embedding_started_at, 1e-6)
+
+    @property
+    def eta_s(self) -> Optional[float]:
+        """Seconds until embedding finishes, at the current throughput"""
+        throughput = self.throughput
+        if self.stage != "embedding" or not throughput:
+            return None
+        return (self.chunks_total - self.chunks_embedded) / throughput
+
+
 def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
     """Split text into overlapping character-based chunks"""
     chunks = []
@@ -27,6 +87,10 @@ def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
 
 async def load_documents() -> List[Dict[str, Any]]:
     """Load documents from the knowledge base directory"""
+    return await asyncio.to_thread(_read_documents)
+
+
+def _read_documents() -> List[Dict[str, Any]]:
     documents = []
     
     for txt_file in settings.kb_path.rglob("*.txt"):
@@ -52,15 +116,19 @@ async def load_documents() -> List[Dict[str, Any]]:
     return documents
 
 
-async def chunk_documents(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Chunk documents into semantic units"""
+async def chunk_documents(
+    documents: List[Dict[str, Any]],
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Chunk documents into semantic units (default: the configured chunking)"""
     chunked_documents = []
     
     for doc in documents:
         chunks = chunk_text(
             doc["text"], 
-            settings.chunk_size, 
-            settings.chunk_overlap
+            chunk_size or settings.chunk_size, 
+            settings.chunk_overlap if chunk_overlap is None else chunk_overlap
         )
         
         for i, chunk in enumerate(chunks):
@@ -75,18 +143,83 @@ async def chunk_documents(documents: List[Dict[str, Any]]) -> List[Dict[str, Any
     return chunked_documents
 
 
-async def ingest_knowledge_base() -> int:
-    """Main ingestion function"""
+async def embed_in_batches(texts: List[str], progress: IngestProgress, model_name: Optional[str] = None) -> np.ndarray:
+    """Embed chunk texts ``ingest_batch_size`` at a time, reporting progress between batches"""
+    batches = []
+    progress.embedding_started_at = time.monotonic()
+    for start in range(0, len(texts), settings.ingest_batch_size):
+        progress.checkpoint()
+        batch = texts[start:start + settings.ingest_batch_size]
+        batches.append(await embedding_service.generate_embeddings(
+            batch, show_progress_bar=False, model_name=model_name
+        ))
+        progress.chunks_embedded += len(batch)
+    return np.concatenate(batches) if batches else np.empty((0, 0), dtype=np.float32)
+
+
+async def resolve_build(
+    embedding_model: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Embedding model and chunking of the next index build
+
+    Unset values follow the live index, so a re-ingest after a promotion
+    keeps the promoted model; the configured values only seed the first
+    build (or one over an index built before fingerprinting).
+    """
+    live = (await vector_store.live_version()).fingerprint
+    build = {
+        "embedding_model": embedding_model or live.get("embedding_model") or settings.embedding_model_name,
+        "chunk_size": chunk_size or live.get("chunk_size") or settings.chunk_size,
+        "chunk_overlap": chunk_overlap if chunk_overlap is not None else live.get("chunk_overlap", settings.chunk_overlap),
+    }
+    configured = {
+        "embedding_model": settings.embedding_model_name,
+        "chunk_size": settings.chunk_size,
+        "chunk_overlap": settings.chunk_overlap,
+    }
+    if live and build != configured and not (embedding_model or chunk_size or chunk_overlap is not None):
+        logger.warning(
+            f"Rebuilding the live index with {build}, not the configured {configured}; "
+            f"build a shadow index with the new settings and promote it to switch"
+        )
+    return build
+
+
+async def ingest_knowledge_base(
+    progress: Optional[IngestProgress] = None,
+    embedding_model: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+    shadow: bool = False
+) -> int:
+    """
+    Main ingestion function
+
+    Builds a new index version and switches to it, or with ``shadow``
+    records it as the shadow index next to the live one. The embedding model
+    and chunking default to the live index's (see ``resolve_build``).
+    """
+    progress = progress or IngestProgress()
     try:
+        progress.build = build = await resolve_build(embedding_model, chunk_size, chunk_overlap)
+        
         # Load documents
+        progress.checkpoint("loading")
         documents = await load_documents()
+        progress.documents = len(documents)
         
         # Chunk documents
-        chunked_documents = await chunk_documents(documents)
+        progress.checkpoint("chunking")
+        chunked_documents = await chunk_documents(documents, build["chunk_size"], build["chunk_overlap"])
+        progress.chunks_total = len(chunked_documents)
         
         # Generate embeddings
+        progress.checkpoint("embedding")
         texts = [doc["text"] for doc in chunked_documents]
-        embeddings = await embedding_service.generate_embeddings(texts)
+        embeddings = await embed_in_batches(texts, progress, build["embedding_model"])
         
         # Prepare metadata and IDs
         metadatas = [
@@ -103,17 +236,77 @@ async def ingest_knowledge_base() -> int:
             for doc in chunked_documents
         ]
         
-        # Add to vector store
-        await vector_store.add_documents(
+        # Add to vector store; the new index version becomes live atomically,
+        # so past this point the ingest can no longer be cancelled
+        progress.checkpoint("indexing")
+        progress.index_version = await vector_store.add_documents(
             documents=texts,
             embeddings=embeddings,
             metadatas=metadatas,
-            ids=ids
+            ids=ids,
+            fingerprint=index_fingerprint(
+                build["embedding_model"], embeddings.shape[1], build["chunk_size"], build["chunk_overlap"]
+            ),
+            shadow=shadow
         )
+        # A shadow version's suggestions are kept ready for its promotion
+        await asyncio.to_thread(
+            suggester.build, [doc["text"] for doc in documents], progress.index_version, not shadow
+        )
+        if not shadow:
+            # Cached retrievals and answers describe the previous contents
+            clear_knowledge_base_caches()
         
-        logger.info(f"Successfully ingested {len(chunked_documents)} chunks")
+        progress.stage = "done"
+        logger.info(f"Successfully ingested {len(chunked_documents)} chunks{' into the shadow index' if shadow else ''}")
         return len(chunked_documents)
         
+    except IngestionCancelled:
+        logger.info(f"Ingestion cancelled after {progress.chunks_embedded}/{progress.chunks_total} chunks")
+        raise
     except Exception as e:
         logger.error(f"Ingestion failed: {e}")
         raise
+
+
+async def build_suggestion_index():
+    """Build the typeahead index from the knowledge base files (used at startup)"""
+    try:
+        documents = await load_documents()
+    except ValueError as e:
+        logger.warning(f"Suggestion index not built: {e}")
+        return
+    try:
+        # The files are what the live version was built from
+        version = (await vector_store.live_version()).version
+    except Exception as e:
+        logger.warning(f"Could not resolve the live index version for suggestions: {e}")
+        version = None
+    await asyncio.to_thread(suggester.build, [doc["text"] for doc in documents], version)
+
+
+async def sync_suggestion_index():
+    """
+    Point the typeahead index at the index version being served
+
+    Needed after every alias switch an ingest did not make here: a rollback,
+    a shadow promotion, or another replica's switch picked up on refresh.
+    A version whose index this process built is swapped back in; any other
+    is rebuilt from its stored chunks (overlapping chunks count a few
+    phrases twice, which only nudges their ranking).
+    """
+    try:
+        index = await vector_store.live_version()
+        if suggester.version == index.version or suggester.use_version(index.version):
+            return
+        async with _suggestion_rebuild:
+            if suggester.version != index.version:
+                texts = await vector_store.get_texts(index)
+                await asyncio.to_thread(suggester.build, texts, index.version)
+    except Exception as e:
+        # Suggestions are best-effort; keep serving the previous index
+        logger.warning(f"Suggestion index not synced with the live index version: {e}")
+
+
+# One rebuild at a time, however many /suggest requests notice the switch
+_suggestion_rebuild = asyncio.Lock()
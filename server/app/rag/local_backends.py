@@ -0,0 +1,429 @@
+"""
+Local, network-free stand-ins for the embedding model, Chroma client/collection, LLM client and Redis
+
+Used by the benchmark and load-test tooling so the retrieval pipeline can be
+exercised without Chroma Cloud, a Hugging Face model download, an
+inference API key or a Redis server.
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+from .quantization import CompressedIndex
+from ..core.memory import sampled_bytes
+from ..core.shared_cache import RedisCacheBackend
+
+
+class HashingEmbedder:
+    """
+    Deterministic bag-of-words embedder with the SentenceTransformer ``encode`` signature
+
+    Tokens and token bigrams are hashed into a fixed number of signed buckets.
+    It has no semantic understanding but is fast, stable across runs and good
+    enough to rank chunks that share vocabulary with the query.
+    """
+
+    _token_pattern = re.compile(r"\w+")
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        tokens = self._token_pattern.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 1 else -1.0
+            vector[(digest >> 1) % self.dimension] += sign
+        return vector
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        """Encode one sentence or a list of sentences into a float32 array"""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            embeddings[i] = self._embed_one(text)
+
+        if normalize_embeddings and len(texts):
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+
+def _matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the subset of Chroma's ``where`` syntax used by this project"""
+    if not where:
+        return True
+
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+
+    return True
+
+
+class InMemoryCollection:
+    """
+    In-process cosine-similarity collection mimicking the Chroma collection API
+
+    Implements ``add``, ``upsert``, ``get``, ``delete``, ``count`` and ``query`` with the
+    same argument names and nested-list result shapes that ``VectorStore``
+    relies on, so it can be dropped in wherever a Chroma collection is used.
+    Vectors are held in a ``CompressedIndex``; ``codec`` selects float32
+    (exact), float16, int8 or PQ storage.
+    """
+
+    def __init__(
+        self,
+        name: str = "in_memory",
+        metadata: Optional[Dict[str, Any]] = None,
+        codec: str = "float32",
+        rerank: bool = True,
+        oversample: Optional[int] = None
+    ):
+        self.name = name
+        self.metadata = metadata or {"hnsw:space": "cosine"}
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._index = CompressedIndex(codec=codec, rerank=rerank, oversample=oversample)
+
+    @property
+    def index(self) -> CompressedIndex:
+        return self._index
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def memory_bytes(self, sample: int = 256) -> Dict[str, int]:
+        """Vector index bytes plus the ids, documents and metadata, extrapolated from ``sample`` rows"""
+        vectors = self._index.memory_bytes()["total"]
+        rows = sampled_bytes(list(zip(self._ids, self._documents, self._metadatas)), sample)
+        return {"vectors": vectors, "documents": rows, "total": vectors + rows}
+
+    def add(
+        self,
+        ids: List[str],
+        embeddings: Any,
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Add documents with precomputed embeddings"""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids):
+            raise ValueError("Expected one embedding per id")
+
+        existing = set(self._ids)
+        duplicates = [doc_id for doc_id in ids if doc_id in existing]
+        if duplicates:
+            raise ValueError(f"IDs already exist in collection: {duplicates[:5]}")
+
+        # Store unit vectors so cosine similarity is a plain dot product
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+
+        self._index.add(vectors)
+        self._ids.extend(ids)
+        self._documents.extend(documents or [""] * len(ids))
+        self._metadatas.extend(metadatas or [{} for _ in ids])
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: Any,
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Replace documents that already exist and add the rest"""
+        self.delete(ids=ids)
+        self.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def _select(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> List[int]:
+        wanted = set(ids) if ids is not None else None
+        return [
+            i for i, doc_id in enumerate(self._ids)
+            if (wanted is None or doc_id in wanted) and _matches_where(self._metadatas[i], where)
+        ]
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Fetch documents by id and/or metadata filter"""
+        include = include or ["documents", "metadatas"]
+        indices = self._select(ids, where)
+
+        result: Dict[str, Any] = {"ids": [self._ids[i] for i in indices]}
+        result["documents"] = [self._documents[i] for i in indices] if "documents" in include else None
+        result["metadatas"] = [self._metadatas[i] for i in indices] if "metadatas" in include else None
+        result["embeddings"] = self._index.vectors(np.asarray(indices, dtype=np.int64)) if "embeddings" in include else None
+        return result
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None):
+        """Delete documents by id and/or metadata filter"""
+        doomed = set(self._select(ids, where))
+        if not doomed:
+            return
+
+        keep = [i for i in range(len(self._ids)) if i not in doomed]
+        self._ids = [self._ids[i] for i in keep]
+        self._documents = [self._documents[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+        self._index.keep(np.asarray(keep, dtype=np.int64))
+
+    def query(
+        self,
+        query_embeddings: Any,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Top-k cosine search, returning Chroma-shaped nested lists"""
+        include = include or ["documents", "metadatas", "distances"]
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        candidates = None if not where else np.asarray(self._select(None, where), dtype=np.int64)
+
+        result: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+        for query in queries:
+            top, similarities = self._index.search(query, n_results, candidates)
+            distances = 1.0 - similarities
+
+            result["ids"].append([self._ids[i] for i in top])
+            result["documents"].append([self._documents[i] for i in top])
+            result["metadatas"].append([self._metadatas[i] for i in top])
+            result["distances"].append(distances.tolist())
+            result["embeddings"].append(self._index.vectors(top))
+
+        for field in ("documents", "metadatas", "distances", "embeddings"):
+            if field not in include:
+                result[field] = None
+        return result
+
+
+class StubInferenceClient:
+    """
+    Drop-in for ``huggingface_hub.InferenceClient`` with configurable latency, output size and faults
+
+    ``chat.completions.create`` blocks for ``latency_s`` (plus optional jitter)
+    like the real client does inside ``asyncio.to_thread``, then answers with
+    ``output_tokens`` words lifted from the prompt's context so downstream
+    evaluation sees a realistically grounded response. A ``slow_rate`` share
+    of calls takes ``slow_latency_s`` instead (a latency tail), and
+    ``error_rate`` / ``rate_limit_rate`` shares fail with the messages the
+    real client raises. Faults are drawn from a seeded generator.
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.5,
+        output_tokens: int = 120,
+        jitter_s: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency_s: float = 5.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.latency_s = latency_s
+        self.output_tokens = output_tokens
+        self.jitter_s = jitter_s
+        self.slow_rate = slow_rate
+        self.slow_latency_s = slow_latency_s
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages: List[Dict[str, str]], **kwargs) -> Any:
+        with self._lock:
+            self._calls += 1
+            calls = self._calls
+            draw, slow_draw = self._rng.random(), self._rng.random()
+
+        delay = self.slow_latency_s if slow_draw < self.slow_rate else self.latency_s
+        if self.jitter_s:
+            # Deterministic sawtooth jitter keeps runs reproducible
+            delay += self.jitter_s * ((calls % 7) / 6.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        if draw < self.rate_limit_rate:
+            raise RuntimeError("429 Client Error: Too Many Requests")
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise RuntimeError("503 Server Error: Service Unavailable")
+
+        prompt = messages[-1]["content"] if messages else ""
+        context = prompt.split("Context:", 1)[-1].split("Question:", 1)[0]
+        words = context.split() or ["Arsenal"]
+        repeats = self.output_tokens // len(words) + 1
+        text = " ".join((words * repeats)[:self.output_tokens])
+
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class InMemoryClient:
+    """Minimal stand-in for a Chroma client holding named ``InMemoryCollection`` instances"""
+
+    def __init__(self, codec: str = "float32", rerank: bool = True, oversample: Optional[int] = None):
+        self._collections: Dict[str, InMemoryCollection] = {}
+        self._index_options = {"codec": codec, "rerank": rerank, "oversample": oversample}
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name=name, metadata=metadata, **self._index_options)
+        return self._collections[name]
+
+    def get_collection(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            raise ValueError(f"Collection {name} does not exist")
+        return self._collections[name]
+
+    def list_collections(self) -> List[InMemoryCollection]:
+        return list(self._collections.values())
+
+    def delete_collection(self, name: str):
+        if name not in self._collections:
+            raise ValueError(f"Collection {name} does not exist")
+        del self._collections[name]
+
+
+class LocalRedisServer:
+    """
+    In-memory server speaking the subset of the Redis protocol the shared cache uses
+
+    Listens on localhost (an ephemeral port by default) and answers PING,
+    GET, SET (with EX/PX), DEL, DBSIZE and FLUSHDB after ``latency_s``.
+    ``stall`` stops it answering while keeping connections open, and
+    ``stop`` closes them, so both kinds of cache outage can be exercised.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_s: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency_s = latency_s
+        self.stalled = False
+        self.commands = 0
+        self._data: Dict[bytes, tuple] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        self.stalled = False
+        if self._server is not None:
+            self._server.close()
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def stall(self, stalled: bool = True):
+        self.stalled = stalled
+
+    def _reply(self, value: Any) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return f"+{value}\r\n".encode("utf-8")
+
+    def _execute(self, args: List[bytes]) -> bytes:
+        command = args[0].upper()
+        now = time.monotonic()
+        if command == b"PING":
+            return self._reply("PONG")
+        if command == b"GET":
+            entry = self._data.get(args[1])
+            if entry is not None and entry[1] is not None and entry[1] <= now:
+                del self._data[args[1]]
+                entry = None
+            return self._reply(entry[0] if entry else None)
+        if command == b"SET":
+            expires_at = None
+            if len(args) >= 5 and args[3].upper() in (b"EX", b"PX"):
+                expires_at = now + int(args[4]) / (1 if args[3].upper() == b"EX" else 1000)
+            self._data[args[1]] = (args[2], expires_at)
+            return self._reply("OK")
+        if command == b"DEL":
+            return self._reply(sum(self._data.pop(key, None) is not None for key in args[1:]))
+        if command == b"DBSIZE":
+            return self._reply(len(self._data))
+        if command in (b"FLUSHDB", b"SELECT", b"AUTH"):
+            if command == b"FLUSHDB":
+                self._data.clear()
+            return self._reply("OK")
+        return f"-ERR unknown command '{command.decode()}'\r\n".encode("utf-8")
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections[asyncio.current_task()] = writer
+        try:
+            while True:
+                args = await RedisCacheBackend._read_reply(reader)
+                self.commands += 1
+                if self.latency_s:
+                    await asyncio.sleep(self.latency_s)
+                while self.stalled:
+                    await asyncio.sleep(0.01)
+                writer.write(self._execute(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(asyncio.current_task(), None)
+            writer.close()
@@ -0,0 +1,252 @@
+"""
+Compressed in-process vector storage
+
+``CompressedIndex`` keeps unit-normalized embeddings as float32, float16,
+scalar-quantized int8 or product-quantized (PQ) codes. Candidate search runs
+on the codes; when re-scoring is enabled the shortlist is re-ranked against
+the exact float32 vectors, which can live on disk (``np.memmap``) so only the
+codes stay resident.
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CODECS = ("float32", "float16", "int8", "pq")
+
+# Rows upcast to float32 per block when scoring float16/int8 codes; NumPy has
+# no BLAS kernel for either dtype, so a direct matmul is many times slower
+SCORE_BLOCK_ROWS = 4096
+
+# Default shortlist size (multiple of k) re-scored exactly for each codec; PQ
+# codes are coarse enough that the exact top-k sits deep in the approximate ranking
+DEFAULT_OVERSAMPLE = {"float32": 1, "float16": 2, "int8": 4, "pq": 25}
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Plain Lloyd's k-means; returns (k, dim) centroids"""
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; the first term is constant per row
+        distances = (centroids ** 2).sum(axis=1)[None, :] - 2.0 * data @ centroids.T
+        assignment = distances.argmin(axis=1)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        occupied = counts > 0
+        centroids[occupied] = sums[occupied] / counts[occupied, None]
+        # Re-seed empty clusters from random points
+        empty = np.flatnonzero(~occupied)
+        if empty.size:
+            centroids[empty] = data[rng.choice(len(data), size=empty.size, replace=False)]
+    return centroids
+
+
+class CompressedIndex:
+    """
+    Vector index over compressed codes with optional exact re-scoring
+
+    Args:
+        codec: ``float32`` (exact), ``float16``, ``int8`` or ``pq``
+        rerank: re-score the shortlist against full-precision vectors
+        oversample: shortlist size as a multiple of k when re-scoring
+            (defaults per codec, see ``DEFAULT_OVERSAMPLE``)
+        pq_subvectors: number of PQ sub-spaces (reduced to a divisor of the dimension if needed)
+        rerank_path: keep full-precision vectors in a memmap at this path
+    """
+
+    def __init__(
+        self,
+        codec: str = "float32",
+        rerank: bool = True,
+        oversample: Optional[int] = None,
+        pq_subvectors: int = 48,
+        rerank_path: Optional[Path] = None,
+        seed: int = 0
+    ):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.codec = codec
+        self.rerank = rerank and codec != "float32"
+        self.oversample = max(1, oversample or DEFAULT_OVERSAMPLE[codec])
+        self.pq_subvectors = pq_subvectors
+        self.rerank_path = Path(rerank_path) if rerank_path else None
+        self._rng = np.random.default_rng(seed)
+
+        self.dimension = 0
+        self._codes: Optional[np.ndarray] = None
+        self._full: Optional[np.ndarray] = None
+        self._int8_scale: Optional[np.ndarray] = None
+        self._pq_codebooks: Optional[np.ndarray] = None  # (m, ks, dsub)
+
+    def __len__(self) -> int:
+        return 0 if self._codes is None else len(self._codes)
+
+    # Encoding
+
+    def _train(self, vectors: np.ndarray):
+        if self.codec == "int8":
+            # Symmetric per-dimension scale; later vectors are clipped to the trained range
+            self._int8_scale = np.maximum(np.abs(vectors).max(axis=0), 1e-6) / 127.0
+        elif self.codec == "pq":
+            if self.dimension % self.pq_subvectors:
+                # Fall back to the largest sub-space count that divides the dimension
+                self.pq_subvectors = max(m for m in range(1, self.pq_subvectors + 1) if self.dimension % m == 0)
+            dsub = self.dimension // self.pq_subvectors
+            ks = min(256, len(vectors))
+            sample = vectors[self._rng.choice(len(vectors), size=min(len(vectors), 20000), replace=False)]
+            self._pq_codebooks = np.stack([
+                _kmeans(sample[:, j * dsub:(j + 1) * dsub], ks, iterations=15, rng=self._rng)
+                for j in range(self.pq_subvectors)
+            ]).astype(np.float32)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.codec == "float32":
+            return vectors
+        if self.codec == "float16":
+            return vectors.astype(np.float16)
+        if self.codec == "int8":
+            return np.clip(np.rint(vectors / self._int8_scale), -127, 127).astype(np.int8)
+
+        dsub = self.dimension // self.pq_subvectors
+        codes = np.empty((len(vectors), self.pq_subvectors), dtype=np.uint8)
+        for j, codebook in enumerate(self._pq_codebooks):
+            sub = vectors[:, j * dsub:(j + 1) * dsub]
+            distances = (codebook ** 2).sum(axis=1)[None, :] - 2.0 * sub @ codebook.T
+            codes[:, j] = distances.argmin(axis=1)
+        # Column-major so each sub-space lookup in ``_approximate_scores`` is contiguous
+        return np.asfortranarray(codes)
+
+    def _decode(self, codes: np.ndarray) -> np.ndarray:
+        if self.codec == "float32":
+            return codes
+        if self.codec == "float16":
+            return codes.astype(np.float32)
+        if self.codec == "int8":
+            return codes.astype(np.float32) * self._int8_scale
+        return np.concatenate([self._pq_codebooks[j][codes[:, j]] for j in range(self.pq_subvectors)], axis=1)
+
+    def _approximate_scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Dot-product scores computed directly on the codes"""
+        if self.codec == "float32":
+            return codes @ query
+        if self.codec in ("float16", "int8"):
+            # Fold the int8 per-dimension scale into the query instead of decoding every row
+            weights = query * self._int8_scale if self.codec == "int8" else query
+            scores = np.empty(len(codes), dtype=np.float32)
+            buffer = np.empty((min(len(codes), SCORE_BLOCK_ROWS), self.dimension), dtype=np.float32)
+            for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+                block = codes[start:start + SCORE_BLOCK_ROWS]
+                np.copyto(buffer[:len(block)], block)
+                scores[start:start + len(block)] = buffer[:len(block)] @ weights
+            return scores
+
+        # Asymmetric distance computation: one (m, ks) lookup table per query
+        dsub = self.dimension // self.pq_subvectors
+        table = np.einsum("mkd,md->mk", self._pq_codebooks, query.reshape(self.pq_subvectors, dsub))
+        scores = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.pq_subvectors):
+            scores += table[j][codes[:, j]]
+        return scores
+
+    # Storage
+
+    def _store_full(self, vectors: np.ndarray):
+        if not self.rerank:
+            return
+        combined = vectors if self._full is None else np.concatenate([np.asarray(self._full), vectors])
+        if self.rerank_path is None:
+            self._full = combined
+            return
+        self.rerank_path.parent.mkdir(parents=True, exist_ok=True)
+        memmap = np.memmap(self.rerank_path, dtype=np.float32, mode="w+", shape=combined.shape)
+        memmap[:] = combined
+        memmap.flush()
+        self._full = np.memmap(self.rerank_path, dtype=np.float32, mode="r", shape=combined.shape)
+
+    def add(self, vectors: np.ndarray):
+        """Add unit-normalized float32 vectors (codecs are trained on the first batch)"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or not len(vectors):
+            return
+        if self._codes is None:
+            self.dimension = vectors.shape[1]
+            self._train(vectors)
+            self._codes = self._encode(vectors)
+        else:
+            self._codes = np.concatenate([self._codes, self._encode(vectors)])
+        self._store_full(vectors)
+
+    def keep(self, indices: np.ndarray):
+        """Retain only the rows at ``indices`` (used for deletes)"""
+        if self._codes is None:
+            return
+        self._codes = self._codes[indices]
+        if self._full is not None:
+            remaining = np.asarray(self._full)[indices]
+            self._full = None
+            self._store_full(remaining)
+
+    def vectors(self, indices: np.ndarray) -> np.ndarray:
+        """Float32 vectors for the given rows (exact when a re-scoring store exists)"""
+        if self._codes is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self._full is not None:
+            return np.asarray(self._full[indices])
+        return self._decode(self._codes[indices])
+
+    # Search
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        candidates: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k by cosine similarity; returns (row indices, similarities)
+
+        ``candidates`` restricts the search to those rows (metadata filters).
+        """
+        if self._codes is None or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        rows = np.arange(len(self._codes)) if candidates is None else np.asarray(candidates, dtype=np.int64)
+        if rows.size == 0:
+            return rows, np.zeros(0, dtype=np.float32)
+
+        codes = self._codes if candidates is None else self._codes[rows]
+        if self.codec == "pq" and candidates is not None:
+            codes = np.asfortranarray(codes)
+        scores = self._approximate_scores(codes, query).astype(np.float32)
+
+        shortlist_size = min(rows.size, k * self.oversample if self.rerank else k)
+        shortlist = np.argpartition(-scores, shortlist_size - 1)[:shortlist_size]
+
+        if self.rerank:
+            shortlist_rows = rows[shortlist]
+            scores_shortlist = np.asarray(self._full[shortlist_rows]) @ query
+        else:
+            scores_shortlist = scores[shortlist]
+
+        top = min(k, shortlist_size)
+        order = np.argsort(-scores_shortlist)[:top]
+        return rows[shortlist[order]], scores_shortlist[order]
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Resident bytes for codes, codec parameters and the re-scoring store"""
+        codes = 0 if self._codes is None else int(self._codes.nbytes)
+        params = 0
+        if self._int8_scale is not None:
+            params += int(self._int8_scale.nbytes)
+        if self._pq_codebooks is not None:
+            params += int(self._pq_codebooks.nbytes)
+        rerank = 0
+        if self._full is not None and not isinstance(self._full, np.memmap):
+            rerank = int(self._full.nbytes)
+        return {"codes": codes, "codec_params": params, "rerank_store": rerank, "total": codes + params + rerank}
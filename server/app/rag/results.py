@@ -0,0 +1,84 @@
+"""
+Retrieved chunk objects shared by the retrieval, answering and evaluation stages
+"""
+
+from typing import List, Dict, Any, Optional
+
+from ..core.shared_cache import JsonCodec
+from ..models.chat import DocumentResult
+
+
+class RetrievedChunk:
+    """
+    One retrieval hit: chunk id, text, metadata and distance
+
+    Built once from the backend's result arrays and passed by reference
+    through the retrieval cache, sessions, context assembly, extraction and
+    evaluation, so it must not be modified after retrieval (``embedding`` is
+    the exception: MMR drops it once diversification is done).
+    """
+
+    __slots__ = ("id", "text", "metadata", "distance", "embedding", "_result")
+
+    def __init__(
+        self,
+        id: str,
+        text: str,
+        metadata: Dict[str, Any],
+        distance: float,
+        embedding: Optional[Any] = None
+    ):
+        self.id = id
+        self.text = text
+        self.metadata = metadata
+        self.distance = distance
+        self.embedding = embedding
+        self._result: Optional[DocumentResult] = None
+
+    @property
+    def source(self) -> str:
+        return self.metadata.get("source", "Unknown")
+
+    def to_result(self) -> DocumentResult:
+        """
+        The API model for this chunk
+
+        Built on first use and shared by every later response citing the
+        chunk (retrieval cache hits), so callers must not modify it.
+        """
+        if self._result is None:
+            # Validating is cheaper than ``model_construct`` on pydantic 2
+            self._result = DocumentResult(id=self.id, text=self.text, metadata=self.metadata, distance=self.distance)
+        return self._result
+
+    def __getstate__(self):
+        return (self.id, self.text, self.metadata, self.distance)
+
+    def __setstate__(self, state):
+        self.id, self.text, self.metadata, self.distance = state
+        self.embedding = self._result = None
+
+    def __repr__(self) -> str:
+        return f"RetrievedChunk(id={self.id!r}, source={self.source!r}, distance={self.distance:.4f})"
+
+
+class ChunkListCodec(JsonCodec):
+    """Retrieved chunks as ``[id, text, metadata, distance]`` rows for the shared cache tier"""
+
+    def to_json(self, chunks: List[RetrievedChunk]) -> Any:
+        return [[chunk.id, chunk.text, chunk.metadata, chunk.distance] for chunk in chunks]
+
+    def from_json(self, rows: Any) -> List[RetrievedChunk]:
+        return [RetrievedChunk(*row) for row in rows]
+
+
+def from_query_results(results: Dict[str, Any], include_embeddings: bool = False) -> List[RetrievedChunk]:
+    """Chunks for the first query of a Chroma ``query`` result, built straight from its column lists"""
+    if not results["ids"] or not results["ids"][0]:
+        return []
+    ids = results["ids"][0]
+    distances = results["distances"][0] if results.get("distances") else [0.0] * len(ids)
+    columns = [ids, results["documents"][0], results["metadatas"][0], distances]
+    if include_embeddings:
+        columns.append(results["embeddings"][0])
+    return list(map(RetrievedChunk, *columns))
@@ -3,36 +3,126 @@ Document retrieval functionality
 """
 
 import logging
-from typing import List, Dict, Any
+import time
+from typing import List, Optional
+import numpy as np
 from .embeddings import embedding_service
-from .vectorstore import vector_store
+from .vectorstore import vector_store, IndexVersion
+from .diversity import mmr_select
+from .results import RetrievedChunk, ChunkListCodec
+from .shadow import shadow_mirror
+from ..core.config import settings
+from ..core.metrics import span
+from ..core.cache import retrieval_cache, normalize_query
+from ..core.deadline import Deadline, bounded
 
 logger = logging.getLogger(__name__)
 
+# Shared per index version: a replica that has not switched yet keeps its own entries
+retrieval_cache.share(ChunkListCodec(), scope=vector_store.serving_version)
 
-async def retrieve_documents(query: str, n_results: int = 5, category: str = "all") -> List[Dict[str, Any]]:
+
+async def retrieve_documents(
+    query: str,
+    n_results: int = 5,
+    category: str = "all",
+    mmr: bool = False,
+    mmr_lambda: Optional[float] = None,
+    mmr_fetch_k: Optional[int] = None,
+    deadline: Optional[Deadline] = None,
+    index: Optional[IndexVersion] = None
+) -> List[RetrievedChunk]:
     """
     Retrieve relevant documents for a given query
     
     Args:
         query: The search query
         n_results: Number of results to return
-        category: Category scope for retrieval
+        category: Category scope for retrieval; "all" is routed to the likeliest
+            categories when ``settings.category_routing_enabled`` is set
+        mmr: Over-fetch candidates and pick a diverse top-k with maximal marginal relevance
+        mmr_lambda: Relevance/diversity trade-off (defaults to ``settings.mmr_lambda``)
+        mmr_fetch_k: Candidates fetched before selection (defaults to ``settings.mmr_fetch_k``)
+        deadline: Request budget; embedding and search each get what is left of it and
+            raise ``DeadlineExceeded`` on overrun
+        index: Index version to search (default: the live one), e.g. the one a response's ETag names
         
     Returns:
-        List of retrieved documents with metadata
+        Retrieved chunks, best first. They are shared with the retrieval cache
+        and must not be modified.
     """
+    fetch_k = max(n_results, mmr_fetch_k or settings.mmr_fetch_k)
+    mmr_lambda = settings.mmr_lambda if mmr_lambda is None else mmr_lambda
+    route = settings.category_routing_enabled and category == "all"
+    
     try:
-        # Generate query embedding
-        query_embedding = await embedding_service.generate_query_embedding(query)
+        # Embed with the model the serving index was built with, and search that same index
+        index = index or await bounded(deadline, "index_version", vector_store.live_version())
+        # Keyed by version, so a replica that picks up a new alias never serves the old version's results
+        cache_key = (
+            index.version, normalize_query(query), n_results, category, route,
+            mmr, mmr_lambda if mmr else None, fetch_k if mmr else None
+        )
+        cached = await retrieval_cache.aget(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        start = time.perf_counter()
+        with span("query_embedding"):
+            query_embedding = await bounded(
+                deadline, "query_embedding", embedding_service.generate_query_embedding(query, index.embedding_model)
+            )
+        embedded = time.perf_counter()
         
         # Query vector store with category filter
         # Note: vector_store.query now returns a list of formatted documents directly
-        formatted_results = await vector_store.query(query_embedding, n_results, category=category)
+        if not mmr:
+            with span("vector_search"):
+                formatted_results = await bounded(deadline, "vector_search", vector_store.query(
+                    query_embedding, n_results, category=category, route=route, index=index
+                ))
+            shadow_mirror.maybe_mirror(query, n_results, category, route, formatted_results, {
+                "embedding": (embedded - start) * 1000,
+                "search": (time.perf_counter() - embedded) * 1000,
+            })
+        else:
+            with span("vector_search"):
+                candidates = await bounded(deadline, "vector_search", vector_store.query(
+                    query_embedding, fetch_k, category=category, include_embeddings=True, route=route, index=index
+                ))
+            with span("diversification"):
+                formatted_results = _diversify(
+                    query_embedding,
+                    candidates,
+                    n_results,
+                    mmr_lambda
+                )
         
         logger.info(f"Retrieved {len(formatted_results)} documents for query: {query[:50]}...")
+        await retrieval_cache.aset(cache_key, list(formatted_results))
         return formatted_results
         
     except Exception as e:
         logger.error(f"Document retrieval failed: {e}")
         raise
+
+
+def _diversify(
+    query_embedding: np.ndarray,
+    candidates: List[RetrievedChunk],
+    n_results: int,
+    lambda_mult: float
+) -> List[RetrievedChunk]:
+    """Select a diverse top-k from over-fetched candidates and drop their vectors"""
+    if len(candidates) <= n_results or any(doc.embedding is None for doc in candidates):
+        selected = candidates[:n_results]
+    else:
+        embeddings = np.stack([np.asarray(doc.embedding, dtype=np.float32) for doc in candidates])
+        indices = mmr_select(
+            query_embedding, embeddings, n_results, lambda_mult, settings.mmr_duplicate_threshold
+        )
+        selected = [candidates[i] for i in indices]
+
+    for doc in candidates:
+        doc.embedding = None
+    return selected
@@ -0,0 +1,106 @@
+"""
+Category routing of unscoped queries with per-category centroids
+"""
+
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster unit vectors by cosine similarity
+
+    Seeded deterministically by farthest-point selection starting from the
+    chunk closest to the mean, so re-ingesting the same corpus yields the same
+    centroids. Returns the unit-length centroids and the size of each cluster.
+    """
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    k = max(1, min(k, len(vectors)))
+    mean = _normalize(vectors.mean(axis=0))
+
+    seeds = [int(np.argmax(vectors @ mean))]
+    closest = vectors @ vectors[seeds[0]]
+    while len(seeds) < k:
+        seeds.append(int(np.argmin(closest)))
+        closest = np.maximum(closest, vectors @ vectors[seeds[-1]])
+    centroids = vectors[seeds]
+
+    assignment = np.zeros(len(vectors), dtype=np.int64)
+    for iteration in range(iterations):
+        updated = np.argmax(vectors @ centroids.T, axis=1)
+        if iteration and np.array_equal(updated, assignment):
+            break
+        assignment = updated
+        for cluster in range(k):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = _normalize(members.sum(axis=0))
+
+    return centroids, np.bincount(assignment, minlength=k)
+
+
+def compute_centroids(
+    embeddings: List[List[float]],
+    metadatas: List[Dict[str, Any]],
+    per_category: int
+) -> Dict[str, np.ndarray]:
+    """Up to ``per_category`` unit-length cluster centroids for each category of the chunks"""
+    groups: Dict[str, List[int]] = {}
+    for i, metadata in enumerate(metadatas):
+        groups.setdefault(metadata.get("category", "uncategorized"), []).append(i)
+
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    return {
+        category: spherical_kmeans(vectors[indices], per_category)[0]
+        for category, indices in groups.items()
+    }
+
+
+def category_probabilities(
+    query_embedding: List[float],
+    centroids: Dict[str, np.ndarray],
+    temperature: float
+) -> Dict[str, float]:
+    """
+    How likely each category is to hold the answer
+
+    A category scores the cosine similarity of its closest centroid; the
+    scores go through a softmax at ``temperature``.
+    """
+    categories = list(centroids)
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+    scores = np.array([float(np.max(centroids[category] @ query)) for category in categories])
+    weights = np.exp((scores - scores.max()) / max(temperature, 1e-6))
+    probabilities = weights / weights.sum()
+    return dict(zip(categories, probabilities.tolist()))
+
+
+def route_query(
+    query_embedding: List[float],
+    centroids: Dict[str, np.ndarray],
+    confidence: float,
+    max_categories: int,
+    temperature: float
+) -> Tuple[Optional[List[str]], Dict[str, float]]:
+    """
+    The fewest likeliest categories covering ``confidence`` of the probability
+
+    Returns None for the categories (search everything) when no
+    ``max_categories`` of them are that likely, along with the probabilities.
+    """
+    if len(centroids) < 2:
+        return None, {}
+    probabilities = category_probabilities(query_embedding, centroids, temperature)
+    ranked = sorted(probabilities, key=probabilities.get, reverse=True)
+
+    covered = 0.0
+    for count, category in enumerate(ranked[:max_categories], start=1):
+        covered += probabilities[category]
+        if covered >= confidence:
+            return ranked[:count], probabilities
+    return None, probabilities
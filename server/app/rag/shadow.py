@@ -0,0 +1,136 @@
+"""
+Mirroring of live retrievals to the shadow index
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Set
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.metrics import SHADOW_MIRRORS
+from .embeddings import embedding_service
+from .results import RetrievedChunk
+from .vectorstore import vector_store, IndexVersion
+
+logger = logging.getLogger(__name__)
+
+
+def _overlap(live: List[str], shadow: List[str]) -> float:
+    return len(set(live) & set(shadow)) / len(set(live)) if live else 1.0
+
+
+class ShadowMirror:
+    """
+    Replays a sample of live retrievals against the shadow index
+
+    ``shadow_mirror_rate`` of the retrievals that reach the vector store are
+    repeated in the background with the shadow version's embedding model.
+    Each comparison records both sides' embedding and search latency and the
+    overlap of their top-k chunk ids and sources (chunk ids only line up when
+    the chunking is unchanged). The response never waits for the mirror, and
+    mirrors beyond ``shadow_mirror_max_in_flight`` are skipped rather than
+    queued. Comparisons are kept per shadow version, the most recent
+    ``shadow_mirror_samples`` of them.
+    """
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._samples: deque = deque(maxlen=settings.shadow_mirror_samples)
+        self._pending: Set[asyncio.Task] = set()
+
+    def maybe_mirror(
+        self,
+        query: str,
+        n_results: int,
+        category: str,
+        route: bool,
+        live_documents: List[RetrievedChunk],
+        live_timings_ms: Dict[str, float]
+    ):
+        """Schedule a comparison for this retrieval if it is sampled"""
+        shadow = vector_store.shadow
+        if shadow is None or random.random() >= settings.shadow_mirror_rate:
+            return
+        if len(self._pending) >= settings.shadow_mirror_max_in_flight:
+            SHADOW_MIRRORS.inc(outcome="skipped")
+            return
+        task = asyncio.get_running_loop().create_task(
+            self._mirror(shadow, query, n_results, category, route, live_documents, live_timings_ms)
+        )
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _mirror(
+        self,
+        shadow: IndexVersion,
+        query: str,
+        n_results: int,
+        category: str,
+        route: bool,
+        live_documents: List[RetrievedChunk],
+        live_timings_ms: Dict[str, float]
+    ):
+        try:
+            start = time.perf_counter()
+            embedding = await embedding_service.generate_query_embedding(query, shadow.embedding_model)
+            embedded = time.perf_counter()
+            documents = await vector_store.query(embedding, n_results, category=category, route=route, index=shadow)
+            searched = time.perf_counter()
+        except Exception as e:
+            SHADOW_MIRRORS.inc(outcome="error")
+            logger.warning(f"Shadow mirror against {shadow.version} failed: {e}")
+            return
+
+        SHADOW_MIRRORS.inc(outcome="ok")
+        if shadow.version != self.version:
+            self.reset(shadow.version)
+        self._samples.append({
+            "live_embedding_ms": live_timings_ms["embedding"],
+            "live_search_ms": live_timings_ms["search"],
+            "shadow_embedding_ms": (embedded - start) * 1000,
+            "shadow_search_ms": (searched - embedded) * 1000,
+            "id_overlap": _overlap([doc.id for doc in live_documents], [doc.id for doc in documents]),
+            "source_overlap": _overlap([doc.source for doc in live_documents], [doc.source for doc in documents]),
+        })
+
+    def reset(self, version: Optional[str] = None):
+        """Forget the comparisons (they belong to one shadow version)"""
+        self.version = version
+        self._samples = deque(maxlen=settings.shadow_mirror_samples)
+
+    async def flush(self):
+        """Wait for mirrors in flight"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def summary(self) -> Dict[str, Any]:
+        """Latency percentiles and mean top-k overlap of the recorded comparisons"""
+        samples = list(self._samples)
+        summary: Dict[str, Any] = {
+            "shadow_version": self.version,
+            "mirror_rate": settings.shadow_mirror_rate,
+            "comparisons": len(samples),
+            "in_flight": len(self._pending),
+        }
+        if not samples:
+            return summary
+        for side in ("live", "shadow"):
+            summary[f"{side}_ms"] = {
+                stage: {
+                    f"p{q}": round(float(np.percentile([s[f"{side}_{stage}_ms"] for s in samples], q)), 3)
+                    for q in (50, 95)
+                }
+                for stage in ("embedding", "search")
+            }
+        summary["id_overlap"] = round(float(np.mean([s["id_overlap"] for s in samples])), 4)
+        summary["source_overlap"] = round(float(np.mean([s["source_overlap"] for s in samples])), 4)
+        return summary
+
+
+# Global shadow mirror instance
+shadow_mirror = ShadowMirror()
@@ -0,0 +1,299 @@
+"""
+Typeahead suggestions from knowledge base terms
+"""
+
+import heapq
+import logging
+import re
+import sys
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from ..core.config import settings
+from ..core.memory import memory_accounting
+
+logger = logging.getLogger(__name__)
+
+# Words that never start or end a key phrase, and never form an entity on their own
+STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been before being below
+between both but by can could did do does doing down during each either few for from further had has
+have having he her here hers him his how however i if in into is it its itself just may might more
+most much must my no nor not of off on once only or other our out over own per rather same she should
+since so some such than that the their them then there these they this those through thus to too
+under until up upon very was we were what when where whether which while who whom why will with
+within without would yet you your
+""".split())
+
+# Words (mostly verbs and adverbs) that make poor phrase boundaries on top of the stopwords
+_PHRASE_EDGE_NOISE = STOPWORDS | frozenset("""
+allow allowing allows become becomes becoming enable enabled enables enabling ensure ensures ensuring
+help helping helps make makes making often particularly provide provides providing remain remains
+still typically used using while
+""".split())
+
+# Sentence-initial capitalised words that are not names
+_CAPITALISED_NOISE = frozenset("""
+additionally although among born defensively despite during following furthermore however
+in-possession instead meanwhile moreover offensively off out overall rather several since
+statistically tactically throughout together under unlike within
+""".split())
+
+_ENTITY_RE = re.compile(r"\b[A-ZÀ-ÖØ-Þ][\w'’\-]*(?:\s+[A-ZÀ-ÖØ-Þ][\w'’\-]*){0,3}")
+_SEASON_RE = re.compile(r"\b((?:19|20)\d{2})\s*[-/–]\s*((?:19|20)?\d{2})\b")
+_LOWERCASE_RUN_RE = re.compile(r"(?<=\s)(?:[a-zß-ÿ][a-zß-ÿ\-]+\s+)+")
+_POSSESSIVE_RE = re.compile(r"['’]s\b")
+_FOLD = str.maketrans({"ø": "o", "æ": "ae", "œ": "oe", "ß": "ss", "ð": "d", "þ": "th", "ł": "l"})
+
+
+def normalize_term(text: str) -> str:
+    """Lookup form of a term or prefix: lowercase, accents folded, single spaces"""
+    text = unicodedata.normalize("NFKD", text.lower().translate(_FOLD))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.split())
+
+
+def extract_terms(texts: Iterable[str], min_phrase_count: int = 2) -> List[Tuple[str, str, int]]:
+    """
+    Entities, seasons and frequent key phrases with their corpus frequency
+
+    Entities are runs of capitalised words ("Bukayo Saka", "Hale End"),
+    seasons are year spans normalised to ``2023-24``, and key phrases are
+    2-3 word lowercase n-grams that neither start nor end with a stopword
+    and occur at least ``min_phrase_count`` times. Returns
+    ``(display, kind, frequency)`` tuples.
+    """
+    counts: Dict[Tuple[str, str], int] = Counter()
+    surfaces: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+    lowercase_words: Counter = Counter()
+
+    def add(kind: str, display: str):
+        key = (kind, normalize_term(display))
+        counts[key] += 1
+        surfaces[key][display] += 1
+
+    for text in texts:
+        text = _POSSESSIVE_RE.sub("", text)
+
+        for match in _SEASON_RE.finditer(text):
+            start, end = match.groups()
+            add("season", f"{start}-{end[-2:]}")
+
+        for match in _ENTITY_RE.finditer(text):
+            words = match.group(0).split()
+            # Drop leading sentence-initial noise ("The", "However", ...)
+            while words and (words[0].lower() in STOPWORDS or words[0].lower() in _CAPITALISED_NOISE):
+                words = words[1:]
+            if words:
+                add("entity", " ".join(words))
+
+        for sentence in re.split(r"[.!?;:,()\n]", text):
+            # Capitalised words belong to entities, so phrases are built from lowercase runs only
+            for run in _LOWERCASE_RUN_RE.findall(" " + sentence + " "):
+                words = run.split()
+                lowercase_words.update(words)
+                for size in (2, 3):
+                    for i in range(len(words) - size + 1):
+                        gram = words[i:i + size]
+                        if gram[0] in _PHRASE_EDGE_NOISE or gram[-1] in _PHRASE_EDGE_NOISE:
+                            continue
+                        add("phrase", " ".join(gram))
+
+    named = {key for kind, key in counts if kind != "phrase"}
+    terms = []
+    for (kind, key), count in counts.items():
+        if kind == "phrase" and (count < min_phrase_count or key in named):
+            continue
+        # Single capitalised words are only names if they recur and are not
+        # just ordinary words starting a sentence ("Pressing ...")
+        if kind == "entity" and " " not in key and (count < 2 or lowercase_words[key] >= count):
+            continue
+        display = surfaces[(kind, key)].most_common(1)[0][0]
+        terms.append((display, kind, count))
+    return terms
+
+
+class PrefixIndex:
+    """
+    Frequency-ranked prefix lookup over a sorted key array
+
+    Every term is indexed under its full normalised form and under each
+    later word ("saka" finds "Bukayo Saka"). A prefix selects a contiguous
+    key range by binary search. Prefixes matching more than ``dense_range``
+    keys (short, common ones) have their top results precomputed, so no
+    lookup scans more than ``dense_range`` keys.
+    """
+
+    def __init__(self, terms: List[Tuple[str, str, int]], top_k: int = 10, dense_range: int = 64):
+        self.top_k = top_k
+        self.dense_range = dense_range
+        # Most frequent first, so term ids double as rank and ties stay stable
+        terms = sorted(terms, key=lambda term: (-term[2], term[0]))
+        self.displays = [display for display, _, _ in terms]
+        self.kinds = [kind for _, kind, _ in terms]
+        self.frequencies = [frequency for _, _, frequency in terms]
+
+        # Names (entities and seasons) by lookup form, for finding them in free text
+        self.named: Dict[str, int] = {}
+        for term_id, (display, kind) in enumerate(zip(self.displays, self.kinds)):
+            if kind != "phrase":
+                self.named.setdefault(normalize_term(display), term_id)
+
+        entries = []
+        for term_id, display in enumerate(self.displays):
+            words = normalize_term(display).split()
+            for i in range(len(words)):
+                entries.append((" ".join(words[i:]), term_id))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.term_ids = [term_id for _, term_id in entries]
+        self._dense: Dict[str, List[int]] = {}
+        self._precompute()
+
+    def _top(self, lo: int, hi: int, limit: int) -> List[int]:
+        # Term ids are ranks, so the best results are the smallest distinct ids
+        return heapq.nsmallest(limit, set(self.term_ids[lo:hi]))
+
+    def _precompute(self):
+        """Store top results for every prefix matching more than ``dense_range`` keys"""
+        stack = [(0, len(self.keys), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            start = lo
+            while start < hi:
+                key = self.keys[start]
+                if len(key) <= depth:
+                    # The key is the parent prefix itself
+                    start += 1
+                    continue
+                prefix = key[:depth + 1]
+                end = bisect_left(self.keys, prefix + "\uffff", start, hi)
+                if end - start > self.dense_range:
+                    self._dense[prefix] = self._top(start, end, self.top_k)
+                    stack.append((start, end, depth + 1))
+                start = end
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[int]:
+        """Term ids matching ``prefix``, most frequent first"""
+        prefix = normalize_term(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, self.top_k)
+        dense = self._dense.get(prefix)
+        if dense is not None:
+            return dense[:limit]
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        return self._top(lo, hi, limit)
+
+    def __len__(self) -> int:
+        return len(self.displays)
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the index structures"""
+        lists = (self.displays, self.kinds, self.frequencies, self.keys, self.term_ids)
+        total = sum(sys.getsizeof(values) for values in lists)
+        total += sum(sys.getsizeof(key) for key in self.keys) + sum(sys.getsizeof(display) for display in self.displays)
+        total += sys.getsizeof(self._dense) + sum(sys.getsizeof(ids) for ids in self._dense.values())
+        total += sys.getsizeof(self.named)
+        return total
+
+
+class Suggester:
+    """
+    The prefix index for the knowledge base being served
+
+    Ingestion builds a new index from the documents of every new index
+    version; on startup it is built from ``kb_path``. Lookups read a single
+    reference, so a rebuild swaps in atomically. The indexes of the last few
+    versions (as many as are kept for rollback) stay in memory, so an alias
+    switch back to one of them is a swap rather than a rebuild.
+    """
+
+    def __init__(self):
+        self.index: Optional[PrefixIndex] = None
+        self.version: Optional[str] = None
+        self._versions: "OrderedDict[str, PrefixIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, texts: Iterable[str], version: Optional[str] = None, activate: bool = True) -> PrefixIndex:
+        """Build the index of ``version``; with ``activate=False`` (a shadow build) it is only kept for later"""
+        terms = extract_terms(texts, settings.suggest_min_phrase_count)
+        index = PrefixIndex(terms, top_k=settings.suggest_max_results)
+        with self._lock:
+            if version is not None:
+                self._versions[version] = index
+                self._versions.move_to_end(version)
+                # The live version, the ones kept for rollback and a shadow
+                while len(self._versions) > settings.index_keep_versions + 2:
+                    self._versions.popitem(last=False)
+            if activate:
+                self.index = index
+                self.version = version
+        logger.info(f"Built suggestion index: {len(index)} terms ({version or 'knowledge base files'})")
+        return index
+
+    def use_version(self, version: str) -> bool:
+        """Serve the kept index of ``version``; False if it was never built here (or has been dropped)"""
+        with self._lock:
+            index = self._versions.get(version)
+            if index is None:
+                return False
+            self._versions.move_to_end(version)
+            self.index = index
+            self.version = version
+        logger.info(f"Switched suggestion index to {version}")
+        return True
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        index = self.index
+        if index is None:
+            return []
+        return [
+            {"term": index.displays[term_id], "kind": index.kinds[term_id], "frequency": index.frequencies[term_id]}
+            for term_id in index.suggest(prefix, limit)
+        ]
+
+    def find_names(self, text: str, max_words: int = 4) -> List[str]:
+        """Known entities and seasons mentioned in ``text``, longest match first, in order of appearance"""
+        index = self.index
+        if index is None:
+            return []
+        words = normalize_term(_POSSESSIVE_RE.sub("", text)).replace("?", " ").replace(",", " ").split()
+        words = [word.strip(".!;:()\"'") for word in words]
+        found: List[str] = []
+        i = 0
+        while i < len(words):
+            for size in range(min(max_words, len(words) - i), 0, -1):
+                term_id = index.named.get(" ".join(words[i:i + size]))
+                if term_id is not None:
+                    if index.displays[term_id] not in found:
+                        found.append(index.displays[term_id])
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self.index
+            retained = list(self._versions.values())
+        if index is not None and all(index is not kept for kept in retained):
+            retained.append(index)
+        return {
+            "version": self.version,
+            "terms": len(index) if index else 0,
+            "keys": len(index.keys) if index else 0,
+            "versions_kept": len(retained),
+            "memory_bytes": sum(kept.memory_bytes() for kept in retained),
+        }
+
+
+# Global suggester instance
+suggester = Suggester()
+
+memory_accounting.register("suggest_index", lambda: suggester.stats()["memory_bytes"])
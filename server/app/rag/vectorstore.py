@@ -2,101 +2,679 @@
 Vector store abstraction for ChromaDB
 """
 
+import asyncio
+import hashlib
+import json
+import time
+import uuid
 from typing import List, Dict, Any, Optional
 import logging
-from ..core.startup import get_chroma_collection
+import numpy as np
+from ..core.startup import (
+    get_chroma_collection, get_chroma_partitions, delete_partition,
+    get_or_create_index_collection, get_index_collection, delete_index_collection,
+    get_or_create_centroid_collection, get_centroid_collection, delete_centroid_collection,
+    read_index_alias, write_index_alias
+)
 from ..core.config import settings
+from ..core.memory import memory_accounting
+from ..core.metrics import CATEGORY_ROUTES
 from ..core.rag_logger import RAGLogger
+from .results import RetrievedChunk, from_query_results
+from .routing import compute_centroids, route_query
 
 logger = logging.getLogger(__name__)
 
+# Version name recorded for the pre-versioning layout (base collection and ``__<category>`` partitions)
+LEGACY_VERSION = "legacy"
+
+
+FINGERPRINT_FIELDS = ("embedding_model", "embedding_dim", "chunk_size", "chunk_overlap", "fingerprint")
+
+
+def index_fingerprint(embedding_model: str, embedding_dim: int, chunk_size: int, chunk_overlap: int) -> Dict[str, Any]:
+    """What an index version was built with; its ``fingerprint`` hash changes whenever they do"""
+    build = {
+        "embedding_model": embedding_model,
+        "embedding_dim": int(embedding_dim),
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+    }
+    digest = hashlib.blake2b(json.dumps(build, sort_keys=True).encode("utf-8"), digest_size=6).hexdigest()
+    return {**build, "fingerprint": digest}
+
+
+class IndexVersion:
+    """
+    One immutable build of the knowledge base index
+
+    Either a single collection queried with a metadata filter, or one
+    collection per category. Queries hold a reference to the version that
+    was live when they started, so switching the alias never affects a
+    query in flight. ``centroids`` holds the category routing centroids
+    computed when the version was built (none for versions built before
+    routing, which are always searched in full). ``fingerprint`` records the
+    embedding model and chunking it was built with; queries against it must
+    be embedded with that model.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        collection=None,
+        partitions: Optional[Dict[str, Any]] = None,
+        centroids: Optional[Dict[str, np.ndarray]] = None,
+        fingerprint: Optional[Dict[str, Any]] = None
+    ):
+        self.version = version
+        self.collection = collection
+        self.partitions = partitions or {}
+        self.centroids = centroids or {}
+        self.fingerprint = fingerprint or {}
+
+    @property
+    def embedding_model(self) -> str:
+        # Versions built before fingerprinting used the configured model
+        return self.fingerprint.get("embedding_model") or settings.embedding_model_name
+
+    @property
+    def partitioned(self) -> bool:
+        return bool(self.partitions)
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """
+        Bytes this process holds for the version: in-process collections and
+        the routing centroids (Chroma collections keep their vectors in the
+        server, so they count as 0)
+        """
+        collections = list(self.partitions.values()) or [self.collection]
+        vectors = documents = 0
+        for collection in collections:
+            estimate = getattr(collection, "memory_bytes", None)
+            if estimate is not None:
+                part = estimate()
+                vectors += part["vectors"]
+                documents += part["documents"]
+        centroids = sum(int(category_centroids.nbytes) for category_centroids in self.centroids.values())
+        return {"vectors": vectors, "documents": documents, "centroids": centroids,
+                "total": vectors + documents + centroids}
+
+    def count(self) -> int:
+        if self.partitions:
+            return sum(partition.count() for partition in self.partitions.values())
+        return self.collection.count()
+
 
 class VectorStore:
-    """Abstraction layer for ChromaDB vector operations"""
-    
-    def __init__(self):
+    """
+    Abstraction layer for ChromaDB vector operations
+
+    With ``partition_by_category`` enabled, each ``arsenal_kb`` category is
+    stored in its own collection: scoped queries search only their partition
+    and ``category="all"`` fans out across partitions concurrently and merges
+    the top-k. Otherwise a single collection is queried with a metadata filter.
+
+    Ingestion is blue/green: each ingest builds a new index version in fresh
+    collections, validates it, then switches the alias record every replica
+    reads. Retired versions stay available for rollback until they are
+    garbage-collected ``index_gc_grace_s`` after retirement.
+
+    Each version also stores a few centroids per category. With
+    ``category_routing_enabled``, a ``category="all"`` query is restricted to
+    the one or two categories its embedding is closest to when they are
+    likely enough, and searches everything otherwise.
+
+    Every version is tagged with the embedding model and chunking it was
+    built with. A shadow version (built with a candidate model while the live
+    one keeps serving) is recorded in the alias next to the live one, opened
+    by every replica as ``shadow`` so live queries can be mirrored to it, and
+    promoted by the same alias switch as any ingest.
+    """
+
+    def __init__(self, partitioned: Optional[bool] = None):
         self.collection = None
-    
+        self.active: Optional[IndexVersion] = None
+        self.shadow: Optional[IndexVersion] = None
+        self.partitioned = settings.partition_by_category if partitioned is None else partitioned
+        self._alias_checked_at = 0.0
+
+    @property
+    def partitions(self) -> Dict[str, Any]:
+        """Category partitions of the version being served"""
+        return self.active.partitions if self.active else {}
+
+    def serving_version(self) -> Optional[str]:
+        """Version name of the index being served, None before the store is initialized"""
+        return self.active.version if self.active else None
+
     async def initialize(self):
         """Initialize the vector store connection"""
         self.collection = get_chroma_collection()
-    
-    async def add_documents(
+        self.active = None
+        self._refresh_alias()
+
+    # Index versions
+
+    def _legacy_version(self, partitioned: bool) -> IndexVersion:
+        partitions = {}
+        if partitioned:
+            try:
+                partitions = get_chroma_partitions()
+            except Exception as e:
+                logger.warning(f"Failed to load category partitions: {e}")
+        return IndexVersion(LEGACY_VERSION, collection=self.collection, partitions=partitions)
+
+    def _open_version(self, version: str, info: Dict[str, Any]) -> IndexVersion:
+        """Open the collections of a recorded index version"""
+        if version == LEGACY_VERSION:
+            return self._legacy_version(info.get("partitioned", False))
+        centroids = self._load_centroids(version) if info.get("centroids") else None
+        fingerprint = {key: info[key] for key in FINGERPRINT_FIELDS if key in info}
+        if info.get("partitioned"):
+            return IndexVersion(version, partitions={
+                category: get_index_collection(version, category) for category in info["categories"]
+            }, centroids=centroids, fingerprint=fingerprint)
+        return IndexVersion(
+            version, collection=get_index_collection(version), centroids=centroids, fingerprint=fingerprint
+        )
+
+    def _load_centroids(self, version: str) -> Dict[str, np.ndarray]:
+        # Without its centroids a version is still served, just never routed
+        try:
+            result = get_centroid_collection(version).get(include=["embeddings", "metadatas"])
+        except Exception as e:
+            logger.warning(f"Failed to load routing centroids of index version {version}: {e}")
+            return {}
+        groups: Dict[str, List[Any]] = {}
+        for embedding, metadata in zip(result["embeddings"], result["metadatas"]):
+            groups.setdefault(metadata["category"], []).append(embedding)
+        return {category: np.asarray(vectors, dtype=np.float32) for category, vectors in groups.items()}
+
+    def _write_centroids(self, version: str, centroids: Dict[str, np.ndarray]):
+        rows = [(category, i, vector) for category, vectors in centroids.items() for i, vector in enumerate(vectors)]
+        get_or_create_centroid_collection(version).add(
+            ids=[f"{category}:{i}" for category, i, _ in rows],
+            documents=[category for category, _, _ in rows],
+            embeddings=[vector.tolist() for _, _, vector in rows],
+            metadatas=[{"category": category} for category, _, _ in rows]
+        )
+
+    def _drop_version(self, version: str, info: Dict[str, Any]):
+        """Delete the collections of an index version"""
+        if version == LEGACY_VERSION:
+            # The base collection belongs to startup; only legacy partitions are dropped
+            categories = list(get_chroma_partitions()) if info.get("partitioned") else []
+            drop = delete_partition
+        else:
+            categories = (info.get("categories") or []) if info.get("partitioned") else [None]
+            drop = lambda category: delete_index_collection(version, category)
+
+        for category in categories:
+            try:
+                drop(category)
+            except Exception as e:
+                logger.warning(f"Failed to delete collection of index version {version}: {e}")
+
+        if info.get("centroids"):
+            try:
+                delete_centroid_collection(version)
+            except Exception as e:
+                logger.warning(f"Failed to delete routing centroids of index version {version}: {e}")
+
+    def _refresh_alias(self):
+        """Serve the version the alias points at (the legacy layout before the first versioned ingest)"""
+        self._alias_checked_at = time.monotonic()
+        try:
+            state = read_index_alias()
+        except Exception as e:
+            logger.warning(f"Failed to read index alias: {e}")
+            state = None
+
+        if not state:
+            if self.active is None:
+                self.active = self._legacy_version(self.partitioned)
+            return
+
+        self._refresh_shadow(state)
+        live = state["live"]
+        if self.active is not None and self.active.version == live:
+            return
+        try:
+            self.active = self._open_version(live, state["versions"][live])
+            logger.info(f"Serving index version {live}")
+        except Exception as e:
+            logger.error(f"Failed to open index version {live}: {e}")
+            if self.active is None:
+                self.active = self._legacy_version(self.partitioned)
+
+    def _refresh_shadow(self, state: Dict[str, Any]):
+        shadow = state.get("shadow")
+        if shadow is None or shadow not in state["versions"]:
+            self.shadow = None
+        elif self.shadow is None or self.shadow.version != shadow:
+            try:
+                self.shadow = self._open_version(shadow, state["versions"][shadow])
+                logger.info(f"Opened shadow index version {shadow}")
+            except Exception as e:
+                # Mirroring is optional; serving never depends on the shadow
+                logger.warning(f"Failed to open shadow index version {shadow}: {e}")
+                self.shadow = None
+
+    async def _maybe_refresh_alias(self):
+        # Pick up switches made by other replicas without reading the alias on every query
+        if time.monotonic() - self._alias_checked_at >= settings.index_alias_refresh_s:
+            await asyncio.to_thread(self._refresh_alias)
+
+    def _alias_state(self) -> Dict[str, Any]:
+        state = read_index_alias()
+        if state:
+            return state
+        # Record the pre-versioning layout so the first versioned ingest can be rolled back
+        return {
+            "live": LEGACY_VERSION,
+            "versions": {LEGACY_VERSION: {
+                "partitioned": bool(self.active and self.active.partitioned),
+                "categories": sorted(self.partitions),
+                "count": self.active.count() if self.active else 0,
+                "created_at": None,
+                "retired_at": None
+            }}
+        }
+
+    def _switch(self, state: Dict[str, Any], index: IndexVersion):
+        """Retire the live version, publish ``index`` as live and start serving it"""
+        previous = state["live"]
+        if previous != index.version and previous in state["versions"]:
+            state["versions"][previous]["retired_at"] = time.time()
+        state["versions"][index.version]["retired_at"] = None
+        state["live"] = index.version
+        if state.get("shadow") == index.version:
+            state["shadow"] = None
+        write_index_alias(state)
+
+        self.active = index
+        if self.shadow is not None and self.shadow.version == index.version:
+            self.shadow = None
+        self._alias_checked_at = time.monotonic()
+        logger.info(f"Index alias switched from {previous} to {index.version}")
+
+    def _build_version(
         self,
+        version: str,
         documents: List[str],
         embeddings: List[List[float]],
         metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        centroids: Optional[Dict[str, np.ndarray]] = None,
+        fingerprint: Optional[Dict[str, Any]] = None
+    ) -> IndexVersion:
+        """Write the documents (and routing centroids) into the fresh collections of ``version``"""
+        if centroids:
+            self._write_centroids(version, centroids)
+
+        if not self.partitioned:
+            collection = get_or_create_index_collection(version)
+            collection.add(documents=documents, embeddings=embeddings, metadatas=metadatas, ids=ids)
+            return IndexVersion(version, collection=collection, centroids=centroids, fingerprint=fingerprint)
+
+        # Group chunks by category, one partition each
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(metadata.get("category", "uncategorized"), []).append(i)
+
+        partitions = {}
+        for category, indices in groups.items():
+            partition = get_or_create_index_collection(version, category)
+            partition.add(
+                documents=[documents[i] for i in indices],
+                embeddings=[embeddings[i] for i in indices],
+                metadatas=[metadatas[i] for i in indices],
+                ids=[ids[i] for i in indices]
+            )
+            partitions[category] = partition
+        return IndexVersion(version, partitions=partitions, centroids=centroids, fingerprint=fingerprint)
+
+    def _validate_version(
+        self,
+        index: IndexVersion,
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
         ids: List[str]
     ):
-        """Add documents to the vector store"""
+        """Check the document count, and that sampled chunks retrieve themselves"""
+        count = index.count()
+        if count != len(ids):
+            raise RuntimeError(f"Index version {index.version} holds {count} documents, expected {len(ids)}")
+
+        samples = min(settings.index_smoke_queries, len(ids))
+        for i in range(samples):
+            position = i * len(ids) // samples
+            collection = index.collection
+            if index.partitioned:
+                collection = index.partitions[metadatas[position].get("category", "uncategorized")]
+            found = [doc.id for doc in self._query_collection(collection, embeddings[position], 3)]
+            if ids[position] not in found:
+                raise RuntimeError(f"Smoke query for {ids[position]} did not retrieve it from {index.version}")
+
+    async def add_documents(
+        self,
+        documents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        fingerprint: Optional[Dict[str, Any]] = None,
+        shadow: bool = False
+    ) -> str:
+        """
+        Build the documents into a new index version, validate it and switch to it
+
+        ``fingerprint`` (see ``index_fingerprint``) defaults to the configured
+        model and chunking. With ``shadow`` the version is recorded as the
+        shadow index instead of going live, replacing any previous shadow.
+        Returns the new version name.
+        """
         if self.collection is None:
             await self.initialize()
-        
-        # Clear existing collection - use empty where clause to matches all
+        if fingerprint is None:
+            fingerprint = index_fingerprint(
+                settings.embedding_model_name, len(embeddings[0]) if len(embeddings) else 0,
+                settings.chunk_size, settings.chunk_overlap
+            )
+        # Writing and validating a version is a series of blocking Chroma calls
+        return await asyncio.to_thread(
+            self._add_version, documents, embeddings, metadatas, ids, fingerprint, shadow
+        )
+
+    def _add_version(
+        self,
+        documents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+        fingerprint: Dict[str, Any],
+        shadow: bool
+    ) -> str:
+        version = f"v{time.strftime('%Y%m%d%H%M%S', time.gmtime())}{uuid.uuid4().hex[:4]}"
+        centroids = {}
+        if settings.routing_centroids_per_category > 0 and ids:
+            centroids = compute_centroids(embeddings, metadatas, settings.routing_centroids_per_category)
+        info = {
+            "partitioned": self.partitioned,
+            "categories": sorted({metadata.get("category", "uncategorized") for metadata in metadatas})
+                          if self.partitioned else [],
+            "count": len(ids),
+            "centroids": sum(len(vectors) for vectors in centroids.values()),
+            **fingerprint,
+            "created_at": time.time(),
+            "retired_at": None
+        }
         try:
-            # First try getting all IDs
-            get_result = self.collection.get()
-            if get_result and get_result['ids']:
-                self.collection.delete(ids=get_result['ids'])
-        except Exception as e:
-            # Fallback or ignore if empty
-            pass
-        
-        # Add new documents
-        self.collection.add(
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
+            index = self._build_version(version, documents, embeddings, metadatas, ids, centroids, fingerprint)
+            self._validate_version(index, embeddings, metadatas, ids)
+        except Exception:
+            # The live version was never touched; just discard the half-built one
+            self._drop_version(version, info)
+            raise
+
+        state = self._alias_state()
+        state["versions"][version] = info
+        if shadow:
+            self._set_shadow(state, index)
+            logger.info(f"Built shadow index version {version} with {fingerprint['embedding_model']}: {len(ids)} chunks")
+            return version
+
+        self._switch(state, index)
+        logger.info(f"Built index version {version}: {len(ids)} chunks, {len(index.partitions)} partitions")
+
+        self.collect_garbage()
+        return version
+
+    def _set_shadow(self, state: Dict[str, Any], index: Optional[IndexVersion]):
+        """Record ``index`` (or no index) as the shadow version, dropping the one it replaces"""
+        previous = state.get("shadow")
+        state["shadow"] = index.version if index else None
+        replaced = None
+        if previous and previous != state["shadow"]:
+            replaced = state["versions"].pop(previous, None)
+        write_index_alias(state)
+        self.shadow = index
+        # Replicas stop opening the replaced version once the alias no longer names it
+        if replaced is not None:
+            self._drop_version(previous, replaced)
+
+    def promote_shadow(self) -> str:
+        """Switch the alias to the shadow version; the live one is retired and can be rolled back to"""
+        state = read_index_alias()
+        version = (state or {}).get("shadow")
+        if not version or version not in state["versions"]:
+            raise RuntimeError("No shadow index version to promote")
+        index = self.shadow if self.shadow and self.shadow.version == version else None
+        self._switch(state, index or self._open_version(version, state["versions"][version]))
+        return version
+
+    def discard_shadow(self) -> str:
+        """Drop the shadow version"""
+        state = read_index_alias()
+        version = (state or {}).get("shadow")
+        if not version:
+            raise RuntimeError("No shadow index version to discard")
+        self._set_shadow(state, None)
+        return version
+
+    def rollback(self) -> str:
+        """Switch the alias back to the most recently retired version"""
+        state = read_index_alias()
+        retired = [
+            (info["retired_at"], version) for version, info in (state or {}).get("versions", {}).items()
+            if version != state["live"] and info.get("retired_at") is not None
+        ]
+        if not retired:
+            raise RuntimeError("No previous index version to roll back to")
+
+        _, version = max(retired)
+        self._switch(state, self._open_version(version, state["versions"][version]))
+        return version
+
+    def collect_garbage(self, now: Optional[float] = None) -> List[str]:
+        """
+        Delete retired versions whose grace period has passed
+
+        The ``index_keep_versions`` most recently retired versions are kept
+        for rollback regardless of age.
+        """
+        state = read_index_alias()
+        if not state:
+            return []
+        now = time.time() if now is None else now
+
+        retired = sorted(
+            (
+                (info["retired_at"], version) for version, info in state["versions"].items()
+                if version != state["live"] and info.get("retired_at") is not None
+            ),
+            reverse=True
         )
-    
+        collected = []
+        for retired_at, version in retired[settings.index_keep_versions:]:
+            if now - retired_at >= settings.index_gc_grace_s:
+                self._drop_version(version, state["versions"].pop(version))
+                collected.append(version)
+
+        if collected:
+            write_index_alias(state)
+            logger.info(f"Garbage-collected index versions: {collected}")
+        return collected
+
+    def describe_versions(self) -> Dict[str, Any]:
+        """Recorded index versions and the one this process is serving"""
+        state = read_index_alias() or {}
+        return {
+            "serving": self.active.version if self.active else None,
+            "live": state.get("live", LEGACY_VERSION),
+            "shadow": state.get("shadow"),
+            "versions": state.get("versions", {}),
+            "gc_grace_s": settings.index_gc_grace_s,
+            "keep_versions": settings.index_keep_versions
+        }
+
+    # Queries
+
+    def _query_collection(
+        self,
+        collection,
+        query_embedding: List[float],
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None,
+        include_embeddings: bool = False
+    ) -> List[RetrievedChunk]:
+        """Run one collection query and build its chunks from the nested Chroma result lists"""
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where,
+            include=include
+        )
+
+        return from_query_results(results, include_embeddings)
+
     async def query(
         self,
         query_embedding: List[float],
         n_results: int = 5,
-        category: str = "all"
-    ) -> Dict[str, Any]:
-        """Query the vector store for similar documents"""
-        if self.collection is None:
-            await self.initialize()
-        
-        # Build where clause for category filtering
-        where_clause = None
+        category: str = "all",
+        include_embeddings: bool = False,
+        route: bool = False,
+        index: Optional[IndexVersion] = None
+    ) -> List[RetrievedChunk]:
+        """
+        Query the vector store for similar documents
+
+        With ``include_embeddings`` each result also carries its stored
+        vector in ``embedding`` (used for MMR diversification). With
+        ``route``, a ``category="all"`` query only searches the categories
+        it is routed to. ``index`` defaults to the live version;
+        ``query_embedding`` must come from its ``embedding_model``.
+        """
+        # The whole query runs against this version, even if the alias switches meanwhile
+        index = index or await self.live_version()
+        RAGLogger.log_retrieval_start(len(query_embedding), n_results)
         if category and category != "all":
-            where_clause = {"category": category}
-        
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            where=where_clause
+            categories = [category]
+        else:
+            categories = self.route_categories(index, query_embedding) if route else None
+
+        if not index.partitioned:
+            where_clause = None
+            if categories:
+                where_clause = {"category": categories[0]} if len(categories) == 1 else {"category": {"$in": categories}}
+            return await asyncio.to_thread(
+                self._query_collection, index.collection, query_embedding, n_results, where_clause, include_embeddings
+            )
+
+        if categories is None:
+            partitions = list(index.partitions.values())
+        else:
+            partitions = [index.partitions[name] for name in categories if name in index.partitions]
+        if len(partitions) == 1:
+            return await asyncio.to_thread(
+                self._query_collection, partitions[0], query_embedding, n_results, None, include_embeddings
+            )
+
+        # Fan out across partitions concurrently and merge the global top-k
+        partition_results = await asyncio.gather(*(
+            asyncio.to_thread(
+                self._query_collection, partition, query_embedding, n_results, None, include_embeddings
+            )
+            for partition in partitions
+        ))
+        merged = [doc for results in partition_results for doc in results]
+        merged.sort(key=lambda doc: doc.distance)
+        return merged[:n_results]
+
+    def route_categories(self, index: IndexVersion, query_embedding: List[float]) -> Optional[List[str]]:
+        """Categories an unscoped query should search, or None to search all of them"""
+        if not index.centroids:
+            CATEGORY_ROUTES.inc(outcome="unavailable")
+            return None
+        categories, probabilities = route_query(
+            query_embedding,
+            index.centroids,
+            settings.routing_confidence,
+            settings.routing_max_categories,
+            settings.routing_temperature
+        )
+        CATEGORY_ROUTES.inc(outcome="routed" if categories else "full_search")
+        likeliest = ", ".join(
+            f"{name}={probability:.2f}"
+            for name, probability in sorted(probabilities.items(), key=lambda item: -item[1])[:3]
         )
-        
-        # Format results
-        formatted_results = []
-        if results["ids"] and results["ids"][0]:
-            num_results = len(results["ids"][0])
-            RAGLogger.log_retrieval_start(len(query_embedding), num_results)
-            
-            for i in range(num_results):
-                formatted_results.append({
-                    "id": results["ids"][0][i],
-                    "text": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "distance": results["distances"][0][i] if results["distances"] else 0.0
-                })
-        
-        RAGLogger.log_retrieved_documents(formatted_results)
-        return formatted_results
-    
+        RAGLogger.log_step("ROUTING", f"{categories or 'full search'} ({likeliest})")
+        return categories
+
+    def _get_collection(self, collection, ids: List[str]) -> List[Dict[str, Any]]:
+        result = collection.get(ids=ids, include=["documents", "metadatas"])
+        return [
+            {"id": doc_id, "text": text, "metadata": metadata}
+            for doc_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        ]
+
+    async def live_version(self) -> IndexVersion:
+        """The index version new queries are served from"""
+        if self.collection is None:
+            await self.initialize()
+        await self._maybe_refresh_alias()
+        return self.active
+
+    async def get_documents(self, ids: List[str], index: Optional[IndexVersion] = None) -> List[Dict[str, Any]]:
+        """Fetch chunks by id from ``index`` (default: the live version); missing ids are skipped"""
+        index = index or await self.live_version()
+        if not index.partitioned:
+            return await asyncio.to_thread(self._get_collection, index.collection, ids)
+
+        # Chunk ids do not name their category, so ask every partition
+        partition_results = await asyncio.gather(*(
+            asyncio.to_thread(self._get_collection, partition, ids)
+            for partition in index.partitions.values()
+        ))
+        return [doc for results in partition_results for doc in results]
+
+    async def get_texts(self, index: IndexVersion) -> List[str]:
+        """Every chunk text stored in ``index``"""
+        collections = list(index.partitions.values()) if index.partitioned else [index.collection]
+        results = await asyncio.gather(*(
+            asyncio.to_thread(collection.get, include=["documents"]) for collection in collections
+        ))
+        return [text for result in results for text in result["documents"] or []]
+
     async def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the collection"""
         if self.collection is None:
             await self.initialize()
-        
+
         try:
-            count = self.collection.count()
+            index = self.active
+            if index.partitioned:
+                partition_counts = {
+                    category: partition.count()
+                    for category, partition in sorted(index.partitions.items())
+                }
+                return {
+                    "name": settings.collection_name,
+                    "version": index.version,
+                    "embedding_model": index.embedding_model,
+                    "count": sum(partition_counts.values()),
+                    "metadata": self.collection.metadata,
+                    "partitions": partition_counts
+                }
+
+            count = index.collection.count()
             return {
                 "name": settings.collection_name,
+                "version": index.version,
+                "embedding_model": index.embedding_model,
                 "count": count,
                 "metadata": self.collection.metadata
             }
@@ -110,3 +688,16 @@ class VectorStore:
 
 # Global vector store instance
 vector_store = VectorStore()
+
+
+def index_memory() -> Dict[str, Any]:
+    """Per-version bytes of the live and shadow index"""
+    memory: Dict[str, Any] = {}
+    for index in (vector_store.active, vector_store.shadow):
+        if index is not None:
+            memory[index.version] = index.memory_bytes()
+    memory["total"] = sum(part["total"] for part in memory.values())
+    return memory
+
+
+memory_accounting.register("vector_index", index_memory)
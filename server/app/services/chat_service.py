@@ -4,27 +4,55 @@ Business logic for chat operations
 
 import logging
 import time
-from typing import List
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi import HTTPException
 from ..rag.retriever import retrieve_documents
+from ..rag.vectorstore import vector_store, IndexVersion
+from ..rag.chunks import as_reference
+from ..rag.extractive import extract_answer
+from ..rag.results import RetrievedChunk
 from ..rag.prompts import format_chat_prompt, SYSTEM_PROMPT
 from ..rag.evaluator import rag_evaluator
-from ..models.chat import DocumentResult, ChatRequest, ChatResponse
+from ..models.chat import ChatRequest, ChatResponse
 from .llm_service import llm_service
+from .sessions import session_store, Session
 from ..core.rag_logger import RAGLogger
+from ..core.metrics import span, start_stage_timings, FALLBACKS, EXTRACTIVE_ANSWERS
+from ..core.cache import answer_cache, normalize_query
+from ..core.shared_cache import ModelCodec
+from ..core.config import settings
+from ..core.deadline import Deadline, DeadlineExceeded, bounded
 
 logger = logging.getLogger(__name__)
 
 
+def answer_cache_key(request: ChatRequest, version: Optional[str]) -> Tuple:
+    """Answer cache key: the index version, the normalized message and every field that changes the answer"""
+    return (
+        version,
+        normalize_query(request.message),
+        request.context_length,
+        request.category,
+        request.mmr,
+        request.mmr_lambda,
+        request.mmr_fetch_k,
+        request.answer_mode,
+    )
+
+
 class ChatService:
     """Service for handling chat interactions with RAG"""
     
-    async def process_query(self, request: ChatRequest) -> ChatResponse:
+    def __init__(self):
+        self._llm_calls_in_flight = 0
+    
+    async def process_query(self, request: ChatRequest, evaluate: bool = True) -> ChatResponse:
         """
         Process a chat query using RAG
         
         Args:
             request: Chat request with message and context settings
+            evaluate: Score the answer with ``rag_evaluator`` (offline tools evaluate in bulk instead)
             
         Returns:
             Chat response with AI answer and sources
@@ -34,82 +62,248 @@ class ChatService:
             RAGLogger.log_step("ORCHESTRATION", "Processing query via RAG pipeline")
             
             start_time = time.time()
+            stage_timings = start_stage_timings()
+            deadline = Deadline(
+                request.deadline_ms / 1000 if request.deadline_ms else settings.chat_deadline_s
+            )
             
-            # Retrieve relevant documents
-            documents = await retrieve_documents(
-                query=request.message,
-                n_results=5
+            # Follow-ups in a session are answered as standalone questions
+            session = session_store.get(request.session_id) if request.session_id else None
+            question, rewritten = request.message, False
+            if session is not None:
+                question, rewritten = session_store.rewrite(session, request.message)
+                if rewritten:
+                    RAGLogger.log_step("SESSION", f"Rewrote follow-up as: {question}")
+            
+            # Picks up an alias switch made by another replica before the answer cache is consulted;
+            # resolved once, within the deadline, and searched by the retrieval below
+            index = await self._serving_index(deadline)
+            cache_key = answer_cache_key(
+                request.model_copy(update={"message": question}) if rewritten else request,
+                index.version if index else None
             )
-            RAGLogger.log_retrieved_documents(documents)
+            cached = await answer_cache.aget(cache_key)
+            if cached is not None:
+                cached_response = cached.model_copy(deep=True)
+                cached_response.query = request.message
+                cached_response.session_id = request.session_id
+                if cached_response.evaluation_metrics is not None:
+                    cached_response.evaluation_metrics["cached"] = True
+                    cached_response.evaluation_metrics["stage_timings_ms"] = stage_timings
+                    if session is not None:
+                        cached_response.evaluation_metrics["session"] = self._session_metrics(
+                            session, question, rewritten, None
+                        )
+                if session is not None:
+                    session_store.record_turn(session, request.message, question, cached_response.response)
+                if request.by_reference:
+                    cached_response.sources = [as_reference(source) for source in cached_response.sources]
+                return cached_response
             
-            # Format context from retrieved documents
-            context = self._format_context(documents, request.context_length)
+            # Retrieve relevant documents
+            candidates, scope, retrieval = None, None, None
+            documents, context = [], ""
+            response, fallback_reason = None, None
+            try:
+                if session is not None and not request.mmr:
+                    documents, candidates, scope, retrieval = await self._retrieve_for_session(
+                        session, request, question, rewritten, deadline, index
+                    )
+                else:
+                    documents = await retrieve_documents(
+                        query=question,
+                        n_results=5,
+                        category=request.category or "all",
+                        mmr=request.mmr,
+                        mmr_lambda=request.mmr_lambda,
+                        mmr_fetch_k=request.mmr_fetch_k,
+                        deadline=deadline,
+                        index=index
+                    )
+                RAGLogger.log_retrieved_documents(documents)
+                
+                if request.answer_mode == "extractive":
+                    fallback_reason = "requested"
+                elif 0 < settings.extractive_overload_llm_calls <= self._llm_calls_in_flight:
+                    fallback_reason = "overload"
+                else:
+                    # Format context from retrieved documents
+                    with span("context_assembly"):
+                        context = self._format_context(documents, request.context_length, deadline)
+                    
+                    # Generate response using LLM
+                    response, fallback_reason = await self._generate_llm_response(question, context, deadline)
+            except DeadlineExceeded as e:
+                logger.warning(f"Chat deadline of {deadline.budget_s:.1f}s exceeded during {e.stage}")
+                fallback_reason = "deadline"
             
-            # Generate response using LLM
-            response = await self._generate_llm_response(request.message, context)
+            # Without an LLM answer, serve the best retrieved sentences
+            answer_mode = "generative"
+            if fallback_reason is not None:
+                if fallback_reason != "requested":
+                    FALLBACKS.inc(reason=fallback_reason)
+                response, answer_mode = await self._extractive_response(
+                    request.message, question, documents, fallback_reason, deadline
+                )
             
             # Calculate metrics
             total_time = (time.time() - start_time) * 1000  # ms
             
             RAGLogger.log_llm_response(response, total_time)
             
-            # Perform comprehensive evaluation
-            eval_metrics = rag_evaluator.evaluate_response(
-                query=request.message,
-                response=response,
-                retrieved_docs=documents
-            )
+            # Perform comprehensive evaluation, unless that would overrun the deadline
+            if not evaluate:
+                eval_metrics = {}
+            elif deadline.remaining() >= settings.deadline_evaluation_min_s:
+                with span("evaluation"):
+                    eval_metrics = rag_evaluator.evaluate_response(
+                        query=question,
+                        response=response,
+                        retrieved_docs=documents
+                    )
+            else:
+                deadline.degrade("evaluation_skipped")
+                eval_metrics = {"evaluation_skipped": True}
             
             # Add latency to evaluation metrics
             eval_metrics['latency_ms'] = int(total_time)
             eval_metrics['latency'] = f"{int(total_time)}ms"
             eval_metrics['context_length'] = len(context.split())
+            # Shared by reference so the serialization span below lands in it too
+            eval_metrics['stage_timings_ms'] = stage_timings
+            eval_metrics['deadline'] = deadline.describe()
+            eval_metrics['answer_mode'] = answer_mode
+            if fallback_reason is not None:
+                eval_metrics['fallback_reason'] = fallback_reason
+            if session is not None:
+                eval_metrics['session'] = self._session_metrics(session, question, rewritten, retrieval)
             
             # Log evaluation results
-            logger.info(
-                f"Evaluation - Quality: {eval_metrics['quality_score']:.2f}, "
-                f"Hallucination: {eval_metrics['hallucination_rate']:.2f}, "
-                f"Grounding: {eval_metrics['grounding_score']:.2f}, "
-                f"Recall@5: {eval_metrics.get('recall_at_5', 0):.2f}"
-            )
+            if 'quality_score' in eval_metrics:
+                logger.info(
+                    f"Evaluation - Quality: {eval_metrics['quality_score']:.2f}, "
+                    f"Hallucination: {eval_metrics['hallucination_rate']:.2f}, "
+                    f"Grounding: {eval_metrics['grounding_score']:.2f}, "
+                    f"Recall@5: {eval_metrics.get('recall_at_5', 0):.2f}"
+                )
             
             # Convert to DocumentResult models
-            source_results = [
-                DocumentResult(
-                    text=doc["text"],
-                    metadata=doc["metadata"],
-                    distance=doc["distance"]
+            with span("response_serialization"):
+                source_results = [doc.to_result() for doc in documents]
+                
+                chat_response = ChatResponse(
+                    response=response,
+                    sources=source_results,
+                    query=request.message,
+                    evaluation_metrics=eval_metrics,
+                    session_id=request.session_id
                 )
-                for doc in documents
-            ]
             
-            return ChatResponse(
-                response=response,
-                sources=source_results,
-                query=request.message,
-                evaluation_metrics=eval_metrics
-            )
+            # Fallback, degraded and unevaluated answers must not be served from cache,
+            # nor the canned reply when a requested extractive answer found nothing
+            cacheable = fallback_reason in (None, "requested") and answer_mode != "fallback"
+            if cacheable and not deadline.degraded and evaluate:
+                await answer_cache.aset(cache_key, chat_response.model_copy(deep=True))
+            if session is not None:
+                session_store.record_turn(session, request.message, question, response, candidates, scope)
+            
+            if request.by_reference:
+                chat_response.sources = [as_reference(source) for source in chat_response.sources]
+            return chat_response
             
         except HTTPException as he:
             raise he
             
         except Exception as e:
             logger.error(f"Chat processing failed: {e}")
+            FALLBACKS.inc(reason="error")
             # Return fallback response
             return ChatResponse(
                 response=self._get_fallback_response(request.message),
                 sources=[],
                 query=request.message,
-                evaluation_metrics=None
+                evaluation_metrics=None,
+                session_id=request.session_id
             )
     
-    def _format_context(self, documents: List[dict], max_length: int) -> str:
-        """Format retrieved documents into context string"""
+    async def _serving_index(self, deadline: Optional[Deadline] = None) -> Optional[IndexVersion]:
+        """Live index version; None when the store cannot be reached in time (retrieval then falls back)"""
+        try:
+            return await bounded(deadline, "index_version", vector_store.live_version())
+        except Exception as e:
+            logger.warning(f"Could not resolve the live index version: {e}")
+            return None
+    
+    async def _retrieve_for_session(
+        self,
+        session: Session,
+        request: ChatRequest,
+        question: str,
+        rewritten: bool,
+        deadline: Optional[Deadline] = None,
+        index: Optional[IndexVersion] = None
+    ) -> Tuple[List[RetrievedChunk], Optional[List[RetrievedChunk]], Tuple, str]:
+        """
+        Retrieve for a session turn, re-ranking the last candidates for a close follow-up
+        
+        Returns the documents, the fresh candidates to keep (None when the
+        cached ones were reused), their scope and the retrieval outcome.
+        Candidates are scoped to ``index``, the version this turn searches.
+        """
+        scope = (request.category, index.version if index else None)
+        reusable = rewritten and index is not None
+        cached = session_store.reusable_candidates(session, question, scope) if reusable else None
+        if cached is not None:
+            with span("session_rerank"):
+                documents = session_store.rerank(cached, question, 5)
+            session_store.record_retrieval(reused=True)
+            return documents, None, scope, "reused"
+        
+        candidates = await retrieve_documents(
+            query=question,
+            n_results=settings.session_candidates,
+            category=request.category or "all",
+            deadline=deadline,
+            index=index
+        )
+        session_store.record_retrieval(reused=False)
+        return candidates[:5], candidates, scope, "fresh"
+    
+    def _session_metrics(
+        self,
+        session: Session,
+        question: str,
+        rewritten: bool,
+        retrieval: Optional[str]
+    ) -> Dict[str, Any]:
+        return {
+            "turn": len(session.turns) + 1,
+            "rewritten_query": question if rewritten else None,
+            "retrieval": retrieval or "answer_cache",
+        }
+    
+    def _format_context(self, documents: List[RetrievedChunk], max_length: int, deadline: Optional[Deadline] = None) -> str:
+        """
+        Format retrieved documents into context string
+        
+        With less than ``deadline_full_context_s`` of the budget left, the
+        context is trimmed in proportion so the LLM call can still finish.
+        """
+        if deadline is not None:
+            if deadline.expired:
+                raise deadline.exceeded("context_assembly")
+            share = deadline.remaining() / settings.deadline_full_context_s
+            if share < 1.0:
+                trimmed = max(500, int(max_length * share))
+                if trimmed < max_length:
+                    deadline.degrade("context_trimmed")
+                    max_length = trimmed
+        
         context_parts = []
         current_length = 0
         
         for doc in documents:
-            doc_text = f"Source: {doc['metadata'].get('source', 'Unknown')}\n{doc['text']}\n"
+            doc_text = f"Source: {doc.source}\n{doc.text}\n"
             
             if current_length + len(doc_text) <= max_length:
                 context_parts.append(doc_text)
@@ -126,24 +320,69 @@ class ChatService:
         RAGLogger.log_context_assembly(final_context, len(final_context.split()))
         return final_context
     
-    async def _generate_llm_response(self, question: str, context: str) -> str:
-        """Generate response using LLM service"""
+    async def _generate_llm_response(
+        self,
+        question: str,
+        context: str,
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Generate response using LLM service; None with the reason when there is no answer"""
         if not await llm_service.is_available():
-            return self._get_fallback_response(question)
+            return None, "llm_unavailable"
         
         # Format prompt for LLM
-        prompt = format_chat_prompt(context, question)
+        with span("prompt_formatting"):
+            prompt = format_chat_prompt(context, question)
         
         # Generate response
-        response = await llm_service.generate_response(prompt)
+        self._llm_calls_in_flight += 1
+        try:
+            with span("llm_call"):
+                response = await llm_service.generate_response(prompt, deadline)
+        except HTTPException as e:
+            if e.status_code != 429:
+                raise
+            return None, "rate_limited"
+        finally:
+            self._llm_calls_in_flight -= 1
         
         if response:
-            return response
-        else:
-            logger.warning("LLM generation failed, using fallback")
-            return self._get_fallback_response(question)
+            return response, None
+        logger.warning("LLM generation failed, using fallback")
+        return None, "empty_response"
+    
+    async def _extractive_response(
+        self,
+        message: str,
+        question: str,
+        documents: List[RetrievedChunk],
+        reason: str,
+        deadline: Deadline
+    ) -> Tuple[str, str]:
+        """
+        Answer from the retrieved sentences, or the canned fallback if none fit
+        
+        Sentence embeddings are skipped when less than ``extractive_embed_min_s``
+        of the budget is left, and abandoned if they overrun what is left.
+        """
+        with span("extractive_answer"):
+            answer = await extract_answer(
+                question, documents, embed=deadline.remaining() >= settings.extractive_embed_min_s, deadline=deadline
+            ) if documents else None
+        if answer is None:
+            return self._get_fallback_response(message), "fallback"
+        EXTRACTIVE_ANSWERS.inc(reason=reason)
+        RAGLogger.log_step("EXTRACTIVE", f"Answered from {len(answer['sentences'])} sentences ({reason})")
+        return answer["text"], "extractive"
     
     def _get_fallback_response(self, query: str) -> str:
         """Provide a simple fallback if the LLM fails."""
         # Simple error message that the frontend can handle or display gracefully
         return "I'm currently unable to generate a response due to high traffic or a temporary system issue. Please try again in a moment."
+
+
+# Global chat service instance
+chat_service = ChatService()
+
+# Answers are shared per index version, like retrieval results
+answer_cache.share(ModelCodec(ChatResponse), scope=vector_store.serving_version)
@@ -0,0 +1,166 @@
+"""
+Single-flight knowledge base ingestion jobs
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from ..core.config import settings
+from ..core.memory import PeakMemory
+from ..rag.ingest import IngestProgress, IngestionCancelled, ingest_knowledge_base
+from .warmup import cache_warmer
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionInProgress(Exception):
+    """Raised when an ingestion is requested while another one is running"""
+
+    def __init__(self, job: "IngestionJob"):
+        super().__init__(f"Ingestion job {job.id} is already running")
+        self.job = job
+
+
+class IngestionJob(IngestProgress):
+    """One ingestion run, with its outcome once finished"""
+
+    def __init__(self, trigger: str, options: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.options = options or {}
+        self.status = "running"
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.exception: Optional[Exception] = None
+        self.task: Optional[asyncio.Task] = None
+        self.memory = PeakMemory(f"Ingestion job {self.id}")
+
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+
+    def to_dict(self) -> Dict[str, Any]:
+        throughput = self.throughput
+        eta_s = None if self.finished else self.eta_s
+        return {
+            "job_id": self.id,
+            "trigger": self.trigger,
+            "status": self.status,
+            "stage": self.stage,
+            "documents": self.documents,
+            "chunks_total": self.chunks_total,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_per_s": round(throughput, 2) if throughput else None,
+            "eta_s": round(eta_s, 1) if eta_s is not None else None,
+            "cancel_requested": self.cancel_requested,
+            "index_version": self.index_version,
+            "shadow": bool(self.options.get("shadow")),
+            "build": self.build,
+            "memory": self.memory.to_dict(),
+            "error": self.error,
+            "created_at": round(self.created_at, 3),
+            "finished_at": round(self.finished_at, 3) if self.finished_at else None,
+            "duration_s": round((self.finished_at or time.time()) - self.created_at, 3),
+        }
+
+
+class IngestionManager:
+    """
+    Runs at most one knowledge base ingestion at a time
+
+    Each run is a job with an id whose stage, chunk counts, throughput and
+    ETA can be polled while it runs, along with the peak RSS of the run so
+    far. The ingestion is a task on the serving event loop; its blocking
+    steps (file reads, encoding, Chroma writes) run on worker threads so
+    they never stall requests. Finished jobs (including failed and
+    cancelled ones, with how far they got) are kept for
+    ``ingest_job_history`` lookups.
+    """
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._current: Optional[IngestionJob] = None
+
+    @property
+    def current(self) -> Optional[IngestionJob]:
+        return self._current
+
+    def start(self, trigger: str = "api", **options) -> IngestionJob:
+        """Start an ingestion job on the running event loop; ``options`` go to ``ingest_knowledge_base``"""
+        if self._current is not None:
+            raise IngestionInProgress(self._current)
+
+        job = IngestionJob(trigger, options)
+        self._current = job
+        self._jobs[job.id] = job
+        while len(self._jobs) > settings.ingest_job_history:
+            self._jobs.popitem(last=False)
+
+        job.task = asyncio.create_task(self._run(job))
+        logger.info(f"Started ingestion job {job.id} ({trigger})")
+        return job
+
+    async def _run(self, job: IngestionJob) -> Optional[int]:
+        # Failures are recorded on the job rather than raised: nobody awaits a background ingest
+        try:
+            with job.memory:
+                chunks = await ingest_knowledge_base(job, **job.options)
+            job.status = "succeeded"
+        except IngestionCancelled as e:
+            job.status = "cancelled"
+            job.exception = e
+            return None
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.exception = e
+            return None
+        finally:
+            job.finished_at = time.time()
+            self._current = None
+            logger.info(f"Ingestion job {job.id} {job.status} at stage {job.stage}")
+
+        # A shadow build leaves the live index, and so the caches, untouched
+        if settings.warmup_after_ingest and not job.options.get("shadow"):
+            cache_warmer.schedule("ingest")
+        return chunks
+
+    async def wait(self, job: IngestionJob) -> int:
+        """Wait for a job and return its chunk count, re-raising its failure"""
+        chunks = await asyncio.shield(job.task)
+        if job.exception is not None:
+            raise job.exception
+        return chunks
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[IngestionJob]:
+        """Known jobs, newest first"""
+        return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """Ask a running job to stop at its next checkpoint"""
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+            logger.info(f"Cancellation requested for ingestion job {job.id}")
+        return job
+
+    async def stop(self):
+        """Cancel the running job and wait for it to reach a checkpoint"""
+        job = self._current
+        if job is None:
+            return
+        job.cancel()
+        await asyncio.gather(job.task, return_exceptions=True)
+
+
+# Global ingestion manager instance
+ingestion_manager = IngestionManager()
@@ -0,0 +1,297 @@
+"""
+LLM providers, circuit breakers and latency tracking for the LLM router
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    """A provider call failed or returned nothing usable"""
+
+
+class ProviderRateLimited(ProviderError):
+    """A provider rejected the call with 429 / quota exhausted"""
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    message = str(error)
+    return "429" in message or "Too Many Requests" in message or "RESOURCE_EXHAUSTED" in message
+
+
+class LLMProvider:
+    """One LLM backend the router can send a prompt to"""
+
+    name = "provider"
+
+    async def initialize(self) -> bool:
+        """Create the client; False if the provider is not configured"""
+        return True
+
+    async def complete(self, prompt: str) -> str:
+        """Answer ``prompt``, raising ``ProviderError`` (or ``ProviderRateLimited``) on failure"""
+        raise NotImplementedError
+
+    async def aclose(self):
+        """Release the client's connections (at shutdown)"""
+
+
+class ChatCompletionsProvider(LLMProvider):
+    """
+    A provider behind a client exposing ``chat.completions.create``
+
+    Covers ``huggingface_hub.InferenceClient`` and the local
+    ``StubInferenceClient``. The client is synchronous and runs on a worker
+    thread, so a cancelled (hedged-out) call stops being awaited but its
+    thread finishes in the background.
+    """
+
+    def __init__(self, name: str, client: Any, model: Optional[str] = None, max_tokens: int = 1000):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+
+    async def complete(self, prompt: str) -> str:
+        try:
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=self.max_tokens,
+                temperature=0.7
+            )
+        except Exception as e:
+            if _is_rate_limit(e):
+                raise ProviderRateLimited(str(e)) from e
+            raise ProviderError(str(e)) from e
+
+        text = response.choices[0].message.content if response and response.choices else ""
+        if not text:
+            raise ProviderError("Empty response")
+        return text
+
+
+class HuggingFaceProvider(ChatCompletionsProvider):
+    """Hugging Face Inference API"""
+
+    def __init__(self, api_key: Optional[str], model: str):
+        super().__init__("huggingface", None, model)
+        self.api_key = api_key
+
+    async def initialize(self) -> bool:
+        if not self.api_key:
+            return False
+        from huggingface_hub import InferenceClient
+        self.client = InferenceClient(model=self.model, token=self.api_key)
+        return True
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions over HTTP; cancelling a call closes its request"""
+
+    name = "openai"
+    url = "https://api.openai.com/v1/chat/completions"
+
+    def __init__(self, api_key: Optional[str], model: str, timeout_s: float = 30.0):
+        self.api_key = api_key
+        self.model = model
+        self.timeout_s = timeout_s
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def initialize(self) -> bool:
+        if not self.api_key:
+            return False
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout_s,
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+        return True
+
+    async def complete(self, prompt: str) -> str:
+        try:
+            response = await self._client.post(self.url, json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": 1000,
+                "temperature": 0.7,
+            })
+        except httpx.HTTPError as e:
+            raise ProviderError(str(e)) from e
+        if response.status_code == 429:
+            raise ProviderRateLimited(response.text[:200])
+        if response.status_code >= 400:
+            raise ProviderError(f"{response.status_code}: {response.text[:200]}")
+        choices = response.json().get("choices") or []
+        text = choices[0]["message"]["content"] if choices else ""
+        if not text:
+            raise ProviderError("Empty response")
+        return text
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via the ``google-genai`` async client"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str], model: str):
+        self.api_key = api_key
+        self.model = model
+        self._client = None
+
+    async def initialize(self) -> bool:
+        if not self.api_key:
+            return False
+        try:
+            from google import genai
+        except ImportError:
+            logger.warning("google-genai is not installed; Gemini provider disabled")
+            return False
+        self._client = genai.Client(api_key=self.api_key)
+        return True
+
+    async def complete(self, prompt: str) -> str:
+        try:
+            response = await self._client.aio.models.generate_content(model=self.model, contents=prompt)
+        except Exception as e:
+            if _is_rate_limit(e):
+                raise ProviderRateLimited(str(e)) from e
+            raise ProviderError(str(e)) from e
+        if not response.text:
+            raise ProviderError("Empty response")
+        return response.text
+
+
+class CircuitBreaker:
+    """
+    Stops routing to a provider after a burst of failures
+
+    ``failure_threshold`` failures (errors, timeouts or 429s) within
+    ``window_s`` open the breaker for ``open_s`` seconds. After that it is
+    half-open: one probe call is let through, and its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, window_s: float = 30.0, open_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.window_s = window_s
+        self.open_s = open_s
+        self._failures: deque = deque()
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.open_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now; in half-open state this claims the single probe"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        # Failures stay in the window: a burst interleaved with successes still opens the breaker
+        if self._opened_at is not None:
+            self._opened_at = None
+            self._failures.clear()
+        self._probing = False
+
+    def record_failure(self):
+        now = time.monotonic()
+        state = self.state
+        if state == "open":
+            # Late failures from calls sent before the breaker opened
+            return
+        if self._probing or state == "half_open":
+            self._open(now)
+            return
+        self._failures.append(now)
+        while self._failures and now - self._failures[0] > self.window_s:
+            self._failures.popleft()
+        if len(self._failures) >= self.failure_threshold:
+            self._open(now)
+
+    def release(self):
+        """Give back a half-open probe whose call was cancelled before finishing"""
+        self._probing = False
+
+    def _open(self, now: float):
+        self._opened_at = now
+        self._probing = False
+        self._failures.clear()
+        self.times_opened += 1
+
+
+class LatencyTracker:
+    """Rolling window of a provider's successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ProviderState:
+    """A provider with its breaker, latency window and outcome counts"""
+
+    def __init__(self, provider: LLMProvider, breaker: CircuitBreaker, latency: LatencyTracker, priority: int):
+        self.provider = provider
+        self.breaker = breaker
+        self.latency = latency
+        self.priority = priority
+        self.outcomes: Dict[str, int] = {}
+        # Exponentially weighted failure rate, so recovered providers regain rank
+        self.error_rate = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.provider.name
+
+    def record(self, outcome: str, alpha: float = 0.1):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if outcome != "cancelled":
+            self.error_rate = (1 - alpha) * self.error_rate + alpha * (outcome != "success")
+
+    def describe(self) -> Dict[str, Any]:
+        p50, p95 = self.latency.quantile(0.5), self.latency.quantile(0.95)
+        return {
+            "name": self.name,
+            "breaker": self.breaker.state,
+            "times_opened": self.breaker.times_opened,
+            "error_rate": round(self.error_rate, 4),
+            "latency_p50_s": round(p50, 3) if p50 is not None else None,
+            "latency_p95_s": round(p95, 3) if p95 is not None else None,
+            "latency_samples": len(self.latency),
+            "outcomes": dict(self.outcomes),
+        }
@@ -1,15 +1,27 @@
 """
-LLM service for Hugging Face Inference API integration with rate limiting
+LLM service routing prompts across providers with hedging and circuit breakers
 """
 
 import asyncio
 import time
 import logging
-from typing import Optional, Dict, Any
-from huggingface_hub import InferenceClient
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import HTTPException
 from ..core.config import settings
 from ..core.rag_logger import RAGLogger
+from ..core.metrics import RATE_LIMITED, LLM_REQUESTS, LLM_HEDGES
+from ..core.deadline import Deadline, bounded
+from .llm_providers import (
+    LLMProvider,
+    HuggingFaceProvider,
+    OpenAIProvider,
+    GeminiProvider,
+    ProviderError,
+    ProviderRateLimited,
+    CircuitBreaker,
+    LatencyTracker,
+    ProviderState,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -52,8 +64,35 @@ class RateLimiter:
         return True
 
 
+def build_providers() -> List[LLMProvider]:
+    """Providers named in ``settings.llm_providers``, in preference order"""
+    factories = {
+        "huggingface": lambda: HuggingFaceProvider(settings.huggingface_api_key, settings.huggingface_model),
+        "openai": lambda: OpenAIProvider(settings.openai_api_key, settings.openai_model, settings.llm_timeout_s),
+        "gemini": lambda: GeminiProvider(settings.gemini_api_key, settings.gemini_model),
+    }
+    providers = []
+    for name in settings.llm_providers.split(","):
+        name = name.strip().lower()
+        if name not in factories:
+            logger.warning(f"Unknown LLM provider '{name}' ignored")
+            continue
+        providers.append(factories[name]())
+    return providers
+
+
 class LLMService:
-    """Service for LLM interactions with Hugging Face Inference API"""
+    """
+    Routes LLM calls to the healthiest configured provider
+
+    Providers are ranked by circuit breaker state, then by their recent error
+    rate, then by ``llm_providers`` order. If the chosen provider has not
+    answered within its learned latency quantile (``llm_hedge_quantile``), a
+    hedged request goes to the next provider and whichever answers first
+    wins; the other call is cancelled. A failed call fails over to the next
+    provider. Each provider has a circuit breaker that opens on a burst of
+    errors, timeouts or 429s.
+    """
     
     def __init__(self):
         # HF Free Tier has generous but variable limits. We'll set a safe default.
@@ -61,83 +100,182 @@ class LLMService:
             per_minute=20,
             per_day=1000
         )
-        self._client: Optional[InferenceClient] = None
+        self._states: List[ProviderState] = []
         self._initialized = False
     
     async def initialize(self):
-        """Initialize the Hugging Face client"""
-        try:
-            if not settings.huggingface_api_key:
-                logger.warning("Hugging Face API key not provided. LLM features will be disabled.")
-                return False
-            
-            # Initialize client with API key
-            self._client = InferenceClient(
-                model=settings.huggingface_model,
-                token=settings.huggingface_api_key
-            )
-            self._initialized = True
-            logger.info(f"Initialized Hugging Face client with model: {settings.huggingface_model}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize Hugging Face client: {e}")
+        """Initialize the configured providers that have API keys"""
+        providers = []
+        for provider in build_providers():
+            try:
+                if await provider.initialize():
+                    providers.append(provider)
+                else:
+                    logger.info(f"LLM provider {provider.name} not configured")
+            except Exception as e:
+                logger.error(f"Failed to initialize LLM provider {provider.name}: {e}")
+        
+        if not providers:
+            logger.warning("No LLM provider API key provided. LLM features will be disabled.")
             return False
+        
+        self.use_providers(providers)
+        logger.info(f"Initialized LLM providers: {', '.join(provider.name for provider in providers)}")
+        return True
+    
+    def use_providers(self, providers: List[LLMProvider]):
+        """Route across ``providers`` (in preference order) with fresh breakers and latency windows"""
+        self._states = [
+            ProviderState(
+                provider,
+                CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_window_s, settings.llm_breaker_open_s),
+                LatencyTracker(settings.llm_latency_window),
+                priority
+            )
+            for priority, provider in enumerate(providers)
+        ]
+        self._initialized = bool(providers)
+    
+    async def aclose(self):
+        """Close every routed provider's client (at shutdown)"""
+        for state in self._states:
+            try:
+                await state.provider.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close LLM provider {state.name}: {e}")
+        self._states = []
+        self._initialized = False
     
-    async def generate_response(self, prompt: str) -> Optional[str]:
+    async def generate_response(self, prompt: str, deadline: Optional[Deadline] = None) -> Optional[str]:
         """
-        Generate response using Hugging Face Inference API with rate limiting
+        Generate a response from the best available provider
         
         Args:
             prompt: The prompt to send to the LLM
+            deadline: Request budget; calls still running when it runs out are
+                cancelled and ``DeadlineExceeded`` is raised
             
         Returns:
-            Generated response or None if failed
+            Generated response or None if every provider failed
         """
         if not self._initialized:
             if not await self.initialize():
                 return None
         
-        # Proactive rate limit check disabled by user request
-        # if not await self.rate_limiter.acquire():
-        #     return None
+        ranked = self._rank()
+        if not ranked:
+            logger.warning("All LLM provider circuit breakers are open")
+            return None
+        
+        RAGLogger.log_llm_call(len(prompt), ranked[0].name)
+        text, outcomes = await bounded(deadline, "llm_call", self._route(prompt, ranked))
+        
+        if text:
+            cleaned_text = self._clean_response(text)
+            logger.info(f"Generated response of length: {len(cleaned_text)}")
+            return cleaned_text
         
+        if outcomes and all(outcome == "rate_limited" for outcome in outcomes):
+            logger.warning("LLM provider quotas exceeded")
+            raise HTTPException(status_code=429, detail="LLM rate limit exceeded. Please try again later.")
+        return None
+    
+    def _rank(self) -> List[ProviderState]:
+        """Providers whose breaker admits calls, healthiest first"""
+        return sorted(
+            (state for state in self._states if state.breaker.state != "open"),
+            key=lambda state: (state.breaker.state != "closed", round(state.error_rate, 1), state.priority)
+        )
+    
+    def _hedge_delay(self, state: ProviderState) -> float:
+        """How long to wait on ``state`` before hedging: its learned latency quantile"""
+        if len(state.latency) < settings.llm_hedge_min_samples:
+            return settings.llm_hedge_default_delay_s
+        return max(settings.llm_hedge_min_delay_s, state.latency.quantile(settings.llm_hedge_quantile))
+    
+    async def _route(self, prompt: str, ranked: List[ProviderState]) -> Tuple[Optional[str], List[str]]:
+        """Staggered race: primary first, a hedge after its hedge delay, failover on errors"""
+        queue = list(ranked)
+        pending: Dict[asyncio.Task, ProviderState] = {}
+        outcomes: List[str] = []
+        
+        def launch() -> Optional[ProviderState]:
+            while queue:
+                state = queue.pop(0)
+                if state.breaker.allow():
+                    pending[asyncio.create_task(self._call(state, prompt))] = state
+                    return state
+            return None
+        
+        primary = launch()
+        hedged = False
+        started = time.perf_counter()
         try:
-            RAGLogger.log_llm_call(len(prompt), settings.huggingface_model)
-            
-            # Generate response using chat completion pattern
-            messages = [{"role": "user", "content": prompt}]
-            
-            # Hugging Face Inference API call
-            response = await asyncio.to_thread(
-                self._client.chat.completions.create,
-                messages=messages,
-                max_tokens=1000,
-                temperature=0.7
-            )
-            
-            text = ""
-            if response and response.choices:
-                text = response.choices[0].message.content
-            
-            if text:
-                cleaned_text = self._clean_response(text)
-                logger.info(f"Generated response of length: {len(cleaned_text)}")
-                return cleaned_text
-            else:
-                logger.warning("Empty response from Hugging Face API")
-                return None
+            while pending:
+                timeout = None
+                if settings.llm_hedge_enabled and not hedged and queue and len(pending) == 1:
+                    timeout = max(0.0, self._hedge_delay(primary) - (time.perf_counter() - started))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    hedged = launch() is not None
+                    if hedged:
+                        logger.info(f"Hedging LLM call to {list(pending.values())[-1].name}")
+                    continue
                 
+                for task in done:
+                    state = pending.pop(task)
+                    outcome, text = task.result()
+                    if text is not None:
+                        if hedged:
+                            LLM_HEDGES.inc(winner="primary" if state is primary else "hedge")
+                        return text, outcomes
+                    outcomes.append(outcome)
+                if not pending:
+                    # Failover: hedge the new call on its own latency, timed from its own start
+                    primary = launch()
+                    started = time.perf_counter()
+            if hedged:
+                LLM_HEDGES.inc(winner="none")
+            return None, outcomes
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _call(self, state: ProviderState, prompt: str) -> Tuple[str, Optional[str]]:
+        """One provider call, recorded on its breaker, latency window and metrics"""
+        started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(state.provider.complete(prompt), settings.llm_timeout_s)
+        except asyncio.CancelledError:
+            state.breaker.release()
+            state.record("cancelled")
+            LLM_REQUESTS.inc(provider=state.name, outcome="cancelled")
+            raise
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logger.warning(f"LLM provider {state.name} timed out after {settings.llm_timeout_s}s")
+        except ProviderRateLimited:
+            outcome = "rate_limited"
+            logger.warning(f"LLM provider {state.name} quota exceeded")
+            RATE_LIMITED.inc(source=state.name)
+        except ProviderError as e:
+            outcome = "error"
+            logger.error(f"LLM provider {state.name} error: {e}")
         except Exception as e:
-            error_message = str(e)
-            logger.error(f"Hugging Face API error: {error_message}")
-            
-            # Check for specific HF errors
-            if "Too Many Requests" in error_message or "429" in error_message:
-                logger.warning("Hugging Face API quota exceeded")
-                raise HTTPException(status_code=429, detail="Hugging Face rate limit exceeded. Please try again later.")
-            
-            return None
+            outcome = "error"
+            logger.error(f"LLM provider {state.name} failed unexpectedly: {e}")
+        else:
+            state.latency.observe(time.perf_counter() - started)
+            state.breaker.record_success()
+            state.record("success")
+            LLM_REQUESTS.inc(provider=state.name, outcome="success")
+            return "success", text
+        
+        state.breaker.record_failure()
+        state.record(outcome)
+        LLM_REQUESTS.inc(provider=state.name, outcome=outcome)
+        return outcome, None
     
     def _clean_response(self, text: str) -> str:
         """Clean and format the response text"""
@@ -156,8 +294,18 @@ class LLMService:
         return cleaned
     
     async def is_available(self) -> bool:
-        """Check if LLM service is available"""
-        return self._initialized and settings.gemini_api_key is not None
+        """Check if any provider is initialized and not circuit-broken"""
+        return self._initialized and any(state.breaker.state != "open" for state in self._states)
+    
+    def describe(self) -> Dict[str, Any]:
+        """Provider ranking, breaker states, learned latencies and hedge delays"""
+        return {
+            "hedging": settings.llm_hedge_enabled,
+            "providers": [
+                {**state.describe(), "hedge_delay_s": round(self._hedge_delay(state), 3)}
+                for state in self._rank() + [state for state in self._states if state.breaker.state == "open"]
+            ],
+        }
 
 
 # Global LLM service instance
@@ -0,0 +1,228 @@
+"""
+Conversation sessions for follow-up questions
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Tuple
+
+from ..core.config import settings
+from ..core.memory import memory_accounting
+from ..core.metrics import SESSION_RETRIEVALS
+from ..rag.results import RetrievedChunk
+from ..rag.suggest import suggester, normalize_term, STOPWORDS
+
+# Words that point back at an earlier turn
+FOLLOW_UP_WORDS = frozenset("he him his she her hers they them their theirs it its that those this these there".split())
+FOLLOW_UP_OPENERS = ("and ", "what about ", "how about ", "also ", "same ", "what else")
+# Every question is about the club, so naming it never changes the topic
+IGNORED_TOPICS = frozenset({"Arsenal", "Arsenal FC"})
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9\-]+")
+
+
+def content_terms(text: str) -> List[str]:
+    """Lowercase words of ``text`` that carry meaning for lexical matching"""
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS and token not in FOLLOW_UP_WORDS
+    ]
+
+
+class Session:
+    """Compact history of one conversation and the candidates of its last retrieval"""
+
+    __slots__ = ("id", "turns", "topics", "candidates", "candidate_scope", "expires_at")
+
+    def __init__(self, session_id: str, max_turns: int):
+        self.id = session_id
+        # (user message, rewritten query, answer excerpt)
+        self.turns: deque = deque(maxlen=max_turns)
+        self.topics: List[str] = []
+        self.candidates: List[RetrievedChunk] = []
+        self.candidate_scope: Optional[Tuple] = None
+        self.expires_at = 0.0
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the session's history and cached candidates"""
+        total = sys.getsizeof(self.turns) + sys.getsizeof(self.candidates)
+        total += sum(sys.getsizeof(text) for turn in self.turns for text in turn)
+        total += sum(sys.getsizeof(topic) for topic in self.topics)
+        for doc in self.candidates:
+            total += sys.getsizeof(doc) + sys.getsizeof(doc.text) + sys.getsizeof(doc.metadata)
+        return total
+
+
+class SessionStore:
+    """
+    Bounded, TTL-evicted store of chat sessions
+
+    Sessions idle for ``session_ttl_s`` expire, and the least recently used
+    session is evicted once ``session_max`` are held. Follow-up questions are
+    rewritten with the topics (entities and seasons) of earlier turns, and
+    when the previous retrieval's candidates cover a follow-up well enough
+    they are re-ranked instead of embedding and searching again.
+    """
+
+    def __init__(self):
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.retrievals = 0
+        self.reused = 0
+
+    def get(self, session_id: str) -> Session:
+        """The live session with this id, created if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, settings.session_max_turns)
+                self._sessions[session_id] = session
+                while len(self._sessions) > settings.session_max:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            session.expires_at = now + settings.session_ttl_s
+            return session
+
+    def _evict_expired(self, now: float):
+        # Sessions are kept in last-used order, so expired ones sit at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.expires_at > now:
+                break
+            self._sessions.popitem(last=False)
+
+    def rewrite(self, session: Session, message: str) -> Tuple[str, bool]:
+        """
+        Resolve a follow-up against the session's history
+
+        Returns the query to retrieve with and whether it was rewritten.
+        "and how many assists did he get?" after a question about Bukayo
+        Saka becomes "Bukayo Saka: and how many assists did he get?";
+        "what about Rice?" swaps Rice into the previous question.
+        """
+        names = self._names(message)
+        lowered = message.lower().strip()
+        tokens = _TOKEN_RE.findall(lowered)
+        opener = lowered.startswith(FOLLOW_UP_OPENERS)
+        refers_back = opener or any(token in FOLLOW_UP_WORDS for token in tokens)
+
+        if not session.turns or not session.topics:
+            return message, False
+
+        if names:
+            if not opener or len(tokens) > 6:
+                return message, False
+            # "what about X?": ask the previous question about X instead
+            previous = session.turns[-1][1]
+            rewritten = previous
+            for topic in session.topics:
+                rewritten = re.sub(re.escape(topic), " and ".join(names), rewritten, flags=re.IGNORECASE)
+            if rewritten == previous:
+                rewritten = f"{' and '.join(names)}: {previous}"
+            return rewritten, True
+
+        if refers_back or len(tokens) <= 4:
+            return f"{', '.join(session.topics)}: {message}", True
+        return message, False
+
+    def reusable_candidates(self, session: Session, query: str, scope: Tuple) -> Optional[List[RetrievedChunk]]:
+        """
+        The cached candidates if they still fit the query
+
+        They must come from the same category and index version, mention every
+        name in the query (a switch to another player needs a new search), and
+        contain at least ``session_reuse_min_coverage`` of its terms.
+        """
+        if not session.candidates or session.candidate_scope != scope:
+            return None
+        terms = set(content_terms(query))
+        if not terms:
+            return None
+        corpus = normalize_term(" ".join(doc.text for doc in session.candidates))
+        if any(normalize_term(name) not in corpus for name in self._names(query)):
+            return None
+        coverage = sum(1 for term in terms if term in corpus) / len(terms)
+        return session.candidates if coverage >= settings.session_reuse_min_coverage else None
+
+    def _names(self, text: str) -> List[str]:
+        return [name for name in suggester.find_names(text) if name not in IGNORED_TOPICS]
+
+    def rerank(self, candidates: List[RetrievedChunk], query: str, n_results: int) -> List[RetrievedChunk]:
+        """
+        Re-order cached candidates for a follow-up without a new embedding
+
+        Blends each candidate's similarity to the earlier query with the
+        share of the follow-up's terms it contains.
+        """
+        terms = set(content_terms(query))
+        weight = settings.session_rerank_lexical_weight
+
+        def score(doc: RetrievedChunk) -> float:
+            text = doc.text.lower()
+            lexical = sum(1 for term in terms if term in text) / len(terms) if terms else 0.0
+            return (1 - weight) * (1 - doc.distance) + weight * lexical
+
+        return sorted(candidates, key=score, reverse=True)[:n_results]
+
+    def record_retrieval(self, reused: bool):
+        with self._lock:
+            self.retrievals += 1
+            self.reused += reused
+        SESSION_RETRIEVALS.inc(outcome="reused" if reused else "fresh")
+
+    def record_turn(
+        self,
+        session: Session,
+        message: str,
+        query: str,
+        answer: str,
+        candidates: Optional[List[RetrievedChunk]] = None,
+        scope: Optional[Tuple] = None
+    ):
+        """Append a turn; new candidates replace the cached set"""
+        names = self._names(query)
+        candidates = list(candidates) if candidates is not None else None
+        # Under the store lock: concurrent requests in one session and stats() share the session
+        with self._lock:
+            # A standalone question sets the topics even when it names nobody;
+            # a follow-up without new names keeps the earlier ones
+            if names or query == message:
+                session.topics = names
+            session.turns.append((message, query, answer[:settings.session_answer_chars]))
+            if candidates is not None:
+                session.candidates = candidates
+                session.candidate_scope = scope
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            sessions = list(self._sessions.values())
+            # Sized under the lock so no turn is appended mid-iteration
+            memory = sum(session.memory_bytes() for session in sessions)
+            turns = sum(len(session.turns) for session in sessions)
+            retrievals, reused = self.retrievals, self.reused
+        return {
+            "sessions": len(sessions),
+            "max_sessions": settings.session_max,
+            "ttl_s": settings.session_ttl_s,
+            "memory_bytes": memory,
+            "turns": turns,
+            "retrievals": retrievals,
+            "reused": reused,
+            "reuse_rate": round(reused / retrievals, 4) if retrievals else None,
+        }
+
+
+# Global session store instance
+session_store = SessionStore()
+
+memory_accounting.register("sessions", lambda: session_store.stats()["memory_bytes"])
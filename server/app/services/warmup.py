@@ -0,0 +1,188 @@
+"""
+Cache warming from curated and popular questions
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from ..core.cache import answer_cache, cache_stats, normalize_query
+from ..core.config import settings
+from ..core.rag_logger import RAGLogger
+from ..models.chat import ChatRequest
+from ..rag.retriever import retrieve_documents
+from ..rag.vectorstore import vector_store
+from .chat_service import chat_service, answer_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def load_curated_queries(path: Path) -> List[str]:
+    """Read the curated warm-up list (``{"queries": [...]}``); missing file means none"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [query for query in json.load(f).get("queries", []) if query.strip()]
+
+
+def load_popular_queries(log_path: Optional[Path], top_n: int) -> List[str]:
+    """Most frequent ``query`` events in a JSON-format RAG trace log"""
+    if not log_path or top_n <= 0 or not Path(log_path).exists():
+        return []
+
+    counts: Counter = Counter()
+    originals: Dict[str, str] = {}
+    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if '"event": "query"' not in line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            query = event.get("query")
+            if event.get("event") != "query" or not isinstance(query, str) or not query.strip():
+                continue
+            key = normalize_query(query)
+            counts[key] += 1
+            originals.setdefault(key, query)
+
+    return [originals[key] for key, _ in counts.most_common(top_n)]
+
+
+class CacheWarmer:
+    """
+    Pre-computes query embeddings, retrievals and answers for likely questions
+
+    Queries go through ``ChatService`` so the serving caches are filled by
+    the same code path real requests use. Once ``max_llm_calls`` answers have
+    been generated, the remaining queries only warm embeddings and retrieval.
+    """
+
+    def __init__(self):
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._running = False
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def collect_queries(self, top_n: int) -> List[Dict[str, str]]:
+        """Curated questions first, then popular logged ones, de-duplicated"""
+        seen = set()
+        queries = []
+        for origin, candidates in (
+            ("curated", load_curated_queries(settings.warmup_queries_path)),
+            ("logged", load_popular_queries(settings.warmup_query_log_path, top_n)),
+        ):
+            for query in candidates:
+                key = normalize_query(query)
+                if key not in seen:
+                    seen.add(key)
+                    queries.append({"query": query, "origin": origin})
+        return queries
+
+    async def warm(
+        self,
+        trigger: str = "manual",
+        max_llm_calls: Optional[int] = None,
+        top_n: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Run one warm-up pass; returns its report, or None if a pass is already running"""
+        if self._running:
+            logger.info(f"Cache warm-up ({trigger}) skipped: another pass is running")
+            return None
+
+        self._running = True
+        max_llm_calls = settings.warmup_max_llm_calls if max_llm_calls is None else max_llm_calls
+        top_n = settings.warmup_top_n if top_n is None else top_n
+        started = time.time()
+        llm_calls = 0
+        results = []
+
+        try:
+            # Warm-up traffic is not user traffic: keep it out of the query log it mines
+            with RAGLogger.suppressed():
+                for item in self.collect_queries(top_n):
+                    request = ChatRequest(message=item["query"])
+                    query_start = time.perf_counter()
+                    try:
+                        if answer_cache_key(request, vector_store.serving_version()) in answer_cache:
+                            status = "cached"
+                        elif llm_calls < max_llm_calls:
+                            llm_calls += 1
+                            await chat_service.process_query(request)
+                            status = "warmed" if answer_cache_key(request, vector_store.serving_version()) in answer_cache else "fallback"
+                        else:
+                            await retrieve_documents(request.message, n_results=5)
+                            status = "retrieval_only"
+                    except Exception as e:
+                        logger.warning(f"Cache warm-up failed for '{item['query']}': {e}")
+                        status = "failed"
+
+                    results.append({
+                        **item,
+                        "status": status,
+                        "ms": round((time.perf_counter() - query_start) * 1000, 1),
+                    })
+        finally:
+            self._running = False
+
+        duration = time.time() - started
+        report = {
+            "trigger": trigger,
+            "started_at": round(started, 3),
+            "duration_s": round(duration, 3),
+            "llm_calls": llm_calls,
+            "max_llm_calls": max_llm_calls,
+            "counts": dict(Counter(result["status"] for result in results)),
+            "queries": results,
+            "caches": cache_stats(),
+        }
+        self.last_report = report
+        logger.info(
+            f"Cache warm-up ({trigger}) finished in {duration:.1f}s: "
+            f"{len(results)} queries, {llm_calls} LLM calls, {report['counts']}"
+        )
+        return report
+
+    def schedule(self, trigger: str, **kwargs) -> asyncio.Task:
+        """Start a warm-up pass in the background on the running event loop"""
+        task = asyncio.create_task(self.warm(trigger, **kwargs))
+        self._tasks.append(task)
+        task.add_done_callback(self._tasks.remove)
+        return task
+
+    async def _run_periodically(self, interval_s: float):
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await self.warm("scheduled")
+            except Exception as e:
+                logger.error(f"Scheduled cache warm-up failed: {e}")
+
+    def start(self):
+        """Kick off the startup and scheduled warm-ups configured in settings"""
+        if settings.warmup_on_startup:
+            self.schedule("startup")
+        if settings.warmup_interval_s > 0:
+            task = asyncio.create_task(self._run_periodically(settings.warmup_interval_s))
+            self._tasks.append(task)
+            task.add_done_callback(self._tasks.remove)
+
+    async def stop(self):
+        """Cancel any running or scheduled warm-up"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Global cache warmer instance
+cache_warmer = CacheWarmer()
@@ -0,0 +1,237 @@
+"""
+Offline bulk evaluation of RAG answers across a process pool
+
+Reads JSONL where each line is either a scored triple
+``{"query", "response", "docs": [{"text", "metadata", "distance"}]}``
+(``"sources"`` is accepted for ``docs``, so saved ``/chat`` responses work)
+or just ``{"query", "category"?}``. Query-only lines are first answered
+through ``ChatService`` with the app's local stand-ins and a stub LLM (see
+``load_test`` for the ``--llm-*`` options); ``--golden-set`` uses the
+retrieval golden set questions as input instead.
+
+``RAGEvaluator.evaluate_response`` is pure-Python string scanning, so the
+triples are fanned out over ``--workers`` processes in ``--chunk-size``
+work units. Per-item metrics stream to ``--output`` (JSONL, in input order)
+as chunks finish; aggregate distributions of hallucination rate,
+grounding, recall@5 and quality are printed and written next to it.
+``--scaling 1,2,4`` measures evaluation throughput at several worker
+counts instead.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.bulk_evaluate --input triples.jsonl --workers 8
+    python -m benchmarks.bulk_evaluate --golden-set --repeat 50
+    python -m benchmarks.bulk_evaluate --golden-set --repeat 50 --scaling 1,2,4,8
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+from app.rag.evaluator import RAGEvaluator
+from app.rag.results import RetrievedChunk
+from .common import BENCHMARKS_DIR, read_json, write_json
+from .load_test import add_app_arguments, boot_in_process_app
+
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+SUMMARY_METRICS = ["hallucination_rate", "grounding_score", "recall_at_5", "coverage_score", "quality_score"]
+
+_evaluator: Optional[RAGEvaluator] = None
+
+
+def _init_worker():
+    global _evaluator
+    # The evaluator logs every item at INFO; thousands of lines per second would dominate the run
+    logging.getLogger("app").setLevel(logging.WARNING)
+    _evaluator = RAGEvaluator()
+
+
+def evaluate_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Metrics for one (query, response, docs) triple; runs in a pool worker"""
+    metrics = _evaluator.evaluate_response(item["query"], item["response"], item["docs"])
+    return {"index": item["index"], "query": item["query"], **metrics}
+
+
+def read_items(path: Path) -> List[Dict[str, Any]]:
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                items.append(json.loads(line))
+    return items
+
+
+def normalize_triple(item: Dict[str, Any]) -> Dict[str, Any]:
+    docs = item.get("docs", item.get("sources")) or []
+    return {
+        "query": item["query"],
+        "response": item["response"],
+        "docs": [
+            RetrievedChunk(
+                doc.get("id"),
+                doc.get("text") or "",
+                doc.get("metadata") or {},
+                1.0 if doc.get("distance") is None else doc["distance"]
+            )
+            for doc in docs
+        ],
+    }
+
+
+async def answer_queries(items: List[Dict[str, Any]], args) -> List[Dict[str, Any]]:
+    """Answer query-only items through ChatService, with evaluation left to the pool"""
+    from app.models.chat import ChatRequest
+    from app.services.chat_service import chat_service
+
+    await boot_in_process_app(args)
+    logging.getLogger("app").setLevel(logging.WARNING)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def answer(item: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            request = ChatRequest(message=item["query"], category=item.get("category", "all"))
+            response = await chat_service.process_query(request, evaluate=False)
+        return normalize_triple({
+            "query": item["query"],
+            "response": response.response,
+            "sources": [source.model_dump() for source in response.sources],
+        })
+
+    start = time.perf_counter()
+    triples = await asyncio.gather(*(answer(item) for item in items))
+    print(f"Answered {len(items)} queries through ChatService in {time.perf_counter() - start:.1f}s")
+    return triples
+
+
+def evaluate_all(triples: List[Dict[str, Any]], workers: int, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    """Per-item metrics in input order, streamed as work units complete"""
+    items = ({"index": index, **triple} for index, triple in enumerate(triples))
+    if workers <= 1:
+        _init_worker()
+        yield from map(evaluate_item, items)
+        return
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        yield from pool.imap(evaluate_item, items, chunksize=chunk_size)
+
+
+def distribution(values: Iterable[float]) -> Dict[str, Any]:
+    samples = np.asarray(list(values), dtype=np.float64)
+    if samples.size == 0:
+        return {"count": 0}
+    p10, p50, p90 = np.percentile(samples, [10, 50, 90])
+    histogram, _ = np.histogram(np.clip(samples, 0.0, 1.0), bins=10, range=(0.0, 1.0))
+    return {
+        "count": int(samples.size),
+        "mean": round(float(samples.mean()), 4),
+        "std": round(float(samples.std()), 4),
+        "p10": round(float(p10), 4),
+        "p50": round(float(p50), 4),
+        "p90": round(float(p90), 4),
+        "min": round(float(samples.min()), 4),
+        "max": round(float(samples.max()), 4),
+        "histogram": histogram.tolist(),  # ten 0.1-wide buckets over [0, 1]
+    }
+
+
+def run_evaluation(triples: List[Dict[str, Any]], args) -> int:
+    output = args.output or DEFAULT_RESULTS_DIR / "bulk_eval.jsonl"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    values: Dict[str, List[float]] = {metric: [] for metric in SUMMARY_METRICS}
+
+    start = time.perf_counter()
+    with open(output, "w", encoding="utf-8") as f:
+        for result in evaluate_all(triples, args.workers, args.chunk_size):
+            f.write(json.dumps(result) + "\n")
+            for metric in SUMMARY_METRICS:
+                if metric in result:
+                    values[metric].append(result[metric])
+    elapsed = time.perf_counter() - start
+
+    summary = {metric: distribution(samples) for metric, samples in values.items()}
+    print(f"\nEvaluated {len(triples)} triples with {args.workers} workers in {elapsed:.2f}s "
+          f"({len(triples) / elapsed:.0f} items/s)")
+    print(f"  {'metric':<20}{'mean':>8}{'p10':>8}{'p50':>8}{'p90':>8}   histogram [0, 1] by 0.1")
+    for metric, stats in summary.items():
+        if stats["count"]:
+            print(f"  {metric:<20}{stats['mean']:>8.3f}{stats['p10']:>8.3f}{stats['p50']:>8.3f}{stats['p90']:>8.3f}   "
+                  f"{stats['histogram']}")
+
+    summary_path = output.with_suffix(".summary.json")
+    write_json(summary_path, {
+        "items": len(triples),
+        "workers": args.workers,
+        "chunk_size": args.chunk_size,
+        "duration_s": round(elapsed, 3),
+        "items_per_s": round(len(triples) / elapsed, 1),
+        "metrics": summary,
+    })
+    print(f"\nPer-item metrics written to {output}, summary to {summary_path}")
+    return 0
+
+
+def run_scaling(triples: List[Dict[str, Any]], worker_counts: List[int], args) -> int:
+    print(f"\nEvaluation throughput over {len(triples)} triples ({os.cpu_count()} CPUs)")
+    print(f"  {'workers':>8}{'items/s':>10}{'speedup':>9}{'efficiency':>12}")
+    report, baseline = [], None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        for _ in evaluate_all(triples, workers, args.chunk_size):
+            pass
+        throughput = len(triples) / (time.perf_counter() - start)
+        baseline = baseline or throughput / worker_counts[0]
+        speedup = throughput / baseline
+        print(f"  {workers:>8}{throughput:>10.0f}{speedup:>8.2f}x{speedup / workers:>11.0%}")
+        report.append({"workers": workers, "items_per_s": round(throughput, 1), "speedup": round(speedup, 2)})
+
+    output = args.output or DEFAULT_RESULTS_DIR / "bulk_eval_scaling.json"
+    write_json(output, {"items": len(triples), "cpus": os.cpu_count(), "chunk_size": args.chunk_size, "runs": report})
+    print(f"\nResults written to {output}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate RAG answers in bulk across a process pool")
+    add_app_arguments(parser)
+    parser.add_argument("--input", type=Path, default=None, help="JSONL of triples or queries")
+    parser.add_argument("--golden-set", nargs="?", type=Path, const=DEFAULT_GOLDEN_SET, default=None,
+                        help="Answer and evaluate the golden set questions instead of --input")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the input this many times")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=32, help="Items per work unit sent to a worker")
+    parser.add_argument("--concurrency", type=int, default=16, help="Queries answered concurrently")
+    parser.add_argument("--scaling", type=lambda value: [int(item) for item in value.split(",")], default=None,
+                        help="Comma-separated worker counts to measure throughput at")
+    parser.add_argument("--output", type=Path, default=None)
+    # Answers only need to exist; a realistic stub LLM latency would just lengthen the answering pass
+    parser.set_defaults(llm_latency=0.0)
+    args = parser.parse_args()
+
+    if args.golden_set:
+        items = [{"query": q["query"], "category": q.get("category", "all")} for q in read_json(args.golden_set)["questions"]]
+    elif args.input:
+        items = read_items(args.input)
+    else:
+        parser.error("--input or --golden-set is required")
+    items = items * args.repeat
+
+    triples = [normalize_triple(item) for item in items if "response" in item]
+    queries = [item for item in items if "response" not in item]
+    if queries:
+        triples += asyncio.run(answer_queries(queries, args))
+
+    if args.scaling:
+        sys.exit(run_scaling(triples, args.scaling, args))
+    sys.exit(run_evaluation(triples, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from app.core import startup
+from app.core.config import settings
+from app.rag.embeddings import embedding_service
+from app.rag.vectorstore import vector_store
+from app.rag.local_backends import HashingEmbedder, InMemoryClient, InMemoryCollection
+
+BENCHMARKS_DIR = Path(__file__).parent
+SERVER_DIR = BENCHMARKS_DIR.parent
+DEFAULT_KB_PATH = SERVER_DIR.parent / "arsenal_kb"
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (milliseconds) as mean and tail percentiles"""
+    if not samples_ms:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": int(samples.size),
+        "mean": round(float(samples.mean()), 4),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(samples.max()), 4),
+    }
+
+
+def load_embedding_model(embedder: str):
+    """Load the embedding model used for a benchmark run (``hashing`` or ``model``)"""
+    if embedder == "hashing":
+        return HashingEmbedder()
+    if embedder == "model":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(settings.embedding_model_name)
+    raise ValueError(f"Unknown embedder: {embedder}")
+
+
+def install_local_backends(
+    embedder: str = "hashing",
+    kb_path: Optional[Path] = None,
+    codec: str = "float32"
+) -> InMemoryCollection:
+    """
+    Point the global services at local stand-ins instead of Chroma Cloud
+
+    Sets the startup globals checked by the API routes, the embedding service
+    model and the vector store collection, so the real retrieval code paths
+    run against an ``InMemoryClient``. ``codec`` selects the compressed
+    vector storage used by its collections. The serving caches are turned
+    off, so repeated queries time the pipeline rather than cache hits;
+    benchmarks measuring the caches turn them back on.
+    """
+    settings.kb_path = Path(kb_path) if kb_path else DEFAULT_KB_PATH
+    settings.cache_enabled = False
+
+    model = load_embedding_model(embedder)
+    client = InMemoryClient(codec=codec)
+    collection = client.get_or_create_collection(settings.collection_name)
+
+    startup.embedding_model = model
+    startup.chroma_client = client
+    startup.collection = collection
+    embedding_service.model = model
+    # Opened from the new client on first use, as at startup (also when called again in one process)
+    vector_store.collection = None
+    vector_store.active = None
+    vector_store.shadow = None
+    return collection
+
+
+def write_json(path: Path, payload: Dict[str, Any]):
+    """Write a benchmark result file, creating parent directories as needed"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+        f.write("\n")
+
+
+def read_json(path: Path) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
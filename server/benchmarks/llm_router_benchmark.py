@@ -0,0 +1,155 @@
+"""
+Tail latency and availability of the LLM router under injected faults
+
+Drives ``LLMService.generate_response`` with local stub providers
+(``StubInferenceClient``) and compares scenarios:
+
+- ``single``: one provider whose ``--slow-rate`` share of calls is slow
+- ``no-hedge``: two such providers, hedging disabled (failover only)
+- ``hedge``: the same two providers with hedging at the learned p95
+- ``outage``: the primary fails every call; its breaker should open and
+  route straight to the secondary
+
+Reports latency percentiles, success rate, hedges sent and won, provider
+calls per request (the extra load hedging costs) and breaker openings.
+Fails if hedging does not cut the p99 of the ``single`` scenario by
+``--min-p99-speedup``.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.llm_router_benchmark --requests 600
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any
+
+from app.core.config import settings
+from app.core.metrics import LLM_HEDGES
+from app.rag.local_backends import StubInferenceClient
+from app.services.llm_providers import ChatCompletionsProvider
+from app.services.llm_service import LLMService
+from .common import BENCHMARKS_DIR, latency_summary, write_json
+
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+PROMPT = "Context:\nBukayo Saka scored 16 league goals in 2023-24.\nQuestion: How many goals did Saka score?"
+
+
+def make_provider(name: str, args, seed: int, error_rate: float = 0.0) -> ChatCompletionsProvider:
+    return ChatCompletionsProvider(name, StubInferenceClient(
+        latency_s=args.latency,
+        output_tokens=20,
+        jitter_s=args.jitter,
+        slow_rate=args.slow_rate,
+        slow_latency_s=args.slow_latency,
+        error_rate=error_rate,
+        seed=seed
+    ))
+
+
+async def run_scenario(name: str, providers: List[ChatCompletionsProvider], hedge: bool, args) -> Dict[str, Any]:
+    settings.llm_hedge_enabled = hedge
+    service = LLMService()
+    service.use_providers(providers)
+    hedges_before = {winner: LLM_HEDGES.value(winner=winner) for winner in ("primary", "hedge", "none")}
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    samples: List[float] = []
+    failures = 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            text = await service.generate_response(PROMPT)
+            samples.append((time.perf_counter() - start) * 1000)
+            failures += text is None
+
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+
+    hedges = {winner: int(LLM_HEDGES.value(winner=winner) - hedges_before[winner]) for winner in hedges_before}
+    states = service.describe()["providers"]
+    calls = sum(count for state in states for outcome, count in state["outcomes"].items())
+    latency = latency_summary(samples)
+    print(f"\n{name}: p50 {latency['p50']:.0f}ms  p95 {latency['p95']:.0f}ms  p99 {latency['p99']:.0f}ms  "
+          f"max {latency['max']:.0f}ms  success {1 - failures / args.requests:.1%}")
+    print(f"  hedges sent {sum(hedges.values())} (won by hedge {hedges['hedge']}), "
+          f"{calls / args.requests:.2f} provider calls/request")
+    for state in states:
+        print(f"  {state['name']}: breaker {state['breaker']} (opened {state['times_opened']}x), "
+              f"p95 {state['latency_p95_s']}s, outcomes {state['outcomes']}")
+    return {
+        "latency_ms": latency,
+        "success_rate": round(1 - failures / args.requests, 4),
+        "hedges": hedges,
+        "calls_per_request": round(calls / args.requests, 3),
+        "providers": states,
+    }
+
+
+async def main_async(args) -> int:
+    # Stub calls block a worker thread like the real client; size the pool so it is not the bottleneck
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency * 4))
+    # Learn latencies quickly and keep breakers from masking the tail in the latency scenarios
+    settings.llm_hedge_min_samples = args.min_samples
+    settings.llm_breaker_failures = 5
+    settings.llm_breaker_open_s = 60.0
+
+    report = {
+        "single": await run_scenario("single", [make_provider("primary", args, 1)], True, args),
+        "no-hedge": await run_scenario(
+            "no-hedge", [make_provider("primary", args, 1), make_provider("secondary", args, 2)], False, args
+        ),
+        "hedge": await run_scenario(
+            "hedge", [make_provider("primary", args, 1), make_provider("secondary", args, 2)], True, args
+        ),
+        "outage": await run_scenario(
+            "outage", [make_provider("primary", args, 1, error_rate=1.0), make_provider("secondary", args, 2)], True, args
+        ),
+    }
+
+    speedup = report["single"]["latency_ms"]["p99"] / max(report["hedge"]["latency_ms"]["p99"], 1e-9)
+    print(f"\nHedging p99 speedup over a single provider: {speedup:.1f}x")
+
+    output = args.output or DEFAULT_RESULTS_DIR / "llm_router.json"
+    write_json(output, {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "latency_s": args.latency,
+        "slow_rate": args.slow_rate,
+        "slow_latency_s": args.slow_latency,
+        "p99_speedup": round(speedup, 2),
+        "scenarios": report,
+    })
+    print(f"\nResults written to {output}")
+
+    if speedup < args.min_p99_speedup:
+        print(f"\np99 speedup {speedup:.2f}x is below {args.min_p99_speedup}x")
+        return 1
+    if report["outage"]["success_rate"] < 1.0:
+        print("\nRequests failed although the secondary provider was healthy")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure LLM router tail latency with hedging and circuit breakers")
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Stub LLM latency spread in seconds")
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="Share of calls hitting the slow tail")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Latency of slow calls in seconds")
+    parser.add_argument("--min-samples", type=int, default=20, help="Latencies learned before hedging at p95")
+    parser.add_argument("--min-p99-speedup", type=float, default=2.0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
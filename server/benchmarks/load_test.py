@@ -0,0 +1,352 @@
+"""
+End-to-end load test for the FastAPI app
+
+Boots ``app.main:app`` in-process with a stub LLM client (configurable latency
+and output size) and an in-memory vector store populated from ``arsenal_kb``,
+then drives ``/query``, ``/chat`` and ``/health/`` either at a fixed
+concurrency (closed loop) or at a target arrival rate (open loop). Reports
+throughput, latency percentiles and error rates per endpoint, and can sweep
+concurrency levels to find where a single worker saturates.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.load_test --concurrency 8 --duration 20 --disable-rate-limits
+    python -m benchmarks.load_test --rate 25 --duration 30 --mix chat=1
+    python -m benchmarks.load_test --sweep 1,2,4,8,16,32 --llm-latency 0.8
+    python -m benchmarks.load_test --url http://localhost:8000 --concurrency 4
+    python -m benchmarks.load_test --cache --warmup --mix chat=1 --disable-rate-limits
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import httpx
+
+from .common import BENCHMARKS_DIR, latency_summary, install_local_backends, write_json, read_json
+
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+
+ENDPOINTS = {
+    "query": ("POST", "/query"),
+    "chat": ("POST", "/chat"),
+    "health": ("GET", "/health/"),
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse ``chat=0.6,query=0.3,health=0.1`` into normalized endpoint weights"""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint in mix: {name}")
+        weights[name] = float(weight or 1)
+
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Endpoint mix weights must be positive")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+class RequestFactory:
+    """Picks the next endpoint by weight and builds its request body"""
+
+    def __init__(self, mix: Dict[str, float], questions: List[Dict[str, Any]], seed: int):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.questions = questions
+        self.random = random.Random(seed)
+
+    def next(self) -> Dict[str, Any]:
+        name = self.random.choices(self.names, self.weights)[0]
+        method, path = ENDPOINTS[name]
+        question = self.random.choice(self.questions)
+
+        body = None
+        if name == "query":
+            body = {"query": question["query"], "n_results": 5, "category": question.get("category", "all")}
+        elif name == "chat":
+            body = {"message": question["query"], "context_length": 2000}
+
+        return {"endpoint": name, "method": method, "path": path, "json": body}
+
+
+async def send(client: httpx.AsyncClient, request: Dict[str, Any], started: float) -> Dict[str, Any]:
+    """Issue one request and record its outcome; latency is measured from ``started``"""
+    try:
+        response = await client.request(request["method"], request["path"], json=request["json"])
+        status = response.status_code
+    except Exception as e:
+        status = f"exception:{type(e).__name__}"
+
+    return {
+        "endpoint": request["endpoint"],
+        "status": status,
+        "latency_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    factory: RequestFactory,
+    concurrency: int,
+    duration_s: float
+) -> List[Dict[str, Any]]:
+    """Keep ``concurrency`` requests in flight until the duration elapses"""
+    samples: List[Dict[str, Any]] = []
+    deadline = time.perf_counter() + duration_s
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            samples.append(await send(client, factory.next(), started))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    factory: RequestFactory,
+    rate: float,
+    duration_s: float,
+    max_in_flight: int
+) -> List[Dict[str, Any]]:
+    """
+    Fire requests on a Poisson arrival schedule at ``rate`` per second
+
+    Latency is measured from each request's scheduled start, so queueing
+    behind a saturated server shows up in the numbers instead of silently
+    lowering the offered load.
+    """
+    samples: List[Dict[str, Any]] = []
+    in_flight = asyncio.Semaphore(max_in_flight)
+    tasks = []
+    start = time.perf_counter()
+    scheduled = start
+
+    async def fire(request: Dict[str, Any], scheduled_at: float):
+        async with in_flight:
+            samples.append(await send(client, request, scheduled_at))
+
+    while True:
+        scheduled += factory.random.expovariate(rate)
+        if scheduled - start >= duration_s:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(factory.next(), scheduled)))
+
+    await asyncio.gather(*tasks)
+    return samples
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed_s: float) -> Dict[str, Any]:
+    """Per-endpoint and overall throughput, latency percentiles and error rates"""
+    groups: Dict[str, List[Dict[str, Any]]] = {"all": samples}
+    for sample in samples:
+        groups.setdefault(sample["endpoint"], []).append(sample)
+
+    summary = {}
+    for name, group in groups.items():
+        statuses: Dict[str, int] = {}
+        for sample in group:
+            statuses[str(sample["status"])] = statuses.get(str(sample["status"]), 0) + 1
+        errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+        ok_latencies = [s["latency_ms"] for s in group if str(s["status"]).startswith("2")]
+
+        summary[name] = {
+            "requests": len(group),
+            "errors": errors,
+            "error_rate": round(errors / len(group), 4) if group else 0.0,
+            "throughput_rps": round(len(group) / elapsed_s, 3) if elapsed_s else 0.0,
+            "status_counts": statuses,
+            "latency_ms": latency_summary(ok_latencies),
+        }
+    return summary
+
+
+def print_summary(title: str, summary: Dict[str, Any]):
+    print(f"\n{title}")
+    print(f"  {'endpoint':<8} {'reqs':>6} {'rps':>8} {'err%':>6} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, stats in summary.items():
+        latency = stats["latency_ms"]
+        print(f"  {name:<8} {stats['requests']:>6} {stats['throughput_rps']:>8.2f} "
+              f"{stats['error_rate'] * 100:>5.1f}% {latency['p50']:>8.1f}ms {latency['p95']:>8.1f}ms "
+              f"{latency['p99']:>8.1f}ms")
+
+
+async def boot_in_process_app(args):
+    """Import the app and swap its dependencies for local stand-ins"""
+    from app import main
+    from app.api import chat
+    from app.core.config import settings
+    from app.core.rag_logger import RAGLogger
+    from app.rag.ingest import ingest_knowledge_base
+    from app.rag.local_backends import StubInferenceClient
+    from app.services.llm_providers import ChatCompletionsProvider
+    from app.services.llm_service import llm_service
+    from app.services.warmup import cache_warmer
+
+    install_local_backends(args.embedder, args.kb_path)
+    # Serving caches would hide pipeline latency unless cache behaviour is what is being measured
+    settings.cache_enabled = args.cache or args.warmup
+    RAGLogger.configure(level=args.rag_trace, sample_rate=args.rag_trace_sample_rate)
+    chunks = await ingest_knowledge_base()
+
+    llm_service.use_providers([
+        ChatCompletionsProvider(f"stub-{i}", StubInferenceClient(
+            latency_s=args.llm_latency,
+            output_tokens=args.llm_tokens,
+            jitter_s=args.llm_jitter,
+            slow_rate=args.llm_slow_rate,
+            slow_latency_s=args.llm_slow_latency,
+            error_rate=args.llm_error_rate,
+            seed=i
+        ))
+        for i in range(args.llm_providers)
+    ])
+
+    if args.disable_rate_limits:
+        main.limiter.enabled = False
+        chat.limiter.enabled = False
+
+    if args.warmup:
+        report = await cache_warmer.warm("load_test")
+        print(f"Warmed caches in {report['duration_s']:.1f}s: {report['counts']}")
+
+    print(f"Booted app.main:app in-process with {chunks} chunks, stub LLM "
+          f"{args.llm_latency * 1000:.0f}ms/{args.llm_tokens} tokens")
+    return main.app
+
+
+def make_client(app, url: Optional[str], timeout_s: float) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout_s, limits=limits)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout_s, limits=limits)
+
+
+async def run_level(client, factory, args, concurrency: Optional[int]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if args.rate:
+        samples = await run_open_loop(client, factory, args.rate, args.duration, args.max_in_flight)
+    else:
+        samples = await run_closed_loop(client, factory, concurrency, args.duration)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def find_saturation(curve: List[Dict[str, Any]], min_gain: float = 0.1) -> Optional[int]:
+    """First concurrency level whose throughput gain over the previous level is below ``min_gain``"""
+    for previous, current in zip(curve, curve[1:]):
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            return previous["concurrency"]
+    return None
+
+
+async def main_async(args) -> int:
+    golden_set = read_json(args.golden_set)
+    mix = parse_mix(args.mix)
+    app = None if args.url else await boot_in_process_app(args)
+
+    results: Dict[str, Any] = {
+        "target": args.url or "in-process",
+        "mix": mix,
+        "duration_s": args.duration,
+        "llm_latency_s": args.llm_latency,
+        "llm_tokens": args.llm_tokens,
+        "rate_limits_disabled": args.disable_rate_limits,
+        "cache": args.cache or args.warmup,
+        "warmup": args.warmup,
+    }
+
+    async with make_client(app, args.url, args.timeout) as client:
+        if args.sweep:
+            levels = [int(level) for level in args.sweep.split(",")]
+            curve = []
+            for level in levels:
+                factory = RequestFactory(mix, golden_set["questions"], args.seed)
+                summary = await run_level(client, factory, args, level)
+                print_summary(f"concurrency={level}", summary)
+                overall = summary["all"]
+                curve.append({
+                    "concurrency": level,
+                    "throughput_rps": overall["throughput_rps"],
+                    "error_rate": overall["error_rate"],
+                    "p50_ms": overall["latency_ms"]["p50"],
+                    "p95_ms": overall["latency_ms"]["p95"],
+                    "p99_ms": overall["latency_ms"]["p99"],
+                    "endpoints": summary,
+                })
+
+            results["saturation_curve"] = curve
+            results["saturation_concurrency"] = find_saturation(curve)
+
+            print(f"\n  {'conc':>5} {'rps':>8} {'p95':>9} {'err%':>6}")
+            for point in curve:
+                print(f"  {point['concurrency']:>5} {point['throughput_rps']:>8.2f} "
+                      f"{point['p95_ms']:>8.1f}ms {point['error_rate'] * 100:>5.1f}%")
+            if results["saturation_concurrency"]:
+                print(f"\nThroughput stops scaling beyond concurrency={results['saturation_concurrency']}")
+        else:
+            factory = RequestFactory(mix, golden_set["questions"], args.seed)
+            summary = await run_level(client, factory, args, args.concurrency)
+            mode = f"rate={args.rate}/s" if args.rate else f"concurrency={args.concurrency}"
+            print_summary(mode, summary)
+            results["mode"] = mode
+            results["endpoints"] = summary
+
+    output = args.output or DEFAULT_RESULTS_DIR / "load_test.json"
+    write_json(output, results)
+    print(f"\nResults written to {output}")
+    return 0
+
+
+def add_app_arguments(parser: argparse.ArgumentParser):
+    """Target and in-process app options shared with the replay tool"""
+    parser.add_argument("--url", default=None, help="Target a running server instead of booting in-process")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Extra stub LLM latency spread in seconds")
+    parser.add_argument("--llm-tokens", type=int, default=120, help="Stub LLM response length in words")
+    parser.add_argument("--llm-providers", type=int, default=1, help="Stub LLM providers routed across")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0, help="Share of stub LLM calls that are slow")
+    parser.add_argument("--llm-slow-latency", type=float, default=5.0, help="Latency of slow stub LLM calls in seconds")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Share of stub LLM calls that fail")
+    parser.add_argument("--embedder", choices=["hashing", "model"], default="hashing")
+    parser.add_argument("--kb-path", type=Path, default=None)
+    parser.add_argument("--rag-trace", choices=["off", "summary", "trace"], default="off",
+                        help="RAGLogger verbosity while under load")
+    parser.add_argument("--rag-trace-sample-rate", type=float, default=1.0)
+    parser.add_argument("--disable-rate-limits", action="store_true", help="Turn off slowapi limits in-process")
+    parser.add_argument("--cache", action="store_true", help="Keep the serving caches enabled in-process")
+    parser.add_argument("--warmup", action="store_true", help="Run a cache warm-up pass before measuring (implies --cache)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout in seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the GunnerGPT API with stubbed dependencies")
+    add_app_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop in-flight requests")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop arrival rate (requests/second)")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Open-loop cap on outstanding requests")
+    parser.add_argument("--sweep", default=None, help="Comma-separated concurrency levels, e.g. 1,2,4,8,16")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per run or sweep level")
+    parser.add_argument("--mix", default="chat=0.6,query=0.3,health=0.1", help="Endpoint weights")
+    parser.add_argument("--golden-set", type=Path, default=DEFAULT_GOLDEN_SET, help="Source of request queries")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
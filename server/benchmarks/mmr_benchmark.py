@@ -0,0 +1,124 @@
+"""
+Redundancy and prompt size with and without MMR diversification
+
+Runs every golden-set question through ``retrieve_documents`` with plain
+top-k and with MMR at several ``--lambdas``, then reports the mean pairwise
+cosine similarity of the returned chunks, distinct sources, recall@k of the
+expected sources, and the size of the context ``ChatService`` would send to
+the LLM.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.mmr_benchmark --lambdas 0.7,0.5,0.3
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.core.rag_logger import RAGLogger
+from app.rag.embeddings import embedding_service
+from app.rag.ingest import ingest_knowledge_base
+from app.rag.results import RetrievedChunk
+from app.rag.retriever import retrieve_documents
+from app.services.chat_service import ChatService
+from .common import BENCHMARKS_DIR, install_local_backends, write_json, read_json
+
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+async def redundancy(documents: List[RetrievedChunk]) -> float:
+    """Mean pairwise cosine similarity between the retrieved chunks"""
+    if len(documents) < 2:
+        return 0.0
+    vectors = await embedding_service.generate_embeddings([doc.text for doc in documents])
+    similarity = vectors @ vectors.T
+    upper = similarity[np.triu_indices(len(documents), k=1)]
+    return float(upper.mean())
+
+
+async def run_setting(
+    questions: List[Dict[str, Any]],
+    k: int,
+    context_length: int,
+    mmr_lambda: Optional[float],
+    fetch_k: int
+) -> Dict[str, Any]:
+    chat_service = ChatService()
+    redundancies, distinct_sources, recalls, chunks, context_words = [], [], [], [], []
+    for question in questions:
+        documents = await retrieve_documents(
+            question["query"],
+            n_results=k,
+            category=question.get("category", "all"),
+            mmr=mmr_lambda is not None,
+            mmr_lambda=mmr_lambda,
+            mmr_fetch_k=fetch_k
+        )
+        sources = {doc.source for doc in documents}
+        expected = set(question["expected_sources"])
+
+        redundancies.append(await redundancy(documents))
+        distinct_sources.append(len(sources))
+        recalls.append(len(sources & expected) / len(expected) if expected else 0.0)
+        chunks.append(len(documents))
+        context_words.append(len(chat_service._format_context(documents, context_length).split()))
+
+    return {
+        "mean_pairwise_similarity": round(float(np.mean(redundancies)), 4),
+        "distinct_sources": round(float(np.mean(distinct_sources)), 3),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "chunks": round(float(np.mean(chunks)), 3),
+        "context_words": round(float(np.mean(context_words)), 1),
+    }
+
+
+async def main_async(args) -> int:
+    RAGLogger.configure(level="off")
+    install_local_backends(args.embedder, args.kb_path)
+    await ingest_knowledge_base()
+    questions = read_json(args.golden_set)["questions"]
+
+    settings_to_run = [("top-k", None)] + [(f"mmr λ={value}", value) for value in args.lambdas]
+    report = {}
+    print(f"\n{len(questions)} queries, k={args.k}, fetch_k={args.fetch_k}, context_length={args.context_length}")
+    print(f"  {'setting':<12} {'redundancy':>10} {'sources':>8} {'recall':>7} {'chunks':>7} {'words':>7}")
+    for name, value in settings_to_run:
+        result = await run_setting(questions, args.k, args.context_length, value, args.fetch_k)
+        report[name] = result
+        print(f"  {name:<12} {result['mean_pairwise_similarity']:>10.3f} {result['distinct_sources']:>8.2f} "
+              f"{result['recall_at_k']:>7.3f} {result['chunks']:>7.2f} {result['context_words']:>7.1f}")
+
+    output = args.output or DEFAULT_RESULTS_DIR / f"mmr_{args.embedder}.json"
+    write_json(output, {
+        "embedder": args.embedder,
+        "k": args.k,
+        "fetch_k": args.fetch_k,
+        "context_length": args.context_length,
+        "settings": report,
+    })
+    print(f"\nResults written to {output}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure redundancy and context size with MMR")
+    parser.add_argument("--embedder", choices=["hashing", "model"], default="hashing")
+    parser.add_argument("--kb-path", type=Path, default=None)
+    parser.add_argument("--golden-set", type=Path, default=DEFAULT_GOLDEN_SET)
+    parser.add_argument("--lambdas", type=lambda value: [float(item) for item in value.split(",")], default=[0.7, 0.5, 0.3])
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--context-length", type=int, default=4000)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
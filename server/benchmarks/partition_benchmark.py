@@ -0,0 +1,136 @@
+"""
+Scoped-query latency: category partitions vs. a filtered single collection
+
+Builds the same corpus twice in memory - once as a single collection queried
+with a ``where={"category": ...}`` filter, once as one partition per category
+- and times ``VectorStore.query`` for every golden-set query in each category
+scope and for ``category="all"``. ``--scale`` replicates the corpus (with a
+little noise on the vectors) to show how both layouts behave as it grows.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.partition_benchmark --scale 50
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+import numpy as np
+
+from app.rag.embeddings import embedding_service
+from app.rag.ingest import load_documents, chunk_documents
+from app.core.config import settings
+from app.rag.vectorstore import VectorStore
+from .common import BENCHMARKS_DIR, latency_summary, install_local_backends, write_json, read_json
+
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+async def build_corpus(scale: int, seed: int) -> Dict[str, Any]:
+    """Chunk and embed arsenal_kb once, then replicate it ``scale`` times"""
+    chunks = await chunk_documents(await load_documents())
+    texts = [chunk["text"] for chunk in chunks]
+    base = np.asarray(await embedding_service.generate_embeddings(texts), dtype=np.float32)
+
+    rng = np.random.default_rng(seed)
+    documents, embeddings, metadatas, ids = [], [], [], []
+    for replica in range(scale):
+        vectors = base if replica == 0 else base + rng.normal(0, 0.02, base.shape).astype(np.float32)
+        for chunk, vector in zip(chunks, vectors):
+            documents.append(chunk["text"])
+            embeddings.append(vector)
+            metadatas.append({"source": chunk["source"], "category": chunk["category"], "chunk_id": chunk["chunk_id"]})
+            ids.append(f"{chunk['source']}_{chunk['chunk_id']}_r{replica}")
+
+    return {"documents": documents, "embeddings": embeddings, "metadatas": metadatas, "ids": ids}
+
+
+async def time_queries(store: VectorStore, embeddings: List[List[float]], category: str, k: int, repeats: int):
+    samples, results = [], []
+    for embedding in embeddings:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            documents = await store.query(embedding, k, category=category)
+            samples.append((time.perf_counter() - start) * 1000)
+        results.append([doc.id for doc in documents])
+    return samples, results
+
+
+async def main_async(args) -> int:
+    install_local_backends(args.embedder, args.kb_path)
+    corpus = await build_corpus(args.scale, args.seed)
+    categories = sorted({metadata["category"] for metadata in corpus["metadatas"]})
+
+    # Both layouts share one alias registry: keep each store on the version it built
+    settings.index_alias_refresh_s = float("inf")
+    single = VectorStore(partitioned=False)
+    partitioned = VectorStore(partitioned=True)
+    for store in (single, partitioned):
+        await store.initialize()
+        await store.add_documents(**corpus)
+
+    golden_set = read_json(args.golden_set)
+    queries = [question["query"] for question in golden_set["questions"]]
+    query_embeddings = [await embedding_service.generate_query_embedding(query) for query in queries]
+
+    # Warm both layouts before timing
+    for store in (single, partitioned):
+        await time_queries(store, query_embeddings[:3], "all", args.k, 1)
+
+    report = {}
+    print(f"\n{len(corpus['ids'])} chunks (scale={args.scale}), {len(queries)} queries x {args.repeats} repeats, k={args.k}")
+    print(f"  {'scope':<10} {'filtered p50':>13} {'p95':>8} {'partition p50':>14} {'p95':>8} {'speedup':>8} {'overlap':>8}")
+    for category in categories + ["all"]:
+        single_ms, single_ids = await time_queries(single, query_embeddings, category, args.k, args.repeats)
+        partition_ms, partition_ids = await time_queries(partitioned, query_embeddings, category, args.k, args.repeats)
+
+        overlap = np.mean([
+            len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(single_ids, partition_ids)
+        ])
+        single_stats = latency_summary(single_ms)
+        partition_stats = latency_summary(partition_ms)
+        speedup = single_stats["p50"] / partition_stats["p50"] if partition_stats["p50"] else 0.0
+
+        report[category] = {
+            "filtered_single_collection_ms": single_stats,
+            "partitioned_ms": partition_stats,
+            "p50_speedup": round(speedup, 3),
+            "topk_overlap": round(float(overlap), 4),
+        }
+        print(f"  {category:<10} {single_stats['p50']:>11.3f}ms {single_stats['p95']:>6.3f}ms "
+              f"{partition_stats['p50']:>12.3f}ms {partition_stats['p95']:>6.3f}ms {speedup:>7.2f}x {overlap:>8.3f}")
+
+    output = args.output or DEFAULT_RESULTS_DIR / f"partition_{args.embedder}_x{args.scale}.json"
+    write_json(output, {
+        "embedder": args.embedder,
+        "scale": args.scale,
+        "chunks": len(corpus["ids"]),
+        "k": args.k,
+        "repeats": args.repeats,
+        "scopes": report,
+    })
+    print(f"\nResults written to {output}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare partitioned and filtered single-collection retrieval")
+    parser.add_argument("--embedder", choices=["hashing", "model"], default="hashing")
+    parser.add_argument("--kb-path", type=Path, default=None)
+    parser.add_argument("--golden-set", type=Path, default=DEFAULT_GOLDEN_SET)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the corpus this many times")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Memory, latency and recall of compressed vector codes
+
+Embeds arsenal_kb and synthesizes ``--chunks`` rows by blending random pairs
+of real chunk vectors (plus a little noise), then compares every
+``CompressedIndex`` codec with and without exact re-scoring against brute-force float32 search. Reports resident
+memory per million chunks, query latency and recall@k against the exact top-k.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.quantization_benchmark --chunks 100000
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+import numpy as np
+
+from app.rag.embeddings import embedding_service
+from app.rag.ingest import load_documents, chunk_documents
+from app.rag.quantization import CompressedIndex, CODECS
+from .common import BENCHMARKS_DIR, latency_summary, install_local_backends, write_json, read_json
+
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+async def build_vectors(n_chunks: int, seed: int) -> np.ndarray:
+    """Embed the knowledge base and synthesize ``n_chunks`` unit vectors from it"""
+    chunks = await chunk_documents(await load_documents())
+    base = await embedding_service.generate_embeddings([chunk["text"] for chunk in chunks])
+
+    # Blending pairs of real chunks keeps the vocabulary structure of the corpus
+    # without producing clusters of near-identical copies
+    rng = np.random.default_rng(seed)
+    extra = max(0, n_chunks - len(base))
+    first = base[rng.integers(len(base), size=extra)]
+    second = base[rng.integers(len(base), size=extra)]
+    weights = rng.uniform(0.2, 0.8, size=(extra, 1)).astype(np.float32)
+    blended = weights * first + (1 - weights) * second + rng.normal(0, 0.01, first.shape).astype(np.float32)
+
+    vectors = np.concatenate([base, blended])[:n_chunks]
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def python_list_bytes(vector: np.ndarray) -> int:
+    """Approximate size of one embedding held as a Python list of floats"""
+    as_list = vector.tolist()
+    return sys.getsizeof(as_list) + sum(sys.getsizeof(value) for value in as_list)
+
+
+def evaluate(index: CompressedIndex, queries: np.ndarray, truth: List[np.ndarray], k: int, repeats: int) -> Dict[str, Any]:
+    samples, recalls = [], []
+    for query, expected in zip(queries, truth):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            top, _ = index.search(query, k)
+            samples.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(set(top.tolist()) & set(expected.tolist())) / k)
+    return {"latency_ms": latency_summary(samples), f"recall@{k}": round(float(np.mean(recalls)), 4)}
+
+
+async def main_async(args) -> int:
+    install_local_backends(args.embedder, args.kb_path)
+    vectors = await build_vectors(args.chunks, args.seed)
+
+    golden_set = read_json(args.golden_set)
+    queries = np.stack([
+        await embedding_service.generate_query_embedding(question["query"])
+        for question in golden_set["questions"]
+    ])
+
+    # Ground truth from brute-force float32 search
+    truth = [np.argsort(-(vectors @ query))[:args.k] for query in queries]
+
+    per_million = 1_000_000 / len(vectors)
+    report: Dict[str, Any] = {
+        "python_float_lists_mb_per_million": round(python_list_bytes(vectors[0]) * 1_000_000 / 2 ** 20, 1),
+    }
+    print(f"\n{len(vectors)} chunks, {len(queries)} queries x {args.repeats} repeats, k={args.k}")
+    print(f"  Python float lists: {report['python_float_lists_mb_per_million']:.0f} MB per million chunks")
+    print(f"  {'codec':<8} {'rerank':<7} {'MB/1M':>8} {'build':>8} {'p50':>9} {'p95':>9} {'recall':>7}")
+
+    configurations = []
+    for codec in args.codecs:
+        configurations.append((codec, False))
+        if codec != "float32":
+            configurations.append((codec, True))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec, rerank in configurations:
+            # Re-scoring vectors live in a memmap, so only the codes count as resident
+            rerank_path = Path(tmp) / f"{codec}.f32" if rerank else None
+            index = CompressedIndex(
+                codec=codec,
+                rerank=rerank,
+                oversample=args.oversample,
+                pq_subvectors=args.pq_subvectors,
+                rerank_path=rerank_path,
+                seed=args.seed
+            )
+            start = time.perf_counter()
+            index.add(vectors)
+            build_s = time.perf_counter() - start
+
+            evaluate(index, queries[:3], truth[:3], args.k, 1)  # warm up
+            result = evaluate(index, queries, truth, args.k, args.repeats)
+            memory = index.memory_bytes()
+            resident_mb = (memory["codes"] * per_million + memory["codec_params"]) / 2 ** 20
+            result.update({
+                "codec": codec,
+                "rerank": rerank,
+                "resident_mb_per_million": round(resident_mb, 1),
+                "rerank_store_mb_per_million_on_disk": round(len(vectors) * index.dimension * 4 * per_million / 2 ** 20, 1) if rerank else 0.0,
+                "build_s": round(build_s, 3),
+            })
+            report[f"{codec}{'+rerank' if rerank else ''}"] = result
+
+            latency = result["latency_ms"]
+            print(f"  {codec:<8} {'yes' if rerank else 'no':<7} {resident_mb:>8.1f} {build_s:>7.2f}s "
+                  f"{latency['p50']:>7.3f}ms {latency['p95']:>7.3f}ms {result[f'recall@{args.k}']:>7.3f}")
+
+    output = args.output or DEFAULT_RESULTS_DIR / f"quantization_{args.embedder}_{args.chunks}.json"
+    write_json(output, {
+        "embedder": args.embedder,
+        "chunks": len(vectors),
+        "k": args.k,
+        "oversample": args.oversample or "per-codec default",
+        "pq_subvectors": args.pq_subvectors,
+        "results": report,
+    })
+    print(f"\nResults written to {output}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare compressed vector codecs against exact search")
+    parser.add_argument("--embedder", choices=["hashing", "model"], default="hashing")
+    parser.add_argument("--kb-path", type=Path, default=None)
+    parser.add_argument("--golden-set", type=Path, default=DEFAULT_GOLDEN_SET)
+    parser.add_argument("--chunks", type=int, default=100000, help="Corpus size after synthesis")
+    parser.add_argument("--codecs", type=lambda value: value.split(","), default=list(CODECS))
+    parser.add_argument("--oversample", type=int, default=None, help="Shortlist multiple of k (default: per codec)")
+    parser.add_argument("--pq-subvectors", type=int, default=48)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
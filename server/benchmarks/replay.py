@@ -0,0 +1,278 @@
+"""
+Replay captured /query and /chat traffic and compare builds
+
+``run`` re-issues the requests recorded by the server's traffic capture
+(``CAPTURE_ENABLED=true``) in their original order, either at the original
+pacing scaled by ``--speed`` or as fast as ``--concurrency`` allows
+(``--speed 0``), against a running server (``--url``) or the app booted
+in-process with stub dependencies. ``compare`` diffs the latency
+distributions and retrieved chunk ids of two runs; either side may also be
+the capture itself, i.e. the build that served the original traffic.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.replay run .capture --speed 1 --output benchmarks/results/replay_a.json
+    python -m benchmarks.replay run .capture --speed 0 --concurrency 8 --url http://localhost:8000
+    python -m benchmarks.replay compare benchmarks/results/replay_a.json benchmarks/results/replay_b.json
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import httpx
+
+from app.core.capture import read_capture, document_id
+from .common import BENCHMARKS_DIR, latency_summary, write_json, read_json
+from .load_test import ENDPOINTS, add_app_arguments, boot_in_process_app, make_client
+
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+def load_captured_requests(paths: List[Path], endpoints: List[str], limit: Optional[int]) -> List[Dict[str, Any]]:
+    """Captured records in arrival order, numbered so runs can be joined request by request"""
+    records = [record for record in read_capture(paths) if record.get("endpoint") in endpoints]
+    records.sort(key=lambda record: record["ts"])
+    if limit:
+        records = records[:limit]
+    for index, record in enumerate(records):
+        record["index"] = index
+    return records
+
+
+def response_ids(endpoint: str, payload: Dict[str, Any]) -> List[str]:
+    documents = payload.get("results" if endpoint == "query" else "sources") or []
+    return [document_id(doc.get("metadata", {})) for doc in documents]
+
+
+async def send(client: httpx.AsyncClient, record: Dict[str, Any], started: float) -> Dict[str, Any]:
+    """Re-issue one captured request; latency is measured from its scheduled start"""
+    endpoint = record["endpoint"]
+    method, path = ENDPOINTS[endpoint]
+    retrieved_ids: List[str] = []
+    try:
+        response = await client.request(method, path, json=record["body"])
+        status = response.status_code
+        if response.is_success:
+            retrieved_ids = response_ids(endpoint, response.json())
+    except Exception as e:
+        status = f"exception:{type(e).__name__}"
+
+    return {
+        "index": record["index"],
+        "endpoint": endpoint,
+        "status": status,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "retrieved_ids": retrieved_ids,
+    }
+
+
+async def replay_paced(client, records: List[Dict[str, Any]], speed: float, max_in_flight: int) -> List[Dict[str, Any]]:
+    """Fire each request at its captured offset divided by ``speed``"""
+    in_flight = asyncio.Semaphore(max_in_flight)
+    origin = records[0]["ts"]
+    start = time.perf_counter()
+
+    async def fire(record: Dict[str, Any], scheduled_at: float):
+        async with in_flight:
+            return await send(client, record, scheduled_at)
+
+    tasks = []
+    for record in records:
+        scheduled = start + (record["ts"] - origin) / speed
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(fire(record, scheduled)))
+    return list(await asyncio.gather(*tasks))
+
+
+async def replay_unpaced(client, records: List[Dict[str, Any]], concurrency: int) -> List[Dict[str, Any]]:
+    """Issue requests in captured order with ``concurrency`` in flight"""
+    pending = iter(records)
+    results: List[Dict[str, Any]] = []
+
+    async def worker():
+        for record in pending:
+            results.append(await send(client, record, time.perf_counter()))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(results, key=lambda result: result["index"])
+
+
+def summarize_run(requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    groups: Dict[str, List[Dict[str, Any]]] = {"all": requests}
+    for request in requests:
+        groups.setdefault(request["endpoint"], []).append(request)
+    return {
+        name: {
+            "requests": len(group),
+            "errors": sum(1 for request in group if not str(request["status"]).startswith("2")),
+            "latency_ms": latency_summary([
+                request["latency_ms"] for request in group if str(request["status"]).startswith("2")
+            ]),
+        }
+        for name, group in groups.items()
+    }
+
+
+def load_run(path: Path) -> Dict[str, Any]:
+    """A replay result file, or a capture file/directory viewed as a run"""
+    path = Path(path)
+    if path.is_file() and path.suffix == ".json":
+        return read_json(path)
+    return capture_as_run(load_captured_requests([path], list(ENDPOINTS), None), f"capture:{path}")
+
+
+def capture_as_run(records: List[Dict[str, Any]], label: str) -> Dict[str, Any]:
+    """Captured records in the replay result shape (server-side latency and ids)"""
+    requests = [
+        {
+            "index": record["index"],
+            "endpoint": record["endpoint"],
+            "status": record.get("status", 200),
+            "latency_ms": record.get("latency_ms", 0.0),
+            "retrieved_ids": record.get("retrieved_ids", []),
+        }
+        for record in records
+    ]
+    return {"label": label, "requests": requests, "endpoints": summarize_run(requests)}
+
+
+def compare_runs(baseline: Dict[str, Any], candidate: Dict[str, Any], worst: int = 10) -> Dict[str, Any]:
+    """Latency percentiles per endpoint and retrieved-id agreement, joined on request index"""
+    latency = {}
+    for name, stats in baseline["endpoints"].items():
+        other = candidate["endpoints"].get(name)
+        if not other:
+            continue
+        latency[name] = {}
+        for percentile in ("p50", "p95", "p99"):
+            before = stats["latency_ms"][percentile]
+            after = other["latency_ms"][percentile]
+            latency[name][percentile] = {
+                "baseline": before,
+                "candidate": after,
+                "change": round((after - before) / before, 4) if before else None,
+            }
+
+    candidate_requests = {request["index"]: request for request in candidate["requests"]}
+    exact, overlaps, divergent = 0, [], []
+    for request in baseline["requests"]:
+        other = candidate_requests.get(request["index"])
+        if other is None or not str(request["status"]).startswith("2") or not str(other["status"]).startswith("2"):
+            continue
+        before, after = request["retrieved_ids"], other["retrieved_ids"]
+        overlap = len(set(before) & set(after)) / max(len(before), len(after), 1)
+        overlaps.append(overlap)
+        exact += before == after
+        if before != after:
+            divergent.append({"index": request["index"], "overlap": round(overlap, 3), "baseline": before, "candidate": after})
+
+    divergent.sort(key=lambda item: item["overlap"])
+    return {
+        "baseline": baseline.get("label"),
+        "candidate": candidate.get("label"),
+        "latency_ms": latency,
+        "retrieval": {
+            "compared": len(overlaps),
+            "identical_rate": round(exact / len(overlaps), 4) if overlaps else None,
+            "mean_overlap": round(sum(overlaps) / len(overlaps), 4) if overlaps else None,
+            "most_divergent": divergent[:worst],
+        },
+    }
+
+
+def print_comparison(comparison: Dict[str, Any]):
+    print(f"\nbaseline:  {comparison['baseline']}\ncandidate: {comparison['candidate']}")
+    print(f"  {'endpoint':<8} {'p50':>19} {'p95':>19} {'p99':>19}")
+    for name, percentiles in comparison["latency_ms"].items():
+        cells = []
+        for percentile in ("p50", "p95", "p99"):
+            item = percentiles[percentile]
+            change = f"{item['change'] * 100:+.0f}%" if item["change"] is not None else "n/a"
+            cells.append(f"{item['baseline']:.1f}->{item['candidate']:.1f} {change:>5}")
+        print(f"  {name:<8} " + " ".join(f"{cell:>19}" for cell in cells))
+
+    retrieval = comparison["retrieval"]
+    if retrieval["compared"]:
+        print(f"  retrieved ids: {retrieval['identical_rate'] * 100:.1f}% identical, "
+              f"mean overlap {retrieval['mean_overlap']:.3f} over {retrieval['compared']} requests")
+        for item in retrieval["most_divergent"][:3]:
+            print(f"    #{item['index']} overlap {item['overlap']:.2f}")
+
+
+async def run_async(args) -> int:
+    records = load_captured_requests(args.capture, args.endpoints, args.limit)
+    if not records:
+        print("No captured requests found")
+        return 1
+
+    app = None if args.url else await boot_in_process_app(args)
+    async with make_client(app, args.url, args.timeout) as client:
+        started = time.perf_counter()
+        if args.speed > 0:
+            requests = await replay_paced(client, records, args.speed, args.max_in_flight)
+        else:
+            requests = await replay_unpaced(client, records, args.concurrency)
+        elapsed = time.perf_counter() - started
+
+    run = {
+        "label": args.label or (args.url or "in-process"),
+        "capture": [str(path) for path in args.capture],
+        "speed": args.speed,
+        "concurrency": args.concurrency if args.speed <= 0 else None,
+        "elapsed_s": round(elapsed, 3),
+        "endpoints": summarize_run(requests),
+        "requests": requests,
+    }
+    output = args.output or DEFAULT_RESULTS_DIR / "replay.json"
+    write_json(output, run)
+
+    print(f"\nReplayed {len(requests)} requests in {elapsed:.1f}s (speed={args.speed or 'max'})")
+    print_comparison(compare_runs(capture_as_run(records, "capture"), run))
+    print(f"\nResults written to {output}")
+    return 0
+
+
+def compare_main(args) -> int:
+    comparison = compare_runs(load_run(args.baseline), load_run(args.candidate), args.worst)
+    print_comparison(comparison)
+    if args.output:
+        write_json(args.output, comparison)
+        print(f"\nComparison written to {args.output}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured traffic and compare builds")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Re-issue captured requests")
+    run_parser.add_argument("capture", type=Path, nargs="+", help="Capture files or directories")
+    add_app_arguments(run_parser)
+    run_parser.add_argument("--speed", type=float, default=1.0,
+                            help="Pacing multiplier over the captured timeline (0 = as fast as possible)")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="In-flight requests when --speed 0")
+    run_parser.add_argument("--max-in-flight", type=int, default=1000)
+    run_parser.add_argument("--endpoints", type=lambda value: value.split(","), default=["query", "chat"])
+    run_parser.add_argument("--limit", type=int, default=None, help="Replay only the first N requests")
+    run_parser.add_argument("--label", default=None, help="Name for this build in comparisons")
+    run_parser.add_argument("--output", type=Path, default=None)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two replay results (or a capture)")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("candidate", type=Path)
+    compare_parser.add_argument("--worst", type=int, default=10, help="Divergent requests to list")
+    compare_parser.add_argument("--output", type=Path, default=None)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        sys.exit(asyncio.run(run_async(args)))
+    sys.exit(compare_main(args))
+
+
+if __name__ == "__main__":
+    main()
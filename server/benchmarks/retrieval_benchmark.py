@@ -0,0 +1,237 @@
+"""
+Retrieval benchmark over the versioned golden set
+
+Ingests ``arsenal_kb`` into an in-memory collection (no network), runs every
+golden question through the real embedding and vector-store code paths, and
+reports recall@k, MRR, nDCG@k and p50/p95/p99 latency for query embedding and
+vector search separately. Results are written as JSON and optionally gated
+against a stored baseline.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.retrieval_benchmark --embedder hashing
+    python -m benchmarks.retrieval_benchmark --embedder model --update-baseline
+"""
+
+import argparse
+import asyncio
+import math
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+from app.rag.embeddings import embedding_service
+from app.rag.ingest import ingest_knowledge_base
+from app.rag.quantization import CODECS
+from app.rag.results import RetrievedChunk
+from app.rag.vectorstore import vector_store
+from .common import (
+    BENCHMARKS_DIR, latency_summary, install_local_backends, write_json, read_json
+)
+
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+BASELINES_DIR = BENCHMARKS_DIR / "baselines"
+
+QUALITY_METRICS = ("recall_at_k", "mrr", "ndcg_at_k")
+LATENCY_STAGES = ("embedding", "search")
+
+
+def ranked_sources(documents: List[RetrievedChunk]) -> List[str]:
+    """Collapse retrieved chunks into source files in order of first appearance"""
+    sources = []
+    for doc in documents:
+        source = doc.source
+        if source not in sources:
+            sources.append(source)
+    return sources
+
+
+def score_ranking(sources: List[str], expected: List[str], k: int) -> Dict[str, float]:
+    """Binary-relevance recall, reciprocal rank and nDCG@k for one ranked source list"""
+    expected_set = set(expected)
+    hits = [1.0 if source in expected_set else 0.0 for source in sources]
+
+    recall = sum(hits) / len(expected_set) if expected_set else 0.0
+    reciprocal_rank = next((1.0 / (rank + 1) for rank, hit in enumerate(hits) if hit), 0.0)
+
+    dcg = sum(hit / math.log2(rank + 2) for rank, hit in enumerate(hits))
+    # The ideal ranking depends on k, not on how many results this run returned
+    ideal_hits = min(len(expected_set), k)
+    idcg = sum(1.0 / math.log2(rank + 2) for rank in range(ideal_hits))
+    ndcg = dcg / idcg if idcg else 0.0
+
+    return {"recall_at_k": recall, "mrr": reciprocal_rank, "ndcg_at_k": ndcg}
+
+
+async def run_benchmark(golden_set: Dict[str, Any], k: int, repeats: int, warmup: int) -> Dict[str, Any]:
+    """Run every golden question and collect quality scores and stage timings"""
+    embedding_ms: List[float] = []
+    search_ms: List[float] = []
+    per_query = []
+
+    questions = golden_set["questions"]
+    for question in questions[:warmup]:
+        embedding = await embedding_service.generate_query_embedding(question["query"])
+        await vector_store.query(embedding, k, category=question.get("category", "all"))
+
+    for question in questions:
+        category = question.get("category", "all")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            embedding = await embedding_service.generate_query_embedding(question["query"])
+            embedded = time.perf_counter()
+            documents = await vector_store.query(embedding, k, category=category)
+            searched = time.perf_counter()
+
+            embedding_ms.append((embedded - start) * 1000)
+            search_ms.append((searched - embedded) * 1000)
+
+        sources = ranked_sources(documents)
+        scores = score_ranking(sources, question["expected_sources"], k)
+        per_query.append({
+            "id": question["id"],
+            "category": category,
+            "retrieved_sources": sources,
+            "expected_sources": question["expected_sources"],
+            **{name: round(value, 4) for name, value in scores.items()},
+        })
+
+    retrieval = {
+        name: round(sum(item[name] for item in per_query) / len(per_query), 4)
+        for name in QUALITY_METRICS
+    }
+
+    return {
+        "golden_set_version": golden_set.get("version"),
+        "k": k,
+        "n_queries": len(questions),
+        "repeats": repeats,
+        "retrieval": retrieval,
+        "latency_ms": {
+            "embedding": latency_summary(embedding_ms),
+            "search": latency_summary(search_ms),
+        },
+        "per_query": per_query,
+    }
+
+
+def compare_to_baseline(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    quality_tolerance: float,
+    latency_tolerance: float,
+    latency_floor_ms: float
+) -> List[str]:
+    """
+    Return a list of regressions against the baseline (empty when within tolerance)
+
+    Quality metrics may drop by at most ``quality_tolerance`` (absolute).
+    Stage p95 latency may grow by at most ``latency_tolerance`` (relative),
+    ignoring increases smaller than ``latency_floor_ms`` to absorb timer noise.
+    """
+    regressions = []
+
+    for name in QUALITY_METRICS:
+        current = results["retrieval"][name]
+        previous = baseline["retrieval"].get(name)
+        if previous is not None and current < previous - quality_tolerance:
+            regressions.append(f"{name} dropped from {previous:.4f} to {current:.4f}")
+
+    for stage in LATENCY_STAGES:
+        current = results["latency_ms"][stage]["p95"]
+        previous = baseline["latency_ms"].get(stage, {}).get("p95")
+        if previous is None:
+            continue
+        if current > previous * (1 + latency_tolerance) and current - previous > latency_floor_ms:
+            regressions.append(f"{stage} p95 rose from {previous:.2f}ms to {current:.2f}ms")
+
+    return regressions
+
+
+def print_report(results: Dict[str, Any]):
+    retrieval = results["retrieval"]
+    print(f"\nGolden set v{results['golden_set_version']} - {results['n_queries']} queries, "
+          f"k={results['k']}, embedder={results['embedder']}")
+    print(f"  recall@k: {retrieval['recall_at_k']:.4f}  MRR: {retrieval['mrr']:.4f}  "
+          f"nDCG@k: {retrieval['ndcg_at_k']:.4f}")
+    for stage in LATENCY_STAGES:
+        stats = results["latency_ms"][stage]
+        print(f"  {stage:<9} p50 {stats['p50']:.3f}ms  p95 {stats['p95']:.3f}ms  p99 {stats['p99']:.3f}ms")
+
+    misses = [item["id"] for item in results["per_query"] if item["recall_at_k"] == 0]
+    if misses:
+        print(f"  no expected source retrieved for: {', '.join(misses)}")
+
+
+async def main_async(args) -> int:
+    golden_set = read_json(args.golden_set)
+    install_local_backends(args.embedder, args.kb_path, codec=args.codec)
+    chunks = await ingest_knowledge_base()
+
+    results = await run_benchmark(golden_set, args.k, args.repeats, args.warmup)
+    results["embedder"] = args.embedder
+    results["codec"] = args.codec
+    results["chunks"] = chunks
+
+    suffix = "" if args.codec == "float32" else f"_{args.codec}"
+    output = args.output or DEFAULT_RESULTS_DIR / f"retrieval_{args.embedder}{suffix}.json"
+    write_json(output, results)
+    print_report(results)
+    print(f"\nResults written to {output}")
+
+    baseline_path = args.baseline or BASELINES_DIR / f"retrieval_{args.embedder}.json"
+    if args.update_baseline:
+        write_json(baseline_path, {key: results[key] for key in results if key != "per_query"})
+        print(f"Baseline updated: {baseline_path}")
+        return 0
+
+    if not Path(baseline_path).exists():
+        print(f"No baseline at {baseline_path}; skipping regression gate")
+        return 0
+
+    baseline = read_json(baseline_path)
+    if baseline.get("golden_set_version") != results["golden_set_version"]:
+        print("Baseline was recorded against a different golden set version; refresh it with --update-baseline")
+        return 1
+
+    regressions = compare_to_baseline(
+        results, baseline, args.quality_tolerance, args.latency_tolerance, args.latency_floor_ms
+    )
+    if regressions:
+        print("\nREGRESSIONS against baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print("\nNo regressions against baseline")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and latency on the golden set")
+    parser.add_argument("--embedder", choices=["hashing", "model"], default="hashing",
+                        help="hashing: deterministic offline embedder; model: settings.embedding_model_name")
+    parser.add_argument("--codec", choices=list(CODECS), default="float32",
+                        help="Vector storage for the in-memory index (compared against the same baseline)")
+    parser.add_argument("--golden-set", type=Path, default=DEFAULT_GOLDEN_SET)
+    parser.add_argument("--kb-path", type=Path, default=None)
+    parser.add_argument("-k", type=int, default=5, help="Number of chunks retrieved per query")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per query")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed warm-up queries")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--quality-tolerance", type=float, default=0.02,
+                        help="Allowed absolute drop in recall@k, MRR and nDCG")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25,
+                        help="Allowed relative increase in stage p95 latency")
+    parser.add_argument("--latency-floor-ms", type=float, default=1.0,
+                        help="Ignore p95 increases smaller than this")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
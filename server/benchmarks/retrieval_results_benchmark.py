@@ -0,0 +1,207 @@
+"""
+Per-request cost of retrieval result objects
+
+Takes a Chroma-shaped query result of ``--n-results`` real arsenal_kb
+chunks and runs the object work a request does with it - build the hits,
+store and read them back from the retrieval cache, read their distances
+(evaluation) and serialize them into ``DocumentResult`` models - once with
+the per-index dicts, cache copies and validated models the pipeline used
+before, and once with ``RetrievedChunk``. Reports the time of each stage and
+the time, memory blocks and bytes (traced with ``tracemalloc``) of a request
+that misses the retrieval cache and one that hits it. Fails if a cache hit is
+not ``--min-speedup`` faster with ``RetrievedChunk``.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.retrieval_results_benchmark --n-results 20
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Dict, Any, Callable
+
+from app.models.chat import DocumentResult
+from app.rag.ingest import load_documents, chunk_documents
+from app.rag.results import from_query_results
+from .common import BENCHMARKS_DIR, install_local_backends, write_json
+
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+def query_result(chunks: List[Dict[str, Any]], n_results: int, seed: int) -> Dict[str, Any]:
+    """What ``collection.query`` returns for one query embedding"""
+    picked = random.Random(seed).sample(chunks, n_results)
+    return {
+        "ids": [[f"{chunk['source']}_{chunk['chunk_id']}" for chunk in picked]],
+        "documents": [[chunk["text"] for chunk in picked]],
+        "metadatas": [[
+            {"source": chunk["source"], "category": chunk["category"], "chunk_id": chunk["chunk_id"]}
+            for chunk in picked
+        ]],
+        "distances": [sorted(random.Random(seed).uniform(0.3, 0.9) for _ in picked)],
+    }
+
+
+# Dict hits, as built and passed around before ``RetrievedChunk``
+
+def build_dicts(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    formatted_results = []
+    if results["ids"] and results["ids"][0]:
+        for i in range(len(results["ids"][0])):
+            formatted_results.append({
+                "id": results["ids"][0][i],
+                "text": results["documents"][0][i],
+                "metadata": results["metadatas"][0][i],
+                "distance": results["distances"][0][i] if results["distances"] else 0.0
+            })
+    return formatted_results
+
+
+def copy_dicts(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [dict(doc) for doc in documents]
+
+
+def distances_dicts(documents: List[Dict[str, Any]]) -> List[float]:
+    return [1 - doc.get("distance", 1.0) for doc in documents]
+
+
+def serialize_dicts(documents: List[Dict[str, Any]]) -> List[DocumentResult]:
+    return [
+        DocumentResult(id=doc["id"], text=doc["text"], metadata=doc["metadata"], distance=doc["distance"])
+        for doc in documents
+    ]
+
+
+# ``RetrievedChunk`` hits, shared by reference
+
+def distances_chunks(documents) -> List[float]:
+    return [1 - doc.distance for doc in documents]
+
+
+def serialize_chunks(documents) -> List[DocumentResult]:
+    return [doc.to_result() for doc in documents]
+
+
+# (build, retrieval cache set, retrieval cache get, evaluator reads, response serialization)
+PATHS = {
+    "dicts": (build_dicts, copy_dicts, copy_dicts, distances_dicts, serialize_dicts),
+    "chunks": (from_query_results, list, list, distances_chunks, serialize_chunks),
+}
+
+
+def cold_request(path, results: Dict[str, Any]):
+    """A retrieval cache miss: build the hits from the backend result and cache them"""
+    build, cache_set, _, distances, serialize = path
+    documents = build(results)
+    cached = cache_set(documents)
+    distances(documents)
+    return cached, serialize(documents)
+
+
+def warm_request(path, cached: List[Any]):
+    """A retrieval cache hit"""
+    _, _, cache_get, distances, serialize = path
+    documents = cache_get(cached)
+    distances(documents)
+    return serialize(documents)
+
+
+def time_call(fn: Callable, arg, iterations: int, repeats: int = 5) -> float:
+    """Best of ``repeats`` mean microseconds per call"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn(arg)
+        best = min(best, (time.perf_counter() - start) / iterations * 1e6)
+    return best
+
+
+def allocations(fn: Callable, arg, requests: int = 200) -> Dict[str, float]:
+    """Memory blocks and bytes each call allocates, with every call's objects kept alive"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [fn(arg) for _ in range(requests)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = [stat for stat in after.compare_to(before, "filename") if stat.count_diff > 0]
+    del kept
+    return {
+        "blocks": round(sum(stat.count_diff for stat in allocated) / requests, 1),
+        "bytes": int(sum(stat.size_diff for stat in allocated) / requests),
+    }
+
+
+def measure(path, results: Dict[str, Any], iterations: int) -> Dict[str, Any]:
+    build, cache_set, cache_get, distances, serialize = path
+    documents = build(results)
+    cached, _ = cold_request(path, results)
+    return {
+        "stages_us": {
+            "build": round(time_call(build, results, iterations), 2),
+            "cache_set": round(time_call(cache_set, documents, iterations), 2),
+            "cache_get": round(time_call(cache_get, cached, iterations), 2),
+            "distances": round(time_call(distances, documents, iterations), 2),
+            # Fresh hits every call so the memoized models of RetrievedChunk do not hide the cost
+            "serialize": round(time_call(lambda r: serialize(build(r)), results, iterations)
+                               - time_call(build, results, iterations), 2),
+        },
+        "cold": {"us": round(time_call(lambda r: cold_request(path, r), results, iterations), 2),
+                 **allocations(lambda r: cold_request(path, r), results)},
+        "warm": {"us": round(time_call(lambda c: warm_request(path, c), cached, iterations), 2),
+                 **allocations(lambda c: warm_request(path, c), cached)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dict and RetrievedChunk retrieval results per request")
+    parser.add_argument("--kb-path", type=Path, default=None)
+    parser.add_argument("--n-results", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--min-speedup", type=float, default=2.0, help="Fail below this cache hit speedup")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    install_local_backends(kb_path=args.kb_path)
+    chunks = asyncio.run(chunk_documents(asyncio.run(load_documents())))
+    results = query_result(chunks, args.n_results, args.seed)
+
+    report = {name: measure(path, results, args.iterations) for name, path in PATHS.items()}
+    print(f"\nPer request at n_results={args.n_results} (best of 5 x {args.iterations} iterations)")
+    print(f"  {'':<8}{'build':>8}{'cache set':>11}{'cache get':>11}{'distances':>11}{'serialize':>11}")
+    for name, stats in report.items():
+        stages = stats["stages_us"]
+        print(f"  {name:<8}{stages['build']:>6.1f}us{stages['cache_set']:>9.1f}us{stages['cache_get']:>9.1f}us"
+              f"{stages['distances']:>9.1f}us{stages['serialize']:>9.1f}us")
+    print(f"\n  {'':<8}{'request':<10}{'time':>9}{'blocks':>9}{'bytes':>9}")
+    for name, stats in report.items():
+        for kind, label in (("cold", "cache miss"), ("warm", "cache hit")):
+            print(f"  {name:<8}{label:<10}{stats[kind]['us']:>7.1f}us{stats[kind]['blocks']:>9.0f}{stats[kind]['bytes']:>9}")
+
+    speedup = {kind: report["dicts"][kind]["us"] / report["chunks"][kind]["us"] for kind in ("cold", "warm")}
+    for kind, label in (("cold", "Cache miss"), ("warm", "Cache hit")):
+        saved = 1 - report["chunks"][kind]["bytes"] / report["dicts"][kind]["bytes"]
+        print(f"  {label}: {speedup[kind]:.2f}x faster, {saved:.0%} fewer bytes allocated")
+
+    output = args.output or DEFAULT_RESULTS_DIR / f"retrieval_results_{args.n_results}.json"
+    write_json(output, {
+        "n_results": args.n_results,
+        "iterations": args.iterations,
+        "speedup": {kind: round(value, 2) for kind, value in speedup.items()},
+        **report,
+    })
+    print(f"\nResults written to {output}")
+
+    if speedup["warm"] < args.min_speedup:
+        print(f"\nCache hit speedup {speedup['warm']:.2f}x is below {args.min_speedup}x")
+        sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
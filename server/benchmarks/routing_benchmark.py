@@ -0,0 +1,171 @@
+"""
+Recall and latency of unscoped queries with and without category routing
+
+Ingests arsenal_kb (replicated ``--scale`` times, as in the partition
+benchmark) through ``VectorStore.add_documents``, which also stores the
+per-category routing centroids, then runs every golden-set question as a
+``category="all"`` query: once searching every category and once routed at
+each ``--confidence`` threshold. Reports recall@k, MRR, the share of queries
+routed, how many categories they searched, how often the routed categories
+held every expected source, and search latency. Fails if routing at the
+configured ``routing_confidence`` loses more than ``--max-recall-drop``
+recall@k.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.routing_benchmark --scale 20
+    python -m benchmarks.routing_benchmark --layout filtered --confidence 0.6,0.8,0.9
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.rag.embeddings import embedding_service
+from app.rag.routing import route_query
+from app.rag.vectorstore import VectorStore
+from .common import BENCHMARKS_DIR, install_local_backends, latency_summary, read_json, write_json
+from .partition_benchmark import build_corpus
+from .retrieval_benchmark import ranked_sources, score_ranking
+
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+async def run_queries(
+    store: VectorStore,
+    questions: List[Dict[str, Any]],
+    embeddings: List[Any],
+    source_categories: Dict[str, str],
+    k: int,
+    repeats: int,
+    confidence: Optional[float]
+) -> Dict[str, Any]:
+    """Search every question unscoped; ``confidence=None`` searches every category"""
+    if confidence is not None:
+        settings.routing_confidence = confidence
+    index = await store.live_version()
+    search_ms, per_query = [], []
+
+    for question, embedding in zip(questions, embeddings):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            documents = await store.query(embedding, k, route=confidence is not None)
+            search_ms.append((time.perf_counter() - start) * 1000)
+
+        categories = None
+        if confidence is not None:
+            categories, _ = route_query(
+                embedding, index.centroids, confidence, settings.routing_max_categories, settings.routing_temperature
+            )
+        expected = {source_categories.get(source) for source in question["expected_sources"]}
+        per_query.append({
+            "categories": categories,
+            "covers_expected": categories is None or expected <= set(categories),
+            **score_ranking(ranked_sources(documents), question["expected_sources"], k),
+        })
+
+    routed = [item for item in per_query if item["categories"] is not None]
+    return {
+        "recall_at_k": round(float(np.mean([item["recall_at_k"] for item in per_query])), 4),
+        "mrr": round(float(np.mean([item["mrr"] for item in per_query])), 4),
+        "routed_share": round(len(routed) / len(per_query), 4),
+        "categories_searched": round(float(np.mean([
+            len(item["categories"]) if item["categories"] else len(index.centroids) for item in per_query
+        ])), 2),
+        "route_accuracy": round(sum(item["covers_expected"] for item in routed) / len(routed), 4) if routed else None,
+        "search_ms": latency_summary(search_ms),
+    }
+
+
+def print_row(label: str, stats: Dict[str, Any]):
+    accuracy = f"{stats['route_accuracy']:.0%}" if stats["route_accuracy"] is not None else "-"
+    print(f"  {label:<14}{stats['recall_at_k']:>9.4f}{stats['mrr']:>8.4f}{stats['routed_share']:>8.0%}"
+          f"{stats['categories_searched']:>8.2f}{accuracy:>10}"
+          f"{stats['search_ms']['p50']:>9.3f}ms{stats['search_ms']['p95']:>9.3f}ms")
+
+
+async def main_async(args) -> int:
+    install_local_backends(args.embedder, args.kb_path)
+    settings.routing_centroids_per_category = args.centroids
+    configured_confidence = settings.routing_confidence
+    confidences = sorted(set(args.confidence) | {configured_confidence})
+
+    corpus = await build_corpus(args.scale, args.seed)
+    source_categories = {metadata["source"]: metadata["category"] for metadata in corpus["metadatas"]}
+    store = VectorStore(partitioned=args.layout == "partitioned")
+    await store.initialize()
+    await store.add_documents(**corpus)
+
+    questions = read_json(args.golden_set)["questions"]
+    embeddings = [await embedding_service.generate_query_embedding(question["query"]) for question in questions]
+    await run_queries(store, questions[:3], embeddings[:3], source_categories, args.k, 1, None)
+
+    print(f"\n{len(corpus['ids'])} chunks (scale={args.scale}, {args.layout}), {len(questions)} questions, "
+          f"k={args.k}, {args.centroids} centroids per category")
+    print(f"  {'':<14}{'recall@k':>9}{'MRR':>8}{'routed':>8}{'cats':>8}{'accuracy':>10}{'p50':>11}{'p95':>11}")
+    full = await run_queries(store, questions, embeddings, source_categories, args.k, args.repeats, None)
+    print_row("full search", full)
+    routed = {}
+    for confidence in confidences:
+        routed[confidence] = await run_queries(
+            store, questions, embeddings, source_categories, args.k, args.repeats, confidence
+        )
+        marker = " *" if confidence == configured_confidence else ""
+        print_row(f"routed @{confidence:g}{marker}", routed[confidence])
+    settings.routing_confidence = configured_confidence
+
+    chosen = routed[configured_confidence]
+    recall_drop = full["recall_at_k"] - chosen["recall_at_k"]
+    speedup = full["search_ms"]["p50"] / chosen["search_ms"]["p50"] if chosen["search_ms"]["p50"] else 0.0
+    print(f"\n  At routing_confidence={configured_confidence:g}: recall@k {-recall_drop:+.4f}, "
+          f"p50 search {speedup:.2f}x faster")
+
+    output = args.output or DEFAULT_RESULTS_DIR / f"routing_{args.embedder}_{args.layout}_x{args.scale}.json"
+    write_json(output, {
+        "embedder": args.embedder,
+        "layout": args.layout,
+        "scale": args.scale,
+        "chunks": len(corpus["ids"]),
+        "k": args.k,
+        "centroids_per_category": args.centroids,
+        "routing_confidence": configured_confidence,
+        "full_search": full,
+        "routed": {str(confidence): stats for confidence, stats in routed.items()},
+    })
+    print(f"\nResults written to {output}")
+
+    if recall_drop > args.max_recall_drop:
+        print(f"\nRouting loses {recall_drop:.4f} recall@k, more than {args.max_recall_drop}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare unscoped retrieval with and without category routing")
+    parser.add_argument("--embedder", choices=["hashing", "model"], default="hashing")
+    parser.add_argument("--kb-path", type=Path, default=None)
+    parser.add_argument("--golden-set", type=Path, default=DEFAULT_GOLDEN_SET)
+    parser.add_argument("--layout", choices=["partitioned", "filtered"], default="partitioned")
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the corpus this many times")
+    parser.add_argument("--centroids", type=int, default=settings.routing_centroids_per_category,
+                        help="Centroids per category")
+    parser.add_argument("--confidence", type=lambda value: [float(v) for v in value.split(",")],
+                        default=[0.5, 0.6, 0.7, 0.8, 0.9], help="Routing confidence thresholds to compare")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-recall-drop", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Shadow re-embedding with a candidate model, mirrored comparison and promotion
+
+Boots the app in-process and starts a shadow build of arsenal_kb with
+``--candidate`` (``hashing-<dim>`` selects a hashing embedder of that size,
+anything else is loaded as a sentence-transformers model) while golden set
+retrievals keep being served from the live index. Then mirrors
+``--mirror-rate`` of the retrievals to the shadow index and reports the
+live and shadow embedding and search latency, their top-k overlap and each
+index's recall@k on the golden set. Finally promotes the shadow version and
+rolls back again, checking that every request is answered with the model of
+the index it searches. Fails if any retrieval fails or serves the wrong
+version.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.shadow_benchmark --candidate hashing-768
+    python -m benchmarks.shadow_benchmark --candidate hashing-512 --chunk-size 400 --chunk-overlap 80
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+import numpy as np
+
+from app.core.cache import clear_knowledge_base_caches
+from app.core.config import settings
+from app.rag.embeddings import embedding_service
+from app.rag.local_backends import HashingEmbedder
+from app.rag.retriever import retrieve_documents
+from app.rag.shadow import shadow_mirror
+from app.rag.vectorstore import vector_store, IndexVersion
+from app.services.ingestion import ingestion_manager
+from .common import BENCHMARKS_DIR, latency_summary, read_json, write_json
+from .load_test import add_app_arguments, boot_in_process_app
+from .retrieval_benchmark import ranked_sources, score_ranking
+
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+
+async def serve(questions: List[Dict[str, Any]], k: int, expected_version: str) -> Dict[str, Any]:
+    """Retrieve every question through the serving path, checking which index answered"""
+    latencies, failed, wrong_version = [], 0, 0
+    for question in questions:
+        start = time.perf_counter()
+        try:
+            await retrieve_documents(question["query"], n_results=k, category=question.get("category", "all"))
+        except Exception:
+            failed += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        wrong_version += vector_store.serving_version() != expected_version
+    return {"requests": len(questions), "failed": failed, "wrong_version": wrong_version,
+            "latency_ms": latency_summary(latencies)}
+
+
+async def recall(index: IndexVersion, questions: List[Dict[str, Any]], k: int) -> float:
+    """Mean recall@k of one index version, queried with its own embedding model"""
+    scores = []
+    for question in questions:
+        embedding = await embedding_service.generate_query_embedding(question["query"], index.embedding_model)
+        documents = await vector_store.query(embedding, k, category=question.get("category", "all"), index=index)
+        scores.append(score_ranking(ranked_sources(documents), question["expected_sources"], k)["recall_at_k"])
+    return round(float(np.mean(scores)), 4)
+
+
+async def main_async(args) -> int:
+    await boot_in_process_app(args)
+    if args.candidate.startswith("hashing-"):
+        embedding_service.models[args.candidate] = HashingEmbedder(int(args.candidate.split("-", 1)[1]))
+    questions = read_json(args.golden_set)["questions"]
+    live = await vector_store.live_version()
+    report, ok = {"live": {"version": live.version, **live.fingerprint}}, True
+
+    # Serve from the live index while the shadow build runs
+    job = ingestion_manager.start(
+        "benchmark", embedding_model=args.candidate, chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap, shadow=True
+    )
+    during = []
+    while not job.finished:
+        during.append(await serve(questions, args.k, live.version))
+        await asyncio.sleep(0)
+    await ingestion_manager.wait(job)
+    shadow = vector_store.shadow
+    report["shadow"] = {"version": shadow.version, **shadow.fingerprint, "build_s": job.to_dict()["duration_s"]}
+    report["during_build"] = {
+        "passes": len(during),
+        "failed": sum(run["failed"] for run in during),
+        "wrong_version": sum(run["wrong_version"] for run in during),
+    }
+    print(f"\nShadow build {shadow.version} ({args.candidate}) took {report['shadow']['build_s']:.2f}s; "
+          f"{len(during)} golden set passes served from {live.version} meanwhile, "
+          f"{report['during_build']['failed']} failed, {report['during_build']['wrong_version']} from another version")
+    ok &= not report["during_build"]["failed"] and not report["during_build"]["wrong_version"]
+
+    # Mirror live retrievals to the shadow index
+    settings.shadow_mirror_rate = args.mirror_rate
+    for _ in range(args.repeats):
+        clear_knowledge_base_caches()
+        await serve(questions, args.k, live.version)
+        await shadow_mirror.flush()
+    settings.shadow_mirror_rate = 0.0
+    mirror = shadow_mirror.summary()
+    report["mirror"] = mirror
+    report["recall_at_k"] = {"live": await recall(live, questions, args.k), "shadow": await recall(shadow, questions, args.k)}
+
+    print(f"\n{mirror['comparisons']} mirrored retrievals, k={args.k}")
+    print(f"  {'':<8}{'embed p50':>11}{'p95':>10}{'search p50':>12}{'p95':>10}{'recall@k':>10}")
+    for side in ("live", "shadow"):
+        stages = mirror.get(f"{side}_ms")
+        if stages:
+            print(f"  {side:<8}{stages['embedding']['p50']:>9.3f}ms{stages['embedding']['p95']:>8.3f}ms"
+                  f"{stages['search']['p50']:>10.3f}ms{stages['search']['p95']:>8.3f}ms{report['recall_at_k'][side]:>10.4f}")
+    if mirror["comparisons"]:
+        print(f"  top-k overlap: {mirror['id_overlap']:.0%} of chunk ids, {mirror['source_overlap']:.0%} of sources")
+
+    # Promote, then roll back
+    promoted = vector_store.promote_shadow()
+    clear_knowledge_base_caches()
+    report["after_promote"] = await serve(questions, args.k, promoted)
+    report["after_promote"]["embedding_model"] = vector_store.active.embedding_model
+    rolled_back = vector_store.rollback()
+    clear_knowledge_base_caches()
+    report["after_rollback"] = await serve(questions, args.k, rolled_back)
+    report["after_rollback"]["embedding_model"] = vector_store.active.embedding_model
+    for label in ("after_promote", "after_rollback"):
+        run = report[label]
+        print(f"  {label.replace('_', ' ')}: {run['embedding_model']}, p50 {run['latency_ms']['p50']:.2f}ms, "
+              f"{run['failed']} failed, {run['wrong_version']} from another version")
+        ok &= not run["failed"] and not run["wrong_version"]
+    ok &= report["after_promote"]["embedding_model"] == args.candidate and rolled_back == live.version
+
+    output = args.output or DEFAULT_RESULTS_DIR / f"shadow_{args.candidate}.json"
+    write_json(output, report)
+    print(f"\nResults written to {output}")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, compare and promote a shadow index with a candidate model")
+    add_app_arguments(parser)
+    parser.set_defaults(llm_latency=0.0)
+    parser.add_argument("--candidate", default="hashing-768", help="Candidate embedding model (hashing-<dim> for offline runs)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Candidate chunk size (default: the live index's)")
+    parser.add_argument("--chunk-overlap", type=int, default=None)
+    parser.add_argument("--mirror-rate", type=float, default=1.0)
+    parser.add_argument("--golden-set", type=Path, default=DEFAULT_GOLDEN_SET)
+    parser.add_argument("--repeats", type=int, default=3, help="Golden set passes mirrored to the shadow index")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Cache hit rate across replicas with each shared cache backend
+
+Boots the app in-process with the local stand-ins and sends the golden set
+questions to ``--replicas`` simulated replicas in turn: each replica starts
+with empty in-process caches, as a new process behind the load balancer
+would. With the ``memory`` backend every replica misses; with ``disk`` or
+``redis`` (served by ``LocalRedisServer``) later replicas are answered from
+the entries the first one shared. Then the Redis stand-in is stalled and
+stopped to check that a cache outage only costs misses and never fails a
+request.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.shared_cache_benchmark --replicas 3
+    python -m benchmarks.shared_cache_benchmark --backends redis --redis-latency-ms 1
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+from app.core.cache import query_embedding_cache, retrieval_cache, answer_cache, chunk_cache, sentence_cache
+from app.core.config import settings
+from app.core.metrics import SHARED_CACHE_REQUESTS
+from app.core.shared_cache import shared_cache
+from app.models.chat import ChatRequest
+from app.rag.local_backends import LocalRedisServer
+from app.services.chat_service import chat_service
+from .common import BENCHMARKS_DIR, latency_summary, read_json, write_json
+from .load_test import add_app_arguments, boot_in_process_app
+
+DEFAULT_GOLDEN_SET = BENCHMARKS_DIR / "golden_set.json"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+SHARED_CACHES = ("query_embedding", "retrieval", "answer")
+
+
+def new_replica():
+    """Forget everything cached in-process, as a freshly started replica would have"""
+    for cache in (query_embedding_cache, retrieval_cache, answer_cache, chunk_cache, sentence_cache):
+        cache.clear()
+
+
+def shared_counts() -> Dict[str, int]:
+    return {
+        outcome: int(sum(SHARED_CACHE_REQUESTS.value(cache=cache, op=op, outcome=outcome)
+                         for cache in SHARED_CACHES for op in ("get", "set")))
+        for outcome in ("hit", "miss", "error")
+    }
+
+
+async def run_replica(questions: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    before = shared_counts()
+
+    async def ask(question: Dict[str, Any]):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await chat_service.process_query(
+                ChatRequest(message=question["query"], category=question.get("category", "all"))
+            )
+            return (time.perf_counter() - start) * 1000, response
+
+    results = await asyncio.gather(*(ask(question) for question in questions))
+    await shared_cache.flush()
+    metrics = [response.evaluation_metrics for _, response in results]
+    after = shared_counts()
+    return {
+        "requests": len(results),
+        # The error path answers without metrics; a cache outage must never lead there
+        "failed": sum(1 for m in metrics if m is None),
+        "answer_hit_rate": round(sum(1 for m in metrics if m and m.get("cached")) / len(results), 3),
+        "shared": {outcome: after[outcome] - before[outcome] for outcome in after},
+        "latency_ms": latency_summary([ms for ms, _ in results]),
+    }
+
+
+def print_row(label: str, stats: Dict[str, Any]):
+    latency = stats["latency_ms"]
+    shared = stats["shared"]
+    print(f"  {label:<22}{stats['answer_hit_rate']:>9.0%}{shared['hit']:>8}{shared['miss']:>8}{shared['error']:>8}"
+          f"{latency['p50']:>9.1f}ms{latency['p99']:>9.1f}ms{stats['failed']:>8}")
+
+
+async def main_async(args) -> int:
+    await boot_in_process_app(args)
+    questions = read_json(args.golden_set)["questions"] * args.repeat
+    server = LocalRedisServer(latency_s=args.redis_latency_ms / 1000)
+    tmp = tempfile.TemporaryDirectory()
+    report, ok = {}, True
+
+    print(f"\n{len(questions)} questions per replica, {args.replicas} replicas")
+    print(f"  {'':<22}{'answers':>9}{'hits':>8}{'misses':>8}{'errors':>8}{'p50':>11}{'p99':>11}{'failed':>8}")
+    for backend in args.backends:
+        if backend == "redis":
+            settings.shared_cache_url = await server.start()
+        settings.shared_cache_path = str(Path(tmp.name) / "shared_cache.sqlite3")
+        shared_cache.configure(backend)
+
+        runs = []
+        for replica in range(args.replicas):
+            new_replica()
+            runs.append(await run_replica(questions, args.concurrency))
+            print_row(f"{backend} replica {replica + 1}", runs[-1])
+        report[backend] = {"replicas": runs}
+        later = [run["answer_hit_rate"] for run in runs[1:]]
+        if backend != "memory" and later and min(later) < args.min_hit_rate:
+            print(f"  {backend}: later replicas hit {min(later):.0%} of answers, below {args.min_hit_rate:.0%}")
+            ok = False
+
+        if backend == "redis":
+            # A server that stops answering costs one timeout, then the tier is skipped
+            new_replica()
+            server.stall()
+            report[backend]["stalled"] = await run_replica(questions, args.concurrency)
+            print_row("redis stalled", report[backend]["stalled"])
+            server.stall(False)
+            await server.stop()
+            new_replica()
+            shared_cache.configure(backend)
+            report[backend]["stopped"] = await run_replica(questions, args.concurrency)
+            print_row("redis stopped", report[backend]["stopped"])
+            if report[backend]["stalled"]["failed"] or report[backend]["stopped"]["failed"]:
+                print("  Requests failed during the cache outage")
+                ok = False
+
+        await shared_cache.close()
+    tmp.cleanup()
+
+    output = args.output or DEFAULT_RESULTS_DIR / "shared_cache.json"
+    write_json(output, {
+        "replicas": args.replicas,
+        "questions": len(questions),
+        "redis_latency_ms": args.redis_latency_ms,
+        "backends": report,
+    })
+    print(f"\nResults written to {output}")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cross-replica cache hits with each shared cache backend")
+    add_app_arguments(parser)
+    parser.set_defaults(llm_latency=0.1, cache=True)
+    parser.add_argument("--backends", type=lambda value: value.split(","), default=["memory", "disk", "redis"])
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--golden-set", type=Path, default=DEFAULT_GOLDEN_SET)
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the golden set questions")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0, help="Added latency per stand-in command")
+    parser.add_argument("--min-hit-rate", type=float, default=0.9, help="Fail if a later replica answers fewer from cache")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Typeahead lookup latency of the suggestion prefix index
+
+Extracts the real terms from arsenal_kb, pads them to ``--terms`` with
+synthetic multi-word terms (recombined real words plus generated names,
+Zipf-distributed frequencies), then times ``Suggester.suggest`` for the
+prefixes a user produces while typing frequency-weighted terms one
+character at a time. Fails if the p99 exceeds ``--max-p99-ms``.
+
+Usage (from the ``server`` directory):
+    python -m benchmarks.suggest_benchmark --terms 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from app.core.config import settings
+from app.rag.suggest import Suggester, PrefixIndex, extract_terms
+from .common import BENCHMARKS_DIR, DEFAULT_KB_PATH, latency_summary, write_json
+
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+SYLLABLES = ["ar", "be", "ca", "do", "el", "fi", "ga", "ho", "in", "jo", "ka", "li", "ma", "no",
+             "or", "pa", "ri", "sa", "te", "ul", "va", "wi", "xa", "yo", "za", "ne", "tt", "ss"]
+KINDS = ["entity", "phrase", "season"]
+
+
+def synthesize_terms(real: List[Tuple[str, str, int]], n_terms: int, seed: int) -> List[Tuple[str, str, int]]:
+    """Real terms plus synthetic ones up to ``n_terms``, with Zipf-like frequencies"""
+    rng = random.Random(seed)
+    vocabulary = sorted({word for display, _, _ in real for word in display.split()})
+    seen = {display.lower() for display, _, _ in real}
+    terms = list(real)
+    while len(terms) < n_terms:
+        words = []
+        for _ in range(rng.choice((1, 2, 2, 3))):
+            if rng.random() < 0.5 and vocabulary:
+                words.append(rng.choice(vocabulary))
+            else:
+                words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize())
+        display = " ".join(words)
+        if display.lower() in seen:
+            continue
+        seen.add(display.lower())
+        rank = len(terms) + 1
+        terms.append((display, rng.choice(KINDS), max(1, int(10000 / rank ** 0.8))))
+    return terms
+
+
+def typing_prefixes(terms: List[Tuple[str, str, int]], n_queries: int, seed: int) -> List[str]:
+    """Prefixes produced by typing frequency-weighted terms (or their later words) keystroke by keystroke"""
+    rng = random.Random(seed)
+    chosen = rng.choices(terms, weights=[frequency for _, _, frequency in terms], k=n_queries)
+    prefixes = []
+    for display, _, _ in chosen:
+        words = display.split()
+        typed = " ".join(words[rng.randrange(len(words)):])
+        prefixes.extend(typed[:length] for length in range(1, min(len(typed), 12) + 1))
+    return prefixes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time typeahead lookups on the suggestion prefix index")
+    parser.add_argument("--kb-path", type=Path, default=None)
+    parser.add_argument("--terms", type=int, default=100000, help="Index size after synthesis")
+    parser.add_argument("--queries", type=int, default=2000, help="Terms typed (each yields several prefixes)")
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--max-p99-ms", type=float, default=1.0, help="Fail above this p99 lookup latency")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    kb_path = args.kb_path or DEFAULT_KB_PATH
+    texts = [path.read_text(encoding="utf-8") for path in sorted(kb_path.rglob("*.txt"))]
+    real = extract_terms(texts, settings.suggest_min_phrase_count)
+    terms = synthesize_terms(real, args.terms, args.seed)
+
+    start = time.perf_counter()
+    suggester = Suggester()
+    suggester.index = PrefixIndex(terms, top_k=settings.suggest_max_results)
+    build_s = time.perf_counter() - start
+
+    prefixes = typing_prefixes(terms, args.queries, args.seed)
+    for prefix in prefixes[:200]:
+        suggester.suggest(prefix, args.limit)  # warm up
+
+    samples, empty = [], 0
+    for prefix in prefixes:
+        start = time.perf_counter()
+        results = suggester.suggest(prefix, args.limit)
+        samples.append((time.perf_counter() - start) * 1000)
+        empty += not results
+
+    latency = latency_summary(samples)
+    stats = suggester.stats()
+    print(f"\n{len(terms)} terms ({len(real)} from arsenal_kb), {stats['keys']} keys, "
+          f"{len(suggester.index._dense)} precomputed prefixes")
+    print(f"  build {build_s:.2f}s, ~{stats['memory_bytes'] / 2 ** 20:.1f}MB")
+    print(f"  {len(samples)} lookups: p50 {latency['p50'] * 1000:.1f}us  p95 {latency['p95'] * 1000:.1f}us  "
+          f"p99 {latency['p99'] * 1000:.1f}us  max {latency['max'] * 1000:.1f}us  ({empty} empty)")
+
+    output = args.output or DEFAULT_RESULTS_DIR / f"suggest_{len(terms)}.json"
+    write_json(output, {
+        "terms": len(terms),
+        "real_terms": len(real),
+        "keys": stats["keys"],
+        "memory_bytes": stats["memory_bytes"],
+        "build_s": round(build_s, 3),
+        "lookups": len(samples),
+        "empty_results": empty,
+        "latency_ms": latency,
+    })
+    print(f"\nResults written to {output}")
+
+    if latency["p99"] > args.max_p99_ms:
+        print(f"\np99 {latency['p99']:.3f}ms exceeds {args.max_p99_ms}ms")
+        sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
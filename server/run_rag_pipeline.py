@@ -38,6 +38,7 @@ async def run_rag_pipeline(query: str):
     # Initialize services
     print("📦 Initializing RAG components...")
     await initialize_services()
+    RAGLogger.configure(level="trace", fmt="pretty")
     print("✅ Initialization complete!\n")
     
     # Create chat service instance
@@ -52,6 +53,7 @@ async def run_rag_pipeline(query: str):
     # Process query through RAG pipeline
     try:
         response = await chat_service.process_query(request)
+        RAGLogger.flush()
         
         # Display final results summary
         print("\n" + "="*80)
@@ -72,6 +74,7 @@ async def run_rag_pipeline(query: str):
         
     except Exception as e:
         RAGLogger.log_error(str(e))
+        RAGLogger.flush()
         print(f"\n❌ Pipeline failed: {e}\n")
         raise
 
@@ -86,6 +89,7 @@ async def interactive_mode():
     # Initialize once
     print("📦 Initializing RAG components...")
     await initialize_services()
+    RAGLogger.configure(level="trace", fmt="pretty")
     print("✅ Initialization complete!\n")
     
     chat_service = ChatService()
@@ -105,6 +109,7 @@ async def interactive_mode():
             # Process query
             request = ChatRequest(message=query, context_length=4000)
             response = await chat_service.process_query(request)
+            RAGLogger.flush()
             
             # Display summary
             print("\n" + "-"*80)
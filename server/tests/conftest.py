@@ -0,0 +1,44 @@
+"""
+Shared test fixtures
+
+Tests run the real services against the local stand-ins the benchmarks use
+(``InMemoryClient`` collections and the hashing embedder), so no model
+download or Chroma Cloud account is needed. Run from ``server/``:
+
+    python -m pytest tests
+"""
+
+import pytest
+
+from app.core.cache import query_embedding_cache, retrieval_cache, answer_cache, chunk_cache, sentence_cache
+from app.core.config import settings
+from app.rag.ingest import ingest_knowledge_base
+from app.rag.vectorstore import vector_store
+from benchmarks.common import DEFAULT_KB_PATH, install_local_backends
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def local_backends(monkeypatch):
+    """An empty ``InMemoryClient`` behind the global services, with the serving caches on"""
+    # Recorded first so they are restored after the test
+    monkeypatch.setattr(settings, "kb_path", DEFAULT_KB_PATH)
+    monkeypatch.setattr(settings, "cache_enabled", True)
+    install_local_backends("hashing")
+    settings.cache_enabled = True
+    for cache in (query_embedding_cache, retrieval_cache, answer_cache, chunk_cache, sentence_cache):
+        cache.clear()
+    yield vector_store
+    for cache in (query_embedding_cache, retrieval_cache, answer_cache, chunk_cache, sentence_cache):
+        cache.clear()
+
+
+@pytest.fixture
+async def knowledge_base(local_backends):
+    """The arsenal_kb ingested into ``local_backends`` as a live index version"""
+    await ingest_knowledge_base()
+    return local_backends
@@ -0,0 +1,52 @@
+"""
+Admin token checks on /admin routes and profiling triggers
+"""
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from app import main
+from app.core.config import settings
+from app.core.profiling import request_profiler
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    monkeypatch.setattr(settings, "profiling_sample_rate", 0.0)
+    return "s3cret"
+
+
+@pytest.fixture
+async def client(admin_token, monkeypatch):
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("headers, status", [
+    ({"X-Admin-Token": "s3cret"}, 200),
+    ({"X-Admin-Token": "s3cre"}, 403),
+    ({"X-Admin-Token": "s3cretü".encode("latin-1")}, 403),
+    ({}, 403),
+])
+async def test_admin_routes_check_the_token(client, headers, status):
+    response = await client.get("/admin/profiles", headers=headers)
+    assert response.status_code == status
+
+
+@pytest.mark.anyio
+async def test_admin_routes_are_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", None)
+    response = await client.get("/admin/profiles", headers={"X-Admin-Token": ""})
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize("token, trigger", [("s3cret", "header"), ("wrong", None), ("s3cretü", None)])
+def test_profiling_header_needs_the_admin_token(admin_token, token, trigger):
+    headers = [(b"x-profile", b"1"), (b"x-admin-token", token.encode("latin-1"))]
+    request = Request({"type": "http", "headers": headers})
+    assert request_profiler._trigger(request) == trigger
@@ -0,0 +1,56 @@
+"""
+Chat service answer caching and deadlines
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.cache import answer_cache
+from app.models.chat import ChatRequest
+from app.rag.vectorstore import vector_store
+from app.services.chat_service import chat_service
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_extractive_answer_is_cached(knowledge_base):
+    request = ChatRequest(message="Who is the Arsenal manager?", answer_mode="extractive")
+
+    first = await chat_service.process_query(request)
+    second = await chat_service.process_query(request)
+
+    assert first.evaluation_metrics["answer_mode"] == "extractive"
+    assert answer_cache.stats()["entries"] == 1
+    assert second.evaluation_metrics.get("cached")
+
+
+async def test_extractive_request_without_sources_is_not_cached(knowledge_base):
+    # No partition matches the category, so nothing is retrieved and the canned reply is served
+    request = ChatRequest(message="Who is the Arsenal manager?", category="transfers", answer_mode="extractive")
+
+    response = await chat_service.process_query(request)
+
+    assert response.sources == []
+    assert response.evaluation_metrics["answer_mode"] == "fallback"
+    assert answer_cache.stats()["entries"] == 0
+    assert not (await chat_service.process_query(request)).evaluation_metrics.get("cached")
+
+
+async def test_index_version_lookup_is_bounded_by_the_deadline(knowledge_base, monkeypatch):
+    live_version = vector_store.live_version
+
+    async def slow_live_version():
+        await asyncio.sleep(5.0)
+        return await live_version()
+
+    monkeypatch.setattr(vector_store, "live_version", slow_live_version)
+    request = ChatRequest(message="Who is the Arsenal manager?", answer_mode="extractive", deadline_ms=200)
+
+    started = time.perf_counter()
+    response = await chat_service.process_query(request)
+
+    assert time.perf_counter() - started < 1.0
+    assert response.evaluation_metrics["deadline"]["blown_stage"] == "index_version"
+    assert response.evaluation_metrics["fallback_reason"] == "deadline"
@@ -0,0 +1,131 @@
+"""
+Blue/green index versions: alias switches, rollback, shadow promotion and GC
+"""
+
+import pytest
+
+from app.core import startup
+from app.core.config import settings
+from app.core.startup import read_index_alias, write_index_alias
+from app.rag.ingest import ingest_knowledge_base
+from app.rag.retriever import retrieve_documents
+from app.rag.vectorstore import VectorStore, vector_store
+
+pytestmark = pytest.mark.anyio
+
+QUERY = "Who is the Arsenal manager?"
+
+
+def collection_names():
+    return {collection.name for collection in startup.chroma_client.list_collections()}
+
+
+async def test_ingest_switches_the_alias_and_retires_the_previous_version(knowledge_base):
+    first = vector_store.serving_version()
+    await ingest_knowledge_base()
+    second = vector_store.serving_version()
+
+    state = read_index_alias()
+    assert second != first
+    assert state["live"] == second
+    assert state["versions"][first]["retired_at"] is not None
+    assert state["versions"][second]["retired_at"] is None
+
+
+async def test_rollback_switches_back_to_the_previous_version(knowledge_base):
+    first = vector_store.serving_version()
+    await ingest_knowledge_base()
+    second = vector_store.serving_version()
+
+    assert vector_store.rollback() == first
+    assert vector_store.serving_version() == first
+    state = read_index_alias()
+    assert state["live"] == first
+    assert state["versions"][second]["retired_at"] is not None
+
+    # Rolling back again returns to the version just retired
+    assert vector_store.rollback() == second
+
+
+async def test_rollback_without_a_previous_version_fails(local_backends):
+    with pytest.raises(RuntimeError):
+        vector_store.rollback()
+
+
+async def test_promote_shadow_switches_the_alias(knowledge_base):
+    live = vector_store.serving_version()
+    await ingest_knowledge_base(chunk_size=200, shadow=True)
+    shadow = read_index_alias()["shadow"]
+    assert vector_store.serving_version() == live
+
+    assert vector_store.promote_shadow() == shadow
+    state = read_index_alias()
+    assert state["live"] == shadow
+    assert state["shadow"] is None
+    assert vector_store.serving_version() == shadow
+    assert vector_store.active.fingerprint["chunk_size"] == 200
+
+    assert vector_store.rollback() == live
+
+
+async def test_replicas_follow_the_alias(knowledge_base, monkeypatch):
+    # A replica starting up serves whatever the alias names
+    replica = VectorStore()
+    assert (await replica.live_version()).version == vector_store.serving_version()
+
+    # Another replica switching the alias is picked up on the next refresh
+    first = vector_store.serving_version()
+    await ingest_knowledge_base()
+    monkeypatch.setattr(settings, "index_alias_refresh_s", 0.0)
+    assert (await replica.live_version()).version == vector_store.serving_version() != first
+
+    state = read_index_alias()
+    state["versions"][state["live"]]["retired_at"] = 1.0
+    state["versions"][first]["retired_at"] = None
+    state["live"] = first
+    write_index_alias(state)
+    assert (await replica.live_version()).version == first
+
+
+async def test_gc_keeps_the_live_and_previous_versions(knowledge_base, monkeypatch):
+    monkeypatch.setattr(settings, "index_gc_grace_s", 0.0)
+    monkeypatch.setattr(settings, "index_keep_versions", 1)
+    first = vector_store.serving_version()
+    await ingest_knowledge_base()
+    second = vector_store.serving_version()
+    await ingest_knowledge_base()
+    third = vector_store.serving_version()
+
+    versions = read_index_alias()["versions"]
+    assert set(versions) == {second, third}
+    names = collection_names()
+    assert not any(f"--{first}" in name for name in names)
+    assert any(f"--{second}" in name for name in names)
+    assert any(f"--{third}" in name for name in names)
+
+    # The kept version can still be rolled back to
+    assert vector_store.rollback() == second
+
+
+async def test_gc_waits_for_the_grace_period(knowledge_base, monkeypatch):
+    monkeypatch.setattr(settings, "index_gc_grace_s", 3600.0)
+    monkeypatch.setattr(settings, "index_keep_versions", 0)
+    first = vector_store.serving_version()
+    await ingest_knowledge_base()
+
+    assert vector_store.collect_garbage() == []
+    retired_at = read_index_alias()["versions"][first]["retired_at"]
+    assert first in vector_store.collect_garbage(now=retired_at + 3600.0)
+
+
+async def test_retrieval_cache_is_isolated_across_versions(knowledge_base):
+    first = [doc.text for doc in await retrieve_documents(QUERY)]
+    await ingest_knowledge_base(chunk_size=200)
+    second = [doc.text for doc in await retrieve_documents(QUERY)]
+    assert second != first
+
+    # Rollback does not clear the caches; the version in the key keeps the results apart
+    vector_store.rollback()
+    assert [doc.text for doc in await retrieve_documents(QUERY)] == first
+    vector_store.rollback()
+    assert [doc.text for doc in await retrieve_documents(QUERY)] == second
@@ -0,0 +1,248 @@
+"""
+LLM router: circuit breakers, failover and hedging over scripted fake providers
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services import llm_providers
+from app.services.llm_providers import (
+    CircuitBreaker, LLMProvider, OpenAIProvider, ProviderError, ProviderRateLimited
+)
+from app.services.llm_service import LLMService
+
+
+class ScriptedProvider(LLMProvider):
+    """Answers after each scripted latency in turn; a scripted exception is raised instead"""
+
+    def __init__(self, name: str, *script, default: float = 0.0):
+        self.name = name
+        self.script = list(script)
+        self.default = default
+        self.calls = 0
+        self.cancelled = 0
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        step = self.script.pop(0) if self.script else self.default
+        if isinstance(step, Exception):
+            raise step
+        try:
+            await asyncio.sleep(step)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"answer from {self.name}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual clock for the breakers (``clock.now`` is advanced by the test)"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(llm_providers, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def router_settings(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_enabled", True)
+    monkeypatch.setattr(settings, "llm_hedge_default_delay_s", 5.0)
+    monkeypatch.setattr(settings, "llm_hedge_min_delay_s", 0.01)
+    monkeypatch.setattr(settings, "llm_hedge_min_samples", 5)
+    monkeypatch.setattr(settings, "llm_hedge_quantile", 0.95)
+    monkeypatch.setattr(settings, "llm_breaker_failures", 2)
+    monkeypatch.setattr(settings, "llm_timeout_s", 5.0)
+
+
+def router(*providers: LLMProvider) -> LLMService:
+    service = LLMService()
+    service.use_providers(list(providers))
+    return service
+
+
+# Circuit breaker
+
+def test_breaker_opens_after_failures_within_the_window(clock):
+    breaker = CircuitBreaker(failure_threshold=3, window_s=10.0, open_s=30.0)
+    breaker.record_failure()
+    clock.now += 11.0
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.times_opened == 1
+
+
+def test_breaker_lets_a_single_probe_through_when_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, window_s=10.0, open_s=30.0)
+    breaker.record_failure()
+    clock.now += 30.0
+    assert breaker.state == "half_open"
+
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # A cancelled probe gives its slot back
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_breaker_closes_after_a_successful_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, window_s=10.0, open_s=30.0)
+    breaker.record_failure()
+    clock.now += 30.0
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_reopens_after_a_failed_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=2, window_s=10.0, open_s=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 30.0
+    assert breaker.allow()
+
+    # A single failed probe re-opens it, below the failure threshold
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+    clock.now += 29.0
+    assert not breaker.allow()
+    clock.now += 1.0
+    assert breaker.state == "half_open"
+
+
+def test_breaker_ignores_failures_of_calls_sent_before_it_opened(clock):
+    breaker = CircuitBreaker(failure_threshold=1, window_s=10.0, open_s=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 30.0
+    assert breaker.state == "half_open"
+    assert breaker.times_opened == 1
+
+
+# Router
+
+@pytest.mark.anyio
+async def test_fails_over_to_the_next_provider(router_settings):
+    primary = ScriptedProvider("primary", ProviderError("boom"))
+    secondary = ScriptedProvider("secondary")
+    service = router(primary, secondary)
+
+    assert await service.generate_response("prompt") == "answer from secondary"
+    assert (primary.calls, secondary.calls) == (1, 1)
+    outcomes = {entry["name"]: entry["outcomes"] for entry in service.describe()["providers"]}
+    assert outcomes == {"primary": {"error": 1}, "secondary": {"success": 1}}
+
+
+@pytest.mark.anyio
+async def test_rate_limited_by_every_provider_is_a_429(router_settings):
+    service = router(
+        ScriptedProvider("primary", ProviderRateLimited("429")),
+        ScriptedProvider("secondary", ProviderRateLimited("429"))
+    )
+
+    with pytest.raises(HTTPException) as error:
+        await service.generate_response("prompt")
+    assert error.value.status_code == 429
+
+
+@pytest.mark.anyio
+async def test_open_breaker_routes_around_the_provider(router_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_failures", 1)
+    primary = ScriptedProvider("primary", ProviderError("boom"))
+    secondary = ScriptedProvider("secondary")
+    service = router(primary, secondary)
+
+    for _ in range(3):
+        assert await service.generate_response("prompt") == "answer from secondary"
+    assert primary.calls == 1
+    assert [entry["breaker"] for entry in service.describe()["providers"]] == ["closed", "open"]
+
+
+@pytest.mark.anyio
+async def test_half_open_provider_gets_one_probe(router_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_failures", 1)
+    monkeypatch.setattr(settings, "llm_breaker_open_s", 0.05)
+    monkeypatch.setattr(settings, "llm_hedge_default_delay_s", 0.01)
+    primary = ScriptedProvider("primary", ProviderError("boom"), 0.1)
+    secondary = ScriptedProvider("secondary", default=0.3)
+    service = router(primary, secondary)
+    assert await service.generate_response("prompt") == "answer from secondary"
+    await asyncio.sleep(0.05)
+
+    # Half-open ranks last, so the primary is reached as a hedge; only one request probes it
+    results = await asyncio.gather(*(service.generate_response("prompt") for _ in range(3)))
+    assert primary.calls == 2
+    assert results.count("answer from primary") == 1
+    assert service.describe()["providers"][0]["breaker"] == "closed"
+
+
+@pytest.mark.anyio
+async def test_hedges_once_the_primary_passes_its_learned_latency(router_settings):
+    primary = ScriptedProvider("primary", *[0.05] * 5, 2.0)
+    secondary = ScriptedProvider("secondary")
+    service = router(primary, secondary)
+
+    # Learn the primary's latency; no hedge while it answers within it
+    for _ in range(5):
+        assert await service.generate_response("prompt") == "answer from primary"
+    assert secondary.calls == 0
+    hedge_delay = service.describe()["providers"][0]["hedge_delay_s"]
+    assert 0.05 <= hedge_delay < 0.5
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await service.generate_response("prompt") == "answer from secondary"
+    assert hedge_delay <= loop.time() - started < 1.0
+    # The losing call is cancelled, not awaited; let it unwind
+    await asyncio.sleep(0.01)
+    assert primary.cancelled == 1
+
+
+@pytest.mark.anyio
+async def test_waits_the_default_delay_before_latency_is_learned(router_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_default_delay_s", 0.05)
+    primary = ScriptedProvider("primary", 2.0)
+    secondary = ScriptedProvider("secondary")
+    service = router(primary, secondary)
+
+    assert service.describe()["providers"][0]["hedge_delay_s"] == 0.05
+    assert await service.generate_response("prompt") == "answer from secondary"
+    # The losing call is cancelled, not awaited; let it unwind
+    await asyncio.sleep(0.01)
+    assert primary.cancelled == 1
+
+
+@pytest.mark.anyio
+async def test_no_hedge_when_disabled(router_settings, monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_enabled", False)
+    monkeypatch.setattr(settings, "llm_hedge_default_delay_s", 0.01)
+    primary = ScriptedProvider("primary", 0.1)
+    secondary = ScriptedProvider("secondary")
+    service = router(primary, secondary)
+
+    assert await service.generate_response("prompt") == "answer from primary"
+    assert secondary.calls == 0
+
+
+@pytest.mark.anyio
+async def test_aclose_closes_provider_clients():
+    openai = OpenAIProvider("test-key", "gpt-test")
+    assert await openai.initialize()
+    client = openai._client
+    service = router(openai, ScriptedProvider("secondary"))
+
+    await service.aclose()
+    assert client.is_closed
+    assert not await service.is_available()
@@ -0,0 +1,102 @@
+"""
+Conditional GET /query: ETags, 304 revalidation and the X-KB-Version header
+"""
+
+import httpx
+import pytest
+from fastapi import Request
+
+from app import main
+from app.api import chat
+from app.api.caching import etag_matches, make_etag
+from app.rag.ingest import ingest_knowledge_base
+from app.rag.vectorstore import vector_store
+
+PARAMS = {"query": "Who is the Arsenal manager?", "n_results": 3}
+
+
+def request_with(if_none_match: str) -> Request:
+    return Request({"type": "http", "headers": [(b"if-none-match", if_none_match.encode("latin-1"))]})
+
+
+@pytest.fixture
+async def client(knowledge_base, monkeypatch):
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    monkeypatch.setattr(chat.limiter, "enabled", False)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+# etag_matches
+
+def test_etag_matches_the_exact_tag():
+    etag = make_etag("query", 3)
+    assert etag_matches(request_with(etag), etag)
+    assert not etag_matches(request_with(make_etag("other", 3)), etag)
+    assert not etag_matches(Request({"type": "http", "headers": []}), etag)
+
+
+def test_etag_matches_weakly():
+    etag = make_etag("query", 3)
+    assert etag_matches(request_with(f"W/{etag}"), etag)
+    assert etag_matches(request_with(f'"stale", W/{etag}'), etag)
+    assert etag_matches(request_with(f' "stale" ,{etag} '), etag)
+
+
+def test_etag_matches_any():
+    assert etag_matches(request_with("*"), make_etag("query", 3))
+    assert etag_matches(request_with(" * "), make_etag("query", 3))
+
+
+def test_etag_covers_every_part_in_order():
+    assert make_etag("a", "b") != make_etag("b", "a")
+    assert make_etag("ab", "") != make_etag("a", "b")
+
+
+# GET /query
+
+@pytest.mark.anyio
+async def test_get_query_sets_validators(client):
+    response = await client.get("/query", params=PARAMS)
+
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["x-kb-version"] == vector_store.serving_version()
+    assert "max-age" in response.headers["cache-control"]
+    assert len(response.json()["results"]) == 3
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"stale", W/{etag}', "*"])
+async def test_get_query_revalidates_with_304(client, if_none_match):
+    etag = (await client.get("/query", params=PARAMS)).headers["etag"]
+
+    response = await client.get("/query", params=PARAMS, headers={"If-None-Match": if_none_match.format(etag=etag)})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["x-kb-version"] == vector_store.serving_version()
+
+
+@pytest.mark.anyio
+async def test_get_query_etag_depends_on_parameters(client):
+    etag = (await client.get("/query", params=PARAMS)).headers["etag"]
+
+    response = await client.get("/query", params={**PARAMS, "n_results": 4}, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+@pytest.mark.anyio
+async def test_get_query_etag_changes_with_the_index_version(client):
+    first = await client.get("/query", params=PARAMS)
+    await ingest_knowledge_base()
+
+    response = await client.get("/query", params=PARAMS, headers={"If-None-Match": first.headers["etag"]})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != first.headers["etag"]
+    assert response.headers["x-kb-version"] == vector_store.serving_version() != first.headers["x-kb-version"]
@@ -0,0 +1,48 @@
+"""
+RAG tracing of /query requests
+"""
+
+import logging
+
+import httpx
+import pytest
+
+from app import main
+from app.api import chat
+from app.core import rag_logger
+from app.core.rag_logger import RAGLogger, LEVEL_OFF, LEVEL_SUMMARY
+
+
+class EventCollector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def emit(self, record: logging.LogRecord):
+        self.events.append(record.msg)
+
+
+@pytest.fixture
+def trace_events():
+    RAGLogger.configure(level=LEVEL_SUMMARY)
+    collector = EventCollector()
+    rag_logger.logger.addHandler(collector)
+    yield collector.events
+    rag_logger.logger.removeHandler(collector)
+    RAGLogger.configure(level=LEVEL_OFF)
+
+
+@pytest.mark.anyio
+async def test_query_starts_a_trace(knowledge_base, trace_events, monkeypatch):
+    monkeypatch.setattr(chat.limiter, "enabled", False)
+    monkeypatch.setattr(main.limiter, "enabled", False)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/query", json={"query": "Who is the Arsenal manager?", "n_results": 3})
+
+    assert response.status_code == 200
+    assert [event["event"] for event in trace_events] == ["query", "retrieved_documents"]
+    assert trace_events[0]["query"] == "Who is the Arsenal manager?"
+    assert trace_events[1]["count"] == 3
+    # Every event of the request carries the id the query event started
+    assert trace_events[0]["request_id"] and {event["request_id"] for event in trace_events} == {trace_events[0]["request_id"]}
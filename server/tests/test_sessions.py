@@ -0,0 +1,27 @@
+"""
+Session store bookkeeping under concurrent use
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.services.sessions import SessionStore
+
+
+def test_turns_recorded_concurrently_are_all_kept(monkeypatch):
+    monkeypatch.setattr(settings, "session_max_turns", 10000)
+    store = SessionStore()
+    session = store.get("concurrent")
+
+    def record(i: int):
+        store.record_turn(session, f"question {i}", f"question {i}", "answer")
+        store.record_retrieval(reused=i % 2 == 0)
+        # Sizing the sessions iterates their turns while other threads append
+        return store.stats()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(record, range(2000)))
+
+    stats = store.stats()
+    assert stats["turns"] == 2000
+    assert (stats["retrievals"], stats["reused"]) == (2000, 1000)
@@ -0,0 +1,58 @@
+"""
+Typeahead suggestions follow the index version being served
+"""
+
+import pytest
+
+from app.rag.ingest import ingest_knowledge_base, sync_suggestion_index
+from app.rag.suggest import suggester
+from app.rag.vectorstore import vector_store
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def fresh_suggester(monkeypatch):
+    """Forget the indexes built by earlier tests"""
+    monkeypatch.setattr(suggester, "index", None)
+    monkeypatch.setattr(suggester, "version", None)
+    monkeypatch.setattr(suggester, "_versions", type(suggester._versions)())
+
+
+async def test_ingest_builds_the_index_of_the_new_version(fresh_suggester, knowledge_base):
+    assert suggester.version == vector_store.serving_version()
+    assert suggester.suggest("arte")
+
+
+async def test_rollback_swaps_back_the_kept_index(fresh_suggester, knowledge_base):
+    first = vector_store.serving_version()
+    first_index = suggester.index
+    await ingest_knowledge_base(chunk_size=200)
+    assert suggester.index is not first_index
+
+    vector_store.rollback()
+    await sync_suggestion_index()
+    assert suggester.version == first
+    assert suggester.index is first_index
+
+
+async def test_promoted_shadow_serves_the_index_built_with_it(fresh_suggester, knowledge_base):
+    live = vector_store.serving_version()
+    await ingest_knowledge_base(chunk_size=200, shadow=True)
+    assert suggester.version == live
+
+    shadow = vector_store.promote_shadow()
+    await sync_suggestion_index()
+    assert suggester.version == shadow
+    assert suggester.stats()["versions_kept"] == 2
+
+
+async def test_version_built_elsewhere_is_rebuilt_from_its_chunks(fresh_suggester, knowledge_base):
+    # As on a replica that did not run the ingest
+    version = vector_store.serving_version()
+    suggester._versions.clear()
+    suggester.version = None
+
+    await sync_suggestion_index()
+    assert suggester.version == version
+    assert suggester.suggest("arte")